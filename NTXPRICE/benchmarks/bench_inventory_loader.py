@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.inventory_loader import iter_inventory, load_inventory  # noqa: E402
+from src.utils import peak_rss_mb  # noqa: E402
+
+HEADER = [
+    "sku", "card_name", "set_name", "card_number", "rarity", "finish", "language", "quantity", "current_price",
+    "tcgplayer_product_id", "tcgplayer_sku_id", "tcgplayer_url", "category", "notes",
+]
+WORDS = ["lightning", "bolt", "counter", "spell", "dark", "ritual", "serra", "angel", "shivan", "dragon", "llanowar", "elves"]
+SETS = ["Magic 2010", "Ice Age", "Limited Edition Alpha", "Revised Edition", "Core Set 2019", "Unlimited Edition"]
+
+
+def make_inventory(path: Path, rows: int, seed: int) -> None:
+    rng = random.Random(seed)
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            pid = rng.randint(1, 500_000)
+            writer.writerow([
+                f"SKU-{i:08d}",
+                " ".join(rng.sample(WORDS, 2)).title(),
+                rng.choice(SETS),
+                str(rng.randint(1, 300)),
+                rng.choice("CURM"),
+                rng.choice(["Normal", "Foil"]),
+                "English",
+                rng.randint(0, 12),
+                f"{rng.uniform(0.1, 80):.2f}",
+                pid if rng.random() < 0.6 else "",
+                pid * 10 if rng.random() < 0.4 else "",
+                f"https://www.tcgplayer.com/product/{pid}" if rng.random() < 0.3 else "",
+                "Magic",
+                "" if rng.random() < 0.9 else "signed",
+            ])
+
+
+def make_parquet(csv_path: Path) -> Path:
+    # Same inventory as a typed Parquet file (needs pyarrow).
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+
+    path = csv_path.with_suffix(".parquet")
+    if not path.exists():
+        pq.write_table(pacsv.read_csv(csv_path), path)
+    return path
+
+
+def measure(path: str, mode: str, stream: bool, keep_raw: bool, workers: int) -> dict:
+    # Runs in a fresh interpreter so peak RSS belongs to one loader only.
+    fast = mode != "legacy"
+    started = time.perf_counter()
+    if mode == "parallel":
+        rows = len(load_inventory(path, keep_raw=keep_raw, parallel_min_bytes=0, workers=workers)[0])
+    elif stream:
+        errors: list[str] = []
+        rows = sum(1 for _ in iter_inventory(path, errors, keep_raw=keep_raw, fast=fast))
+    else:
+        rows = len(load_inventory(path, keep_raw=keep_raw, fast=fast)[0])
+    elapsed = time.perf_counter() - started
+    return {"rows": rows, "seconds": round(elapsed, 2), "rows_per_sec": round(rows / elapsed), "peak_rss_mb": peak_rss_mb()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Throughput and peak memory of the legacy, fast, parallel and Parquet inventory loaders")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--modes", nargs="+", default=["legacy", "fast", "parallel"], choices=["legacy", "fast", "parallel", "parquet"])
+    parser.add_argument("--workers", type=int, default=0, help="parallel mode: worker processes (0 = one per CPU)")
+    parser.add_argument("--stream", action="store_true", help="iterate without keeping rows (constant memory)")
+    parser.add_argument("--no-raw", action="store_true", help="drop per-row raw_data dicts")
+    parser.add_argument("--dir", help="where to write the synthetic inventories (default: a temp dir)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--measure", nargs=2, metavar=("PATH", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure[0], args.measure[1], args.stream, not args.no_raw, args.workers)))
+        return
+
+    work = Path(args.dir or tempfile.mkdtemp(prefix="ntxprice_bench_"))
+    work.mkdir(parents=True, exist_ok=True)
+    for rows in args.rows:
+        path = work / f"inventory_{rows}.csv"
+        if not path.exists():
+            make_inventory(path, rows, args.seed)
+        size_mb = path.stat().st_size / 1_048_576
+        for mode in args.modes:
+            source = make_parquet(path) if mode == "parquet" else path
+            cmd = [sys.executable, __file__, "--measure", str(source), mode]
+            cmd += ["--stream"] if args.stream else []
+            cmd += ["--no-raw"] if args.no_raw else []
+            cmd += ["--workers", str(args.workers)]
+            result = json.loads(subprocess.run(cmd, check=True, capture_output=True, text=True).stdout)
+            print(
+                f"rows={rows:>9,} file={size_mb:7.1f}MB mode={mode:<8} "
+                f"rows/sec={result['rows_per_sec']:>9,} seconds={result['seconds']:>7} peak_rss_mb={result['peak_rss_mb']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
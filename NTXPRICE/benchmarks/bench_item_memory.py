@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_inventory_loader import make_inventory  # noqa: E402
+from src.compact_store import CompactItemStore  # noqa: E402
+from src.inventory_loader import load_inventory  # noqa: E402
+from src.models import ItemState, MatchResult, MatchStatus, PriceResult, PricingBasis, PricingDecision  # noqa: E402
+from src.utils import peak_rss_mb, quantize_price  # noqa: E402
+
+
+def price_items(items) -> None:
+    # What a full run leaves on every item: a match, a price quote and a decision.
+    now = datetime.now(timezone.utc)
+    for n, item in enumerate(items):
+        inv = item.inventory
+        market = quantize_price(inv.current_price * Decimal("1.07") + Decimal(n % 7))
+        item.match = MatchResult(
+            MatchStatus.MATCHED, "product_id", product_id=n, sku_id=n * 10, product_name=inv.card_name,
+            set_name=inv.set_name, finish=inv.finish, condition="Near Mint", language=inv.language, confidence=1.0,
+        )
+        item.price = PriceResult(market, quantize_price(market * Decimal("0.9")), market, quantize_price(market * 2), inv.finish, "tcgplayer", now)
+        new = quantize_price(market - Decimal("0.01"))
+        change = quantize_price(new - inv.current_price)
+        pct = quantize_price(change / inv.current_price * 100) if inv.current_price > 0 else Decimal("0")
+        item.decision = PricingDecision(PricingBasis.MARKET, market, new, change, pct, change != 0, "computed")
+
+
+def measure(path: str, mode: str, keep_raw: bool, trace: bool) -> dict:
+    # Runs in a fresh interpreter. With trace=True the result is the bytes the loaded and priced items
+    # keep alive (tracemalloc slows everything down, so timings and RSS come from an untraced run).
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    if mode == "compact":
+        store, _ = CompactItemStore.load(path, keep_raw=keep_raw)
+        items = store.items()
+    else:
+        rows, _ = load_inventory(path, keep_raw=keep_raw)
+        items = [ItemState(inventory=r) for r in rows]
+    loaded = time.perf_counter()
+    price_items(items)
+    priced = time.perf_counter()
+    if trace:
+        return {"bytes_per_row": round(tracemalloc.get_traced_memory()[0] / len(items))}
+    return {
+        "load_seconds": round(loaded - started, 2),
+        "assign_seconds": round(priced - loaded, 2),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Memory per priced inventory row: ItemState lists vs. the compact item store")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--modes", nargs="+", default=["items", "compact"], choices=["items", "compact"])
+    parser.add_argument("--no-raw", action="store_true", help="drop raw_data (items) / source offsets (compact)")
+    parser.add_argument("--dir", help="where to write the synthetic inventories (default: a temp dir)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--measure", nargs=2, metavar=("PATH", "MODE"), help=argparse.SUPPRESS)
+    parser.add_argument("--trace", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure[0], args.measure[1], not args.no_raw, args.trace)))
+        return
+
+    work = Path(args.dir or tempfile.mkdtemp(prefix="ntxprice_bench_"))
+    work.mkdir(parents=True, exist_ok=True)
+    for rows in args.rows:
+        path = work / f"inventory_{rows}.csv"
+        if not path.exists():
+            make_inventory(path, rows, args.seed)
+        for mode in args.modes:
+            cmd = [sys.executable, __file__, "--measure", str(path), mode] + (["--no-raw"] if args.no_raw else [])
+            result = {}
+            for extra in ([], ["--trace"]):
+                result |= json.loads(subprocess.run(cmd + extra, check=True, capture_output=True, text=True).stdout)
+            print(
+                f"rows={rows:>9,} mode={mode:<8} bytes/row={result['bytes_per_row']:>6,} "
+                f"load_seconds={result['load_seconds']:>6} assign_seconds={result['assign_seconds']:>6} "
+                f"peak_rss_mb={result['peak_rss_mb']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.match_scoring import MatchQuery, normalize_name, score_candidates  # noqa: E402
+from src.matching_engine import SEARCH_LIMIT, review_reason  # noqa: E402
+from src.models import MatchCandidate  # noqa: E402
+
+WORDS = [
+    "lightning", "bolt", "counter", "spell", "dark", "ritual", "serra", "angel", "shivan", "dragon", "llanowar",
+    "elves", "giant", "growth", "ancestral", "recall", "time", "walk", "sol", "ring", "mox", "pearl", "sapphire",
+    "jet", "ruby", "emerald", "wrath", "god", "birds", "paradise", "force", "will", "brainstorm", "swords",
+    "plowshares", "fire", "ice", "aether", "vial", "thought", "seize", "jace", "mind", "sculptor", "liliana",
+]
+SETS = [
+    ("Magic 2010", "M10"), ("Ice Age", "ICE"), ("Limited Edition Alpha", "LEA"), ("Revised Edition", "3ED"),
+    ("Core Set 2019", "M19"), ("Unlimited Edition", "2ED"), ("Magic 2013", "M13"), ("Core Set 2021", "M21"),
+    ("Magic 2011", "M11"), ("Magic 2012", "M12"), ("Core Set 2020", "M20"),
+]
+RARITIES = [("C", "Common"), ("U", "Uncommon"), ("R", "Rare"), ("M", "Mythic")]
+ACCENTS = {"a": "á", "e": "é", "o": "ö", "u": "û"}
+
+
+def make_catalog(size: int, rng: random.Random, reprint_rate: float = 0.3) -> list[dict]:
+    catalog = []
+    for pid in range(1, size + 1):
+        if catalog and rng.random() < reprint_rate:
+            # The same card printed again in another set (often the next core set).
+            original = rng.choice(catalog)
+            name = original["name"]
+            set_name = rng.choice([s for s, _ in SETS if s != original["groupName"]])
+        else:
+            words = rng.sample(WORDS, rng.choice([1, 2, 2, 3]))
+            name = " ".join(w.capitalize() for w in words)
+            if rng.random() < 0.05:
+                name = f"{name} // {rng.choice(WORDS).capitalize()}"
+            set_name, _ = rng.choice(SETS)
+        rarity, _ = rng.choice(RARITIES)
+        catalog.append({
+            "productId": pid,
+            "name": name,
+            "groupName": set_name,
+            "extendedData": [{"name": "Number", "value": str(rng.randint(1, 300))}, {"name": "Rarity", "value": rarity}],
+        })
+    return catalog
+
+
+def noisy_query(item: dict, rng: random.Random) -> MatchQuery:
+    name = item["name"]
+    if rng.random() < 0.3:
+        name = name.lower()
+    if rng.random() < 0.2:
+        name = "".join(ACCENTS.get(c, c) if rng.random() < 0.3 else c for c in name)
+    if rng.random() < 0.2:
+        name = name.replace(" // ", "/").replace(" ", ", ", 1)
+    if rng.random() < 0.15 and len(name) > 5:
+        i = rng.randrange(1, len(name) - 1)
+        name = name[:i] + name[i + 1:]
+    set_name = item["groupName"]
+    if rng.random() < 0.4:
+        set_name = dict(SETS)[set_name]
+    number = item["extendedData"][0]["value"]
+    rarity_code = item["extendedData"][1]["value"]
+    rarity = dict(RARITIES)[rarity_code] if rng.random() < 0.7 else rarity_code
+    # Many POS exports carry only the name and set.
+    if rng.random() < 0.4:
+        return MatchQuery(name, set_name)
+    return MatchQuery(name, set_name, number.zfill(3) if rng.random() < 0.3 else number, rarity)
+
+
+def search_pools(catalog: list[dict], truth: list[dict], rng: random.Random) -> list[list[dict]]:
+    # Stand-in for search_catalog: one page of products sharing a name word with the card, always
+    # including the card itself.
+    by_word: dict[str, list[dict]] = {}
+    for item in catalog:
+        for word in set(normalize_name(item["name"]).split()):
+            by_word.setdefault(word, []).append(item)
+    pools = []
+    for item in truth:
+        related = {p["productId"]: p for w in set(normalize_name(item["name"]).split()) for p in by_word[w]}
+        related.pop(item["productId"])
+        pool = [item] + rng.sample(list(related.values()), min(SEARCH_LIMIT - 1, len(related)))
+        rng.shuffle(pool)
+        pools.append(pool)
+    return pools
+
+
+def legacy_candidates(pool: list[dict], q: MatchQuery) -> list[MatchCandidate]:
+    out = []
+    for item in pool:
+        conf = 0.6
+        if item["name"].lower() == q.card_name.lower():
+            conf += 0.3
+        if q.set_name and item["groupName"].lower() == q.set_name.lower():
+            conf += 0.1
+        out.append(MatchCandidate(item["productId"], None, item["name"], item["groupName"], None, None, None, min(conf, 0.99)))
+    out.sort(key=lambda c: c.confidence, reverse=True)
+    return out
+
+
+def outcomes(truth: list[dict], results: list[list[MatchCandidate]], min_confidence: float) -> dict[str, float]:
+    # Top-1 accuracy, plus what MatchingEngine would do: match, or send to review (ambiguous).
+    correct = ambiguous = wrong = 0
+    for item, cands in zip(truth, results):
+        top = bool(cands) and cands[0].product_id == item["productId"]
+        correct += top
+        if not cands or review_reason(cands, min_confidence):
+            ambiguous += 1
+        elif not top:
+            wrong += 1
+    n = len(truth)
+    return {"accuracy": correct / n, "ambiguous": ambiguous / n, "wrong_matches": wrong / n}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Accuracy and throughput of match_scoring vs the legacy exact-match rule")
+    parser.add_argument("--catalog", type=int, default=5000)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--reprint-rate", type=float, default=0.3)
+    parser.add_argument("--min-confidence", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    catalog = make_catalog(args.catalog, rng, args.reprint_rate)
+    truth = [rng.choice(catalog) for _ in range(args.rows)]
+    queries = [noisy_query(item, rng) for item in truth]
+    pools = search_pools(catalog, truth, rng)
+
+    t0 = time.perf_counter()
+    results = [score_candidates(pool, q) for pool, q in zip(pools, queries)]
+    elapsed = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    legacy = [legacy_candidates(pool, q) for pool, q in zip(pools, queries)]
+    legacy_elapsed = time.perf_counter() - t0
+
+    print(f"catalog={args.catalog} rows={args.rows} results_per_search<={SEARCH_LIMIT} reprint_rate={args.reprint_rate}")
+    for label, found, seconds in (("scored", results, elapsed), ("legacy", legacy, legacy_elapsed)):
+        o = outcomes(truth, found, args.min_confidence)
+        print(
+            f"{label:<8} accuracy={o['accuracy']:.3f} ambiguous={o['ambiguous']:.3f} "
+            f"wrong_matches={o['wrong_matches']:.3f} rows/sec={args.rows / seconds:,.0f}"
+        )
+
+if __name__ == "__main__":
+    main()
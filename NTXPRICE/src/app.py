@@ -3,26 +3,35 @@ from __future__ import annotations
 from datetime import datetime, timezone
 from .config import AppConfig, load_env_credentials
 from .logger import setup_logger
-from .models import ItemState, RunResult
-from .inventory_loader import load_inventory
+from .models import ItemState, RunResult, RunSummary
+from .inventory_loader import iter_inventory, load_inventory
+from .compact_store import CompactItemStore
 from .tcgplayer_provider import TCGplayerProvider
 from .matching_engine import MatchingEngine
 from .pricing_engine import PricingEngine
-from .cache_store import CacheStore
-from .history_store import HistoryStore
-from .csv_writer import write_failed_matches
+from .cache_store import CacheStore, FreshnessPolicy
+from .price_cache import PriceCache
+from .catalog_store import CatalogStore
+from .catalog_sync import sync_catalog
+from .local_catalog_provider import LocalCatalogProvider
+from .history_store import HistoryStore, run_date
+from .history_query import HistoryQuery
+from .incremental_sync import IncrementalSync
+from .run_journal import RunJournal, new_run_id
+from .pipeline import PipelinedExecutor
+from .csv_writer import CHANGES_ONLY_FIELDS, FAILED_MATCH_FIELDS, SITE_IMPORT_FIELDS, changes_only_row, failed_match_row, site_import_row
+from .export_stage import CountSink, ExportStage, HistorySink, MetricsSink, RowSink
 from .publisher import Publisher
-from .services import MetricsService
+from .price_guard import PriceGuard
+from .arrow_io import open_table_writer
+from .utils import IncrementalCsvWriter, chunked, peak_rss_mb
 
 
-def run_daily_sync(config: AppConfig, input_path: str | None = None, force: bool = False, sku_filter: str | None = None) -> RunResult:
-    logger = setup_logger(config.log_level)
-    started = datetime.now(timezone.utc)
+def build_provider(config: AppConfig, logger) -> TCGplayerProvider:
     credentials = load_env_credentials()
     if not credentials["access_token"]:
         logger.warning("No access token in env; API requests may fail")
-
-    provider = TCGplayerProvider(
+    return TCGplayerProvider(
         credentials["public_key"],
         credentials["private_key"],
         credentials["access_token"],
@@ -30,25 +39,147 @@ def run_daily_sync(config: AppConfig, input_path: str | None = None, force: bool
         retry_count=config.retry_count,
         retry_backoff=config.retry_backoff,
         sleep_between_requests=config.sleep_between_requests,
+        requests_per_second=config.requests_per_second,
+        max_concurrency=config.max_concurrency,
+        adaptive_throttling=config.adaptive_throttling,
+        min_requests_per_second=config.min_requests_per_second,
     )
 
-    rows, import_errors = load_inventory(input_path or config.inventory_csv_path)
-    items = [ItemState(inventory=r) for r in rows]
-    if sku_filter:
-        items = [i for i in items if i.inventory.sku == sku_filter]
 
-    logger.info("Imported rows=%s errors=%s", len(rows), len(import_errors))
-    for e in import_errors:
-        logger.error(e)
+def build_cache_store(config: AppConfig) -> CacheStore | None:
+    if not config.sqlite_cache_enabled:
+        return None
+    policy = FreshnessPolicy(
+        max_age_hours=config.pricing_cache_max_age_hours,
+        stale_while_revalidate_hours=config.pricing_cache_stale_hours,
+        category_max_age_hours=dict(config.pricing_cache_category_max_age_hours),
+        price_bands=[(float(b[0]), float(b[1])) for b in config.pricing_cache_price_bands],
+    )
+    return CacheStore(
+        config.sqlite_cache_path,
+        freshness=policy,
+        max_pricing_entries=config.pricing_cache_max_entries,
+        compact_interval_hours=config.cache_compact_interval_hours,
+    )
+
+
+def build_price_cache(config: AppConfig, store: CacheStore | None) -> PriceCache | None:
+    if store is None:
+        return None
+    return PriceCache(store, max_entries=config.price_cache_max_entries)
+
+
+def build_history_store(config: AppConfig, logger) -> HistoryStore:
+    return HistoryStore(config.history_csv_path, logger, backend=config.history_backend, db_path=config.history_db_path)
+
+
+def build_history_query(config: AppConfig, logger) -> HistoryQuery:
+    return HistoryQuery(build_history_store(config, logger), config.history_columns_dir, logger)
+
+
+def build_price_guard(config: AppConfig, logger, lookup_date: str | None = None) -> PriceGuard | None:
+    if config.price_guard_action == "off":
+        return None
+    history = build_history_query(config, logger) if config.price_guard_history_days > 0 else None
+    return PriceGuard(
+        logger,
+        action=config.price_guard_action,
+        history=history,
+        max_zscore=config.price_guard_max_zscore,
+        max_jump_pct=config.price_guard_max_jump_pct,
+        max_basis_deviation_pct=config.price_guard_max_basis_deviation_pct,
+        min_change=config.price_guard_min_change,
+        history_days=config.price_guard_history_days,
+        min_history_points=config.price_guard_min_history_points,
+        lookup_date=lookup_date,
+    )
 
-    matcher = MatchingEngine(provider, logger, include_out_of_stock=config.include_out_of_stock)
-    matcher.run(items)
 
-    cache = CacheStore(config.sqlite_cache_path) if config.sqlite_cache_enabled else None
-    pricer = PricingEngine(
+def report_price_guard(config: AppConfig, publisher: Publisher, diagnostics: dict) -> dict[str, str]:
+    # Writes the flagged/held report; returns the extra output file entry, if any.
+    if not publisher.guard:
+        return {}
+    publisher.write_guard_report(config.held_items_csv_path)
+    diagnostics["price_guard"] = publisher.guard_report.counts()
+    return {"held_items": config.held_items_csv_path}
+
+
+def build_export_stage(
+    config: AppConfig,
+    publisher: Publisher,
+    history_store: HistoryStore,
+    summary: RunSummary,
+    force: bool = False,
+    dry_run: bool = False,
+    lookup_date: str | None = None,
+) -> ExportStage:
+    # Every output file of a run, filled in one pass over the priced items.
+    stage = ExportStage(publisher)
+    try:
+        stage.add(HistorySink(history_store.daily_writer(force, lookup_date)))
+        stage.add(RowSink("failed_matches", IncrementalCsvWriter(config.failed_matches_csv_path, FAILED_MATCH_FIELDS), failed_match_row))
+        if dry_run:
+            stage.add(CountSink("site_import"))
+        else:
+            stage.add(RowSink(
+                "site_import",
+                open_table_writer(config.site_import_csv_path, SITE_IMPORT_FIELDS),
+                lambda i: site_import_row(i, config.include_out_of_stock, config.only_changed_export, config.only_approved_export),
+                publishes=True,
+            ))
+            if config.changes_only_csv_path:
+                stage.add(RowSink(
+                    "changes_only",
+                    open_table_writer(config.changes_only_csv_path, CHANGES_ONLY_FIELDS),
+                    lambda i: changes_only_row(i, config.include_out_of_stock, config.only_approved_export),
+                    publishes=True,
+                ))
+        stage.add(MetricsSink(summary))
+    except BaseException:
+        stage.abort()
+        raise
+    return stage
+
+
+def export_files(config: AppConfig, history_store: HistoryStore, counts: dict[str, int]) -> dict[str, str]:
+    files = {
+        "history": history_store.location,
+        "failed_matches": config.failed_matches_csv_path,
+        "site_import": config.site_import_csv_path,
+    }
+    if "changes_only" in counts:
+        files["changes_only"] = config.changes_only_csv_path
+    return files
+
+
+def log_export(logger, counts: dict[str, int], dry_run: bool) -> None:
+    logger.info("Dry-run: %s rows would be exported" if dry_run else "Published %s rows to CSV", counts["site_import"])
+
+
+def build_match_provider(config: AppConfig, provider, logger):
+    if not config.local_catalog_enabled:
+        return provider
+    return LocalCatalogProvider(CatalogStore(config.catalog_db_path), remote=provider, logger=logger)
+
+
+def build_matcher(config: AppConfig, match_provider, cache: CacheStore | None, logger) -> MatchingEngine:
+    return MatchingEngine(
+        match_provider,
+        logger,
+        include_out_of_stock=config.include_out_of_stock,
+        max_workers=config.max_concurrency,
+        cache_store=cache,
+        search_cache_ttl_hours=config.search_cache_ttl_hours,
+        min_confidence=config.min_match_confidence,
+    )
+
+
+def build_pricer(config: AppConfig, provider, cache: CacheStore | None, logger) -> PricingEngine:
+    return PricingEngine(
         provider=provider,
         logger=logger,
         cache_store=cache,
+        price_cache=build_price_cache(config, cache),
         pricing_basis=config.pricing_basis,
         undercut_amount=config.undercut_amount,
         min_price=config.min_price,
@@ -56,34 +187,238 @@ def run_daily_sync(config: AppConfig, input_path: str | None = None, force: bool
         fallback_to_current_price=config.fallback_to_current_price,
         skip_if_no_market_price=config.skip_if_no_market_price,
         minimum_change_threshold=config.minimum_change_threshold,
+        max_workers=config.max_concurrency,
     )
-    pricer.run(items)
 
-    history_store = HistoryStore(config.history_csv_path, logger)
-    history_count = history_store.append_daily(items, force=force)
-    failed_count = write_failed_matches(config.failed_matches_csv_path, items)
 
-    publisher = Publisher(logger)
-    pub = publisher.publish_csv(
-        config.site_import_csv_path,
-        items,
-        include_out_of_stock=config.include_out_of_stock,
-        only_changed=config.only_changed_export,
-        only_approved=config.only_approved_export,
-        dry_run=config.dry_run or config.write_mode == "dry_run",
+def build_pipeline(config: AppConfig, matcher: MatchingEngine, pricer: PricingEngine, logger) -> PipelinedExecutor | None:
+    if not config.pipelined:
+        return None
+    return PipelinedExecutor(matcher, pricer, logger, batch_size=config.pipeline_batch_size, queue_size=config.pipeline_queue_size)
+
+
+def match_and_price(
+    config: AppConfig,
+    matcher: MatchingEngine,
+    pricer: PricingEngine,
+    pipeline: PipelinedExecutor | None,
+    to_match: list[ItemState],
+    to_price: list[ItemState],
+    on_matched=None,
+    on_priced=None,
+) -> None:
+    if pipeline is None:
+        matcher.run(to_match, on_matched, config.checkpoint_every)
+        pricer.run(to_price, on_priced, config.checkpoint_every)
+        return
+    matching = {id(i) for i in to_match}
+    pipeline.run(to_match, [i for i in to_price if id(i) not in matching], on_matched, on_priced)
+
+
+def collect_diagnostics(summary: RunSummary, provider, match_provider, pricer: PricingEngine, logger) -> dict:
+    throttle = provider.throttle_stats()
+    summary.api_requests = throttle.requests
+    summary.throttle_events = throttle.throttled
+    summary.cache_hits = pricer.cache_stats["hits"]
+    summary.cache_misses = pricer.cache_stats["misses"]
+    summary.cache_stale = pricer.cache_stats["stale"]
+    logger.info("throttle_stats %s", throttle.as_dict())
+    logger.info("coalesce_stats %s", provider.coalesce_stats())
+    diagnostics = {"throttle": throttle.as_dict(), "coalescing": provider.coalesce_stats()}
+    if isinstance(match_provider, LocalCatalogProvider):
+        diagnostics["local_catalog"] = match_provider.stats()
+        logger.info("local_catalog_stats %s", diagnostics["local_catalog"])
+    if pricer.cache is not None:
+        diagnostics["price_cache"] = pricer.cache.stats()
+        logger.info("price_cache_stats %s", diagnostics["price_cache"])
+    return diagnostics
+
+
+def run_catalog_sync(config: AppConfig, full: bool = False) -> dict[str, int]:
+    logger = setup_logger(config.log_level)
+    provider = build_provider(config, logger)
+    store = CatalogStore(config.catalog_db_path)
+    return sync_catalog(provider, store, config.catalog_category_ids, logger, full=full, max_workers=config.max_concurrency)
+
+
+def run_daily_sync(
+    config: AppConfig,
+    input_path: str | None = None,
+    force: bool = False,
+    sku_filter: str | None = None,
+    resume: str | None = None,
+) -> RunResult:
+    if config.shards > 1:
+        from .sharded_sync import run_sharded_sync
+
+        if resume:
+            setup_logger(config.log_level).warning("Sharded runs are not journaled; ignoring --resume %s", resume)
+        return run_sharded_sync(config, input_path, force, sku_filter)
+    if config.streaming:
+        return run_streaming_sync(config, input_path, force, sku_filter, resume)
+    logger = setup_logger(config.log_level)
+    started = datetime.now(timezone.utc)
+    provider = build_provider(config, logger)
+
+    journal = RunJournal.open(resume, config.run_journal_dir) if resume else None
+    if journal:
+        input_path = input_path or journal.meta().get("input_path")
+        logger.info("Resuming run_id=%s from %s", journal.run_id, journal.path)
+    input_path = input_path or config.inventory_csv_path
+    if journal is None and config.checkpoint_every > 0:
+        journal = RunJournal.create(config.run_journal_dir, new_run_id(started), input_path)
+        logger.info("run_id=%s journal=%s", journal.run_id, journal.path)
+
+    if config.compact_items:
+        store, import_errors = CompactItemStore.load(input_path)
+        items = store.items()
+    else:
+        rows, import_errors = load_inventory(
+            input_path, workers=config.load_workers, parallel_min_bytes=int(config.parallel_load_min_mb * 1024 * 1024)
+        )
+        items = [ItemState(inventory=r) for r in rows]
+    logger.info("Imported rows=%s errors=%s", len(items), len(import_errors))
+    if sku_filter:
+        items = [i for i in items if i.inventory.sku == sku_filter]
+
+    for e in import_errors:
+        logger.error(e)
+
+    cache = build_cache_store(config)
+    pricer = build_pricer(config, provider, cache, logger)
+
+    matched: set[str] = set()
+    priced: set[str] = set()
+    redecide: list[ItemState] = []
+    if resume and journal:
+        matched, priced, redecide = journal.restore(items, pricer.settings_key())
+        logger.info("journal_restored matched=%s priced=%s", len(matched), len(priced))
+    todo = [i for i in items if RunJournal.key(i) not in priced] if priced else items
+
+    plan = None
+    if config.incremental_sync and cache is None:
+        logger.warning("incremental_sync requires sqlite_cache_enabled; running a full sync")
+    elif config.incremental_sync:
+        incremental = IncrementalSync(cache, logger)
+        plan = incremental.plan(todo)
+
+    match_provider = build_match_provider(config, provider, logger)
+    matcher = build_matcher(config, match_provider, cache, logger)
+    to_match = plan.to_match() if plan else todo
+    if matched:
+        to_match = [i for i in to_match if RunJournal.key(i) not in matched]
+    to_price = plan.to_price() if plan else todo
+    settings = pricer.settings_key()
+    pipeline = build_pipeline(config, matcher, pricer, logger)
+    match_and_price(
+        config, matcher, pricer, pipeline, to_match, to_price,
+        on_matched=journal.save_matches if journal else None,
+        on_priced=(lambda chunk: journal.save_prices(chunk, settings)) if journal else None,
     )
-    logger.info(pub.summary)
+    pricer.decide(redecide + (plan.fresh if plan else []))
+    if plan:
+        incremental.record(plan.to_price() + [i for i in items if RunJournal.key(i) in priced])
+    logger.info("pricing_cache_stats %s", pricer.cache_stats)
 
-    summary = MetricsService.summarize(items)
+    history_store = build_history_store(config, logger)
+    # Built before today's history is appended, so its columnar copy doesn't need a refresh.
+    lookup_date = run_date(started)
+    publisher = Publisher(logger, build_price_guard(config, logger, lookup_date))
+    dry_run = config.dry_run or config.write_mode == "dry_run"
+    summary = RunSummary()
+    with build_export_stage(config, publisher, history_store, summary, force, dry_run, lookup_date) as stage:
+        stage.write(items)
+    counts = stage.counts()
+    log_export(logger, counts, dry_run)
+
+    diagnostics = collect_diagnostics(summary, provider, match_provider, pricer, logger)
+    if plan:
+        diagnostics["incremental"] = plan.counts()
+    if pipeline:
+        diagnostics["pipeline"] = pipeline.stats()
+    pricer.wait_for_refresh()
+    diagnostics["peak_rss_mb"] = peak_rss_mb()
+    guard_files = report_price_guard(config, publisher, diagnostics)
+    if journal:
+        # Outputs are written; nothing left to resume.
+        journal.close(delete=True)
     ended = datetime.now(timezone.utc)
     return RunResult(
         started_at=started,
         ended_at=ended,
         summary=summary,
-        output_files={
-            "history": config.history_csv_path,
-            "failed_matches": config.failed_matches_csv_path,
-            "site_import": config.site_import_csv_path,
-        },
-        errors=import_errors + [f"failed_matches={failed_count}", f"history_written={history_count}"],
+        output_files={**export_files(config, history_store, counts), **guard_files},
+        errors=import_errors + [f"failed_matches={counts['failed_matches']}", f"history_written={counts['history']}"],
+        diagnostics=diagnostics,
+        run_id=journal.run_id if journal else "",
+    )
+
+
+def run_streaming_sync(
+    config: AppConfig,
+    input_path: str | None = None,
+    force: bool = False,
+    sku_filter: str | None = None,
+    resume: str | None = None,
+) -> RunResult:
+    # Rows flow load -> match -> price -> write in chunks of stream_chunk_size; only the current
+    # chunk is held in memory and outputs are appended as each chunk completes.
+    logger = setup_logger(config.log_level)
+    started = datetime.now(timezone.utc)
+    if resume:
+        logger.warning("Streaming runs are not journaled; ignoring --resume %s", resume)
+    provider = build_provider(config, logger)
+    cache = build_cache_store(config)
+    match_provider = build_match_provider(config, provider, logger)
+    matcher = build_matcher(config, match_provider, cache, logger)
+    pricer = build_pricer(config, provider, cache, logger)
+    incremental = IncrementalSync(cache, logger) if config.incremental_sync and cache else None
+    pipeline = build_pipeline(config, matcher, pricer, logger)
+    lookup_date = run_date(started)
+    publisher = Publisher(logger, build_price_guard(config, logger, lookup_date))
+    history_store = build_history_store(config, logger)
+    dry_run = config.dry_run or config.write_mode == "dry_run"
+
+    import_errors: list[str] = []
+    rows = iter_inventory(input_path or config.inventory_csv_path, import_errors, keep_raw=False)
+    if sku_filter:
+        rows = (r for r in rows if r.sku == sku_filter)
+
+    summary = RunSummary()
+    plan_counts: dict[str, int] = {}
+    with build_export_stage(config, publisher, history_store, summary, force, dry_run, lookup_date) as stage:
+        for chunk_no, inventory in enumerate(chunked(rows, max(1, config.stream_chunk_size)), start=1):
+            items = [ItemState(inventory=r) for r in inventory]
+            plan = incremental.plan(items) if incremental else None
+            match_and_price(config, matcher, pricer, pipeline, plan.to_match() if plan else items, plan.to_price() if plan else items)
+            if plan:
+                pricer.decide(plan.fresh)
+                incremental.record(plan.to_price())
+                for key, count in plan.counts().items():
+                    plan_counts[key] = plan_counts.get(key, 0) + count
+            stage.write(items)
+            # Per-run lookup memos would otherwise grow with the whole inventory.
+            matcher.clear_lookups()
+            provider.clear_request_cache()
+            logger.info("stream_chunk=%s rows=%s total=%s peak_rss_mb=%s", chunk_no, len(items), summary.total_rows, peak_rss_mb())
+
+    counts = stage.counts()
+    for e in import_errors:
+        logger.error(e)
+    log_export(logger, counts, dry_run)
+    diagnostics = collect_diagnostics(summary, provider, match_provider, pricer, logger)
+    if incremental:
+        diagnostics["incremental"] = plan_counts
+    if pipeline:
+        diagnostics["pipeline"] = pipeline.stats()
+    pricer.wait_for_refresh()
+    diagnostics["peak_rss_mb"] = peak_rss_mb()
+    guard_files = report_price_guard(config, publisher, diagnostics)
+    return RunResult(
+        started_at=started,
+        ended_at=datetime.now(timezone.utc),
+        summary=summary,
+        output_files={**export_files(config, history_store, counts), **guard_files},
+        errors=import_errors + [f"failed_matches={counts['failed_matches']}", f"history_written={counts['history']}"],
+        diagnostics=diagnostics,
     )
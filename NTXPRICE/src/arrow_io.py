@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from .utils import IncrementalCsvWriter
+
+# Parquet / Arrow IPC support. pyarrow is optional: it is only imported when a path with one of these
+# extensions is actually used, so CSV-only installs never need it.
+ARROW_FORMATS = {".parquet": "parquet", ".arrow": "ipc", ".feather": "ipc", ".ipc": "ipc"}
+BATCH_ROWS = 65_536
+
+# Column types for the files we write; every other field is a string column.
+FLOAT_FIELDS = {
+    "current_price", "latest_market_price", "new_price", "absolute_change", "percent_change", "market_price",
+    "low_price", "mid_price", "high_price", "suggested_site_price", "delta",
+}
+INT_FIELDS = {"quantity", "tcgplayer_product_id", "tcgplayer_sku_id"}
+BOOL_FIELDS = {"price_changed"}
+
+
+def arrow_format(path: str | Path) -> str | None:
+    # "parquet", "ipc" or None (CSV), from the file extension.
+    return ARROW_FORMATS.get(Path(path).suffix.lower())
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ImportError("Parquet/Arrow files need the optional pyarrow package (pip install pyarrow)") from exc
+    return pyarrow
+
+
+def schema_names(path: str | Path) -> list[str]:
+    pa = _pyarrow()
+    if arrow_format(path) == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(str(path), memory_map=True).schema_arrow.names
+    with pa.memory_map(str(path), "r") as source:
+        return pa.ipc.open_file(source).schema.names
+
+
+def iter_batches(path: str | Path, columns: list[str] | None = None):
+    # Record batches straight from a memory-mapped file. IPC batches point into the mapping (no copy);
+    # Parquet pages are decoded one batch at a time, and only the requested columns are read.
+    pa = _pyarrow()
+    if arrow_format(path) == "parquet":
+        import pyarrow.parquet as pq
+
+        yield from pq.ParquetFile(str(path), memory_map=True).iter_batches(BATCH_ROWS, columns=columns)
+        return
+    with pa.memory_map(str(path), "r") as source:
+        reader = pa.ipc.open_file(source)
+        for k in range(reader.num_record_batches):
+            batch = reader.get_batch(k)
+            yield batch.select(columns) if columns is not None else batch
+
+
+def open_table(path: str | Path):
+    # Whole file as a table, for random access by row index.
+    pa = _pyarrow()
+    if arrow_format(path) == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_table(str(path), memory_map=True)
+    return pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+
+
+def text_rows(data) -> Iterator[list[str]]:
+    # Rows of a batch or table with every value as CSV-style text (nulls become ""), so Arrow inventories
+    # go through exactly the same parsing and validation as CSV ones.
+    pa = _pyarrow()
+    import pyarrow.compute as pc
+
+    columns = []
+    for column in data.columns:
+        if not (pa.types.is_string(column.type) or pa.types.is_large_string(column.type)):
+            column = pc.cast(column, pa.string())
+        columns.append(pc.fill_null(column, "").to_pylist())
+    return map(list, zip(*columns))
+
+
+def iter_text_rows(path: str | Path) -> Iterator[list[str]]:
+    for batch in iter_batches(path):
+        yield from text_rows(batch)
+
+
+def text_column(column) -> list[str]:
+    # One column the way a CSV reader would return it: str() of each value, nulls as "".
+    return ["" if v is None else str(v) for v in column.to_pylist()]
+
+
+def numeric_or_text(column):
+    # Float columns as a float64 NumPy array (nulls become NaN) without per-row objects; others as text.
+    pa = _pyarrow()
+    if pa.types.is_floating(column.type):
+        return column.to_numpy(zero_copy_only=False)
+    return text_column(column)
+
+
+def _column(name: str, values: list):
+    # Accepts typed values or their CSV text (rows merged from shard files); "" and None are null.
+    pa = _pyarrow()
+    if name in FLOAT_FIELDS:
+        return pa.array([None if v is None or v == "" else float(v) for v in values], pa.float64())
+    if name in INT_FIELDS:
+        return pa.array([None if v is None or v == "" else int(v) for v in values], pa.int64())
+    if name in BOOL_FIELDS:
+        return pa.array([None if v is None or v == "" else v is True or v == "True" for v in values], pa.bool_())
+    return pa.array([None if v is None else str(v) for v in values], pa.string())
+
+
+def schema_for(fieldnames: list[str]):
+    pa = _pyarrow()
+    types = {name: _column(name, []).type for name in fieldnames}
+    return pa.schema([(name, types[name]) for name in fieldnames])
+
+
+class ArrowTableWriter:
+    # IncrementalCsvWriter's contract for Parquet / Arrow IPC files: rows are written in record batches
+    # (Parquet row groups) to a temp file next to `path`, and commit() swaps it into place atomically.
+    def __init__(self, path: str, fieldnames: list[str], batch_rows: int = BATCH_ROWS) -> None:
+        pa = _pyarrow()
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fieldnames = fieldnames
+        self.batch_rows = batch_rows
+        self.schema = schema_for(fieldnames)
+        fd, self.temp = tempfile.mkstemp(prefix="ntxprice_", suffix=self.path.suffix + ".tmp", dir=str(self.path.parent))
+        os.close(fd)
+        if arrow_format(path) == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(self.temp, self.schema)
+        else:
+            self._writer = pa.ipc.new_file(self.temp, self.schema)
+        self._pending: list[dict] = []
+        self.rows_written = 0
+
+    def write_rows(self, rows: Iterable[dict]) -> int:
+        before = self.rows_written
+        for row in rows:
+            self._pending.append(row)
+            self.rows_written += 1
+            if len(self._pending) >= self.batch_rows:
+                self._flush()
+        return self.rows_written - before
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        pa = _pyarrow()
+        arrays = [_column(name, [row.get(name) for row in self._pending]) for name in self.fieldnames]
+        self._writer.write_batch(pa.record_batch(arrays, schema=self.schema))
+        self._pending = []
+
+    def commit(self) -> None:
+        self._flush()
+        self._writer.close()
+        try:
+            os.replace(self.temp, self.path)
+        except BaseException:
+            if os.path.exists(self.temp):
+                os.unlink(self.temp)
+            raise
+
+    def abort(self) -> None:
+        self._writer.close()
+        if os.path.exists(self.temp):
+            os.unlink(self.temp)
+
+    def __enter__(self) -> ArrowTableWriter:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+def open_table_writer(path: str, fieldnames: list[str]):
+    # IncrementalCsvWriter, or ArrowTableWriter when the extension names an Arrow format.
+    if arrow_format(path):
+        return ArrowTableWriter(path, fieldnames)
+    return IncrementalCsvWriter(path, fieldnames)
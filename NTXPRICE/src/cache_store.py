@@ -1,17 +1,104 @@
 from __future__ import annotations
 
+from collections.abc import Callable
+from dataclasses import dataclass, field
+import json
 import sqlite3
+import threading
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+
+PRICING_FIELDS = ["market_price", "low_price", "mid_price", "high_price", "source", "lookup_timestamp"]
+SQL_CHUNK = 500
+
+FRESH = "fresh"
+STALE = "stale"
+EXPIRED = "expired"
+
+
+@dataclass(slots=True)
+class FreshnessPolicy:
+    max_age_hours: float = 24.0
+    stale_while_revalidate_hours: float = 24.0
+    category_max_age_hours: dict[str, float] = field(default_factory=dict)
+    # [(min_market_price, max_age_hours), ...]; the highest band the price reaches wins.
+    price_bands: list[tuple[float, float]] = field(default_factory=list)
+
+    def max_age_for(self, category: str | None, market_price: str | Decimal | None) -> float:
+        age = self.category_max_age_hours.get(category or "", self.max_age_hours)
+        try:
+            price = Decimal(market_price) if market_price not in (None, "") else None
+        except InvalidOperation:
+            price = None
+        if price is not None:
+            for threshold, band_age in sorted(self.price_bands, reverse=True):
+                if price >= Decimal(str(threshold)):
+                    age = min(age, band_age)
+                    break
+        return age
+
+    def classify(self, lookup_timestamp: str | datetime, category: str | None, market_price: str | Decimal | None, now: datetime | None = None) -> str:
+        try:
+            looked_up = lookup_timestamp if isinstance(lookup_timestamp, datetime) else datetime.fromisoformat(lookup_timestamp)
+        except (TypeError, ValueError):
+            return EXPIRED
+        if looked_up.tzinfo is None:
+            looked_up = looked_up.replace(tzinfo=timezone.utc)
+        age = ((now or datetime.now(timezone.utc)) - looked_up).total_seconds() / 3600
+        max_age = self.max_age_for(category, market_price)
+        if age <= max_age:
+            return FRESH
+        if age <= max_age + self.stale_while_revalidate_hours:
+            return STALE
+        return EXPIRED
+
+
+def search_cache_key(card_name: str, limit: int) -> str:
+    # Keyed on what search_catalog is actually sent; the set only affects scoring, not the results.
+    return "|".join([" ".join(card_name.lower().split()), str(limit)])
 
 
 class CacheStore:
-    def __init__(self, db_path: str) -> None:
+    def __init__(
+        self,
+        db_path: str,
+        freshness: FreshnessPolicy | None = None,
+        max_pricing_entries: int = 0,
+        compact_interval_hours: float = 168.0,
+    ) -> None:
+        self.freshness = freshness or FreshnessPolicy()
+        self.max_pricing_entries = max_pricing_entries
+        self.compact_interval_hours = compact_interval_hours
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(db_path)
+        # Engines may call in from worker threads; all access goes through one lock. Shard processes
+        # share the file, so writers wait for each other instead of failing fast.
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30.0)
+        self._lock = threading.Lock()
+        self._listeners: list[Callable[[list[str] | None], None]] = []
+        self._configure()
         self._init_schema()
 
+    def _configure(self) -> None:
+        # WAL lets readers proceed during writes; NORMAL sync is safe with WAL and avoids an fsync per commit.
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA cache_size=-65536")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+
+    def subscribe(self, listener: Callable[[list[str] | None], None]) -> None:
+        # Called with the pricing keys written or deleted (None = everything may have changed).
+        self._listeners.append(listener)
+
+    def _notify(self, keys: list[str] | None) -> None:
+        for listener in self._listeners:
+            listener(keys)
+
     def _init_schema(self) -> None:
+        with self._lock:
+            self._create_tables()
+
+    def _create_tables(self) -> None:
         cur = self.conn.cursor()
         cur.execute(
             """
@@ -22,10 +109,16 @@ class CacheStore:
               mid_price TEXT,
               high_price TEXT,
               source TEXT,
-              lookup_timestamp TEXT
+              lookup_timestamp TEXT,
+              last_access TEXT
             )
             """
         )
+        columns = {r[1] for r in cur.execute("PRAGMA table_info(pricing_cache)")}
+        if "last_access" not in columns:
+            cur.execute("ALTER TABLE pricing_cache ADD COLUMN last_access TEXT")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_pricing_cache_access ON pricing_cache(last_access)")
+        cur.execute("CREATE TABLE IF NOT EXISTS cache_meta (key TEXT PRIMARY KEY, value TEXT)")
         cur.execute(
             """
             CREATE TABLE IF NOT EXISTS manual_overrides (
@@ -37,24 +130,73 @@ class CacheStore:
             )
             """
         )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS match_resolutions (
+              sku TEXT PRIMARY KEY,
+              product_id INTEGER,
+              sku_id INTEGER,
+              product_name TEXT,
+              method TEXT,
+              confidence REAL,
+              fingerprint TEXT,
+              do_not_update INTEGER DEFAULT 0,
+              updated_at TEXT
+            )
+            """
+        )
+        # Overrides saved before match_resolutions existed; NULL fingerprint means "always valid".
+        cur.execute(
+            "INSERT OR IGNORE INTO match_resolutions(sku,product_id,sku_id,method,confidence,fingerprint,do_not_update,updated_at) "
+            "SELECT sku,product_id,sku_id,'manual',1.0,NULL,do_not_update,updated_at FROM manual_overrides"
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS row_state (
+              sku TEXT PRIMARY KEY,
+              row_hash TEXT,
+              match TEXT,
+              price TEXT,
+              do_not_update INTEGER DEFAULT 0,
+              error TEXT,
+              updated_at TEXT
+            )
+            """
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS search_cache (
+              key TEXT PRIMARY KEY,
+              card_name TEXT,
+              results TEXT,
+              cached_at TEXT
+            )
+            """
+        )
         self.conn.commit()
 
     def get_pricing_cache(self, key: str) -> dict | None:
-        row = self.conn.execute("SELECT market_price,low_price,mid_price,high_price,source,lookup_timestamp FROM pricing_cache WHERE key=?", (key,)).fetchone()
-        if not row:
-            return None
-        return {
-            "market_price": row[0],
-            "low_price": row[1],
-            "mid_price": row[2],
-            "high_price": row[3],
-            "source": row[4],
-            "lookup_timestamp": row[5],
-        }
+        return self.get_many([key]).get(key)
 
     def set_pricing_cache(self, key: str, payload: dict) -> None:
-        self.conn.execute(
-            "REPLACE INTO pricing_cache(key,market_price,low_price,mid_price,high_price,source,lookup_timestamp) VALUES(?,?,?,?,?,?,?)",
+        self.set_many({key: payload})
+
+    def get_many(self, keys: list[str]) -> dict[str, dict]:
+        out: dict[str, dict] = {}
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for i in range(0, len(keys), SQL_CHUNK):
+                chunk = keys[i:i + SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                for row in self.conn.execute(f"SELECT key,{','.join(PRICING_FIELDS)} FROM pricing_cache WHERE key IN ({marks})", chunk):
+                    out[row[0]] = dict(zip(PRICING_FIELDS, row[1:]))
+        return out
+
+    def set_many(self, payloads: dict[str, dict]) -> None:
+        if not payloads:
+            return
+        now = datetime.utcnow().isoformat()
+        rows = [
             (
                 key,
                 payload.get("market_price"),
@@ -62,14 +204,164 @@ class CacheStore:
                 payload.get("mid_price"),
                 payload.get("high_price"),
                 payload.get("source"),
-                payload.get("lookup_timestamp", datetime.utcnow().isoformat()),
-            ),
-        )
-        self.conn.commit()
+                payload.get("lookup_timestamp", now),
+                now,
+            )
+            for key, payload in payloads.items()
+        ]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "REPLACE INTO pricing_cache(key,market_price,low_price,mid_price,high_price,source,lookup_timestamp,last_access) VALUES(?,?,?,?,?,?,?,?)",
+                rows,
+            )
+        self._notify(list(payloads))
+
+    def touch_pricing(self, keys: list[str]) -> None:
+        if not keys:
+            return
+        now = datetime.utcnow().isoformat()
+        with self._lock, self.conn:
+            self.conn.executemany("UPDATE pricing_cache SET last_access=? WHERE key=?", [(now, k) for k in keys])
+
+    def evict_pricing(self, max_entries: int | None = None) -> int:
+        limit = self.max_pricing_entries if max_entries is None else max_entries
+        if limit <= 0:
+            return 0
+        with self._lock, self.conn:
+            count = self.conn.execute("SELECT COUNT(*) FROM pricing_cache").fetchone()[0]
+            if count <= limit:
+                return 0
+            keys = [r[0] for r in self.conn.execute(
+                "SELECT key FROM pricing_cache ORDER BY COALESCE(last_access, lookup_timestamp) ASC LIMIT ?",
+                (count - limit,),
+            )]
+            self.conn.executemany("DELETE FROM pricing_cache WHERE key=?", [(k,) for k in keys])
+        self._notify(keys)
+        return len(keys)
+
+    def maybe_compact(self, now: datetime | None = None) -> bool:
+        now = now or datetime.utcnow()
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM cache_meta WHERE key='last_compacted'").fetchone()
+            if row and datetime.fromisoformat(row[0]) > now - timedelta(hours=self.compact_interval_hours):
+                return False
+            # Entries past every freshness window can never be served again.
+            horizon = max([self.freshness.max_age_hours, *self.freshness.category_max_age_hours.values()])
+            cutoff = now - timedelta(hours=horizon + self.freshness.stale_while_revalidate_hours)
+            removed = self.conn.execute("DELETE FROM pricing_cache WHERE lookup_timestamp < ?", (cutoff.isoformat(),)).rowcount
+            self.conn.execute("REPLACE INTO cache_meta(key,value) VALUES('last_compacted',?)", (now.isoformat(),))
+            self.conn.commit()
+            self.conn.execute("VACUUM")
+        if removed:
+            self._notify(None)
+        return True
+
+    def maintain(self, touched_keys: list[str]) -> None:
+        self.touch_pricing(touched_keys)
+        self.evict_pricing()
+        self.maybe_compact()
 
     def set_manual_override(self, sku: str, product_id: int | None, sku_id: int | None, do_not_update: bool = False) -> None:
-        self.conn.execute(
-            "REPLACE INTO manual_overrides(sku,product_id,sku_id,do_not_update,updated_at) VALUES(?,?,?,?,?)",
-            (sku, product_id, sku_id, int(do_not_update), datetime.utcnow().isoformat()),
-        )
-        self.conn.commit()
+        now = datetime.utcnow().isoformat()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "REPLACE INTO manual_overrides(sku,product_id,sku_id,do_not_update,updated_at) VALUES(?,?,?,?,?)",
+                (sku, product_id, sku_id, int(do_not_update), now),
+            )
+            self.conn.execute(
+                "REPLACE INTO match_resolutions(sku,product_id,sku_id,product_name,method,confidence,fingerprint,do_not_update,updated_at) VALUES(?,?,?,?,?,?,?,?,?)",
+                (sku, product_id, sku_id, None, "manual", 1.0, None, int(do_not_update), now),
+            )
+
+    def get_match_resolutions(self, skus: list[str]) -> dict[str, dict]:
+        out: dict[str, dict] = {}
+        cols = ["sku", "product_id", "sku_id", "product_name", "method", "confidence", "fingerprint", "do_not_update", "updated_at"]
+        with self._lock:
+            for i in range(0, len(skus), SQL_CHUNK):
+                chunk = skus[i:i + SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                for row in self.conn.execute(f"SELECT {','.join(cols)} FROM match_resolutions WHERE sku IN ({marks})", chunk):
+                    out[row[0]] = dict(zip(cols, row))
+        return out
+
+    def set_match_resolutions(self, records: list[dict]) -> None:
+        if not records:
+            return
+        now = datetime.utcnow().isoformat()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "REPLACE INTO match_resolutions(sku,product_id,sku_id,product_name,method,confidence,fingerprint,do_not_update,updated_at) VALUES(?,?,?,?,?,?,?,?,?)",
+                [
+                    (r["sku"], r.get("product_id"), r.get("sku_id"), r.get("product_name"), r.get("method"), r.get("confidence"),
+                     r.get("fingerprint"), int(bool(r.get("do_not_update"))), now)
+                    for r in records
+                ],
+            )
+
+    def get_match_resolution_times(self, skus: list[str]) -> dict[str, str]:
+        out: dict[str, str] = {}
+        with self._lock:
+            for i in range(0, len(skus), SQL_CHUNK):
+                chunk = skus[i:i + SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                out.update(self.conn.execute(f"SELECT sku,updated_at FROM match_resolutions WHERE sku IN ({marks})", chunk).fetchall())
+        return out
+
+    def get_row_states(self, skus: list[str]) -> dict[str, dict]:
+        out: dict[str, dict] = {}
+        with self._lock:
+            for i in range(0, len(skus), SQL_CHUNK):
+                chunk = skus[i:i + SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                for sku, row_hash, match, price, dnu, error, updated_at in self.conn.execute(
+                    f"SELECT sku,row_hash,match,price,do_not_update,error,updated_at FROM row_state WHERE sku IN ({marks})", chunk
+                ):
+                    out[sku] = {
+                        "row_hash": row_hash,
+                        "match": json.loads(match) if match else None,
+                        "price": json.loads(price) if price else None,
+                        "do_not_update": bool(dnu),
+                        "error": error,
+                        "updated_at": updated_at,
+                    }
+        return out
+
+    def set_row_states(self, records: list[dict]) -> None:
+        if not records:
+            return
+        now = datetime.utcnow().isoformat()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "REPLACE INTO row_state(sku,row_hash,match,price,do_not_update,error,updated_at) VALUES(?,?,?,?,?,?,?)",
+                [
+                    (r["sku"], r["row_hash"], json.dumps(r.get("match")), json.dumps(r["price"]) if r.get("price") else None,
+                     int(bool(r.get("do_not_update"))), r.get("error"), now)
+                    for r in records
+                ],
+            )
+
+    def get_search_cache(self, key: str, max_age_hours: float | None = None) -> list[dict] | None:
+        with self._lock:
+            row = self.conn.execute("SELECT results,cached_at FROM search_cache WHERE key=?", (key,)).fetchone()
+        if not row:
+            return None
+        if max_age_hours is not None and datetime.fromisoformat(row[1]) < datetime.utcnow() - timedelta(hours=max_age_hours):
+            return None
+        return json.loads(row[0])
+
+    def set_search_cache(self, key: str, card_name: str, results: list[dict]) -> None:
+        with self._lock:
+            self.conn.execute(
+                "REPLACE INTO search_cache(key,card_name,results,cached_at) VALUES(?,?,?,?)",
+                (key, " ".join(card_name.lower().split()), json.dumps(results), datetime.utcnow().isoformat()),
+            )
+            self.conn.commit()
+
+    def invalidate_search_cache(self, card_name: str | None = None) -> int:
+        with self._lock:
+            if card_name is None:
+                cur = self.conn.execute("DELETE FROM search_cache")
+            else:
+                cur = self.conn.execute("DELETE FROM search_cache WHERE card_name=?", (" ".join(card_name.lower().split()),))
+            self.conn.commit()
+            return cur.rowcount
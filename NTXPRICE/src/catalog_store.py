@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+
+class CatalogStore:
+    def __init__(self, db_path: str) -> None:
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.fts_enabled = False
+        self._init_schema()
+
+    def _init_schema(self) -> None:
+        with self._lock:
+            cur = self.conn.cursor()
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS catalog_groups (
+                  group_id INTEGER PRIMARY KEY,
+                  category_id INTEGER,
+                  name TEXT,
+                  abbreviation TEXT,
+                  modified_on TEXT,
+                  synced_at TEXT
+                )
+                """
+            )
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS catalog_products (
+                  product_id INTEGER PRIMARY KEY,
+                  group_id INTEGER,
+                  category_id INTEGER,
+                  name TEXT,
+                  group_name TEXT,
+                  data TEXT,
+                  modified_on TEXT
+                )
+                """
+            )
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS catalog_skus (
+                  sku_id INTEGER PRIMARY KEY,
+                  product_id INTEGER,
+                  data TEXT
+                )
+                """
+            )
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_catalog_products_group ON catalog_products(group_id)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_catalog_skus_product ON catalog_skus(product_id)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_catalog_products_name ON catalog_products(name COLLATE NOCASE)")
+            try:
+                cur.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS catalog_products_fts USING fts5("
+                    "name, group_name, content='catalog_products', content_rowid='product_id', tokenize='trigram')"
+                )
+                self.fts_enabled = True
+            except sqlite3.OperationalError:
+                # SQLite without FTS5/trigram support falls back to LIKE queries.
+                self.fts_enabled = False
+            self.conn.commit()
+
+    def group_modified_on(self) -> dict[int, str]:
+        with self._lock:
+            rows = self.conn.execute("SELECT group_id, modified_on FROM catalog_groups").fetchall()
+        return {r[0]: r[1] or "" for r in rows}
+
+    def replace_group(self, group: dict, products: list[dict]) -> int:
+        group_id = int(group["groupId"])
+        group_name = group.get("name")
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            cur = self.conn.cursor()
+            old_ids = [r[0] for r in cur.execute("SELECT product_id FROM catalog_products WHERE group_id=?", (group_id,))]
+            if self.fts_enabled and old_ids:
+                cur.executemany(
+                    "INSERT INTO catalog_products_fts(catalog_products_fts, rowid, name, group_name) "
+                    "SELECT 'delete', product_id, name, group_name FROM catalog_products WHERE product_id=?",
+                    [(i,) for i in old_ids],
+                )
+            cur.executemany("DELETE FROM catalog_skus WHERE product_id=?", [(i,) for i in old_ids])
+            cur.execute("DELETE FROM catalog_products WHERE group_id=?", (group_id,))
+
+            product_rows = []
+            sku_rows = []
+            for p in products:
+                product_id = int(p["productId"])
+                skus = p.get("skus") or []
+                data = {k: v for k, v in p.items() if k != "skus"}
+                data.setdefault("groupName", group_name)
+                product_rows.append((product_id, group_id, group.get("categoryId"), p.get("name"), group_name, json.dumps(data), p.get("modifiedOn")))
+                for sku in skus:
+                    sku_rows.append((int(sku["skuId"]), product_id, json.dumps(sku)))
+            cur.executemany("INSERT OR REPLACE INTO catalog_products VALUES(?,?,?,?,?,?,?)", product_rows)
+            cur.executemany("INSERT OR REPLACE INTO catalog_skus VALUES(?,?,?)", sku_rows)
+            if self.fts_enabled:
+                cur.executemany(
+                    "INSERT INTO catalog_products_fts(rowid, name, group_name) VALUES(?,?,?)",
+                    [(r[0], r[3], r[4]) for r in product_rows],
+                )
+            cur.execute(
+                "REPLACE INTO catalog_groups VALUES(?,?,?,?,?,?)",
+                (group_id, group.get("categoryId"), group_name, group.get("abbreviation"), group.get("modifiedOn"), now),
+            )
+            self.conn.commit()
+        return len(product_rows)
+
+    def get_products(self, product_ids: list[int]) -> dict[int, dict]:
+        if not product_ids:
+            return {}
+        out: dict[int, dict] = {}
+        with self._lock:
+            for i in range(0, len(product_ids), 500):
+                chunk = product_ids[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                for product_id, data in self.conn.execute(f"SELECT product_id, data FROM catalog_products WHERE product_id IN ({marks})", chunk):
+                    out[product_id] = json.loads(data)
+        return out
+
+    def get_skus(self, sku_ids: list[int]) -> dict[int, dict]:
+        if not sku_ids:
+            return {}
+        out: dict[int, dict] = {}
+        with self._lock:
+            for i in range(0, len(sku_ids), 500):
+                chunk = sku_ids[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT s.sku_id, s.data, p.name FROM catalog_skus s LEFT JOIN catalog_products p ON p.product_id=s.product_id WHERE s.sku_id IN ({marks})",
+                    chunk,
+                )
+                for sku_id, data, product_name in rows:
+                    sku = json.loads(data)
+                    sku.setdefault("productName", product_name)
+                    out[sku_id] = sku
+        return out
+
+    def search(self, card_name: str, limit: int = 20) -> list[dict]:
+        name = " ".join(card_name.split())
+        if not name:
+            return []
+        with self._lock:
+            if self.fts_enabled and len(name) >= 3:
+                query = 'name : "' + name.replace('"', '""') + '"'
+                rows = self.conn.execute(
+                    "SELECT p.data FROM catalog_products_fts f JOIN catalog_products p ON p.product_id=f.rowid "
+                    "WHERE catalog_products_fts MATCH ? ORDER BY (p.name = ? COLLATE NOCASE) DESC, rank LIMIT ?",
+                    (query, name, limit),
+                ).fetchall()
+            else:
+                escaped = name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                rows = self.conn.execute(
+                    "SELECT data FROM catalog_products WHERE name LIKE ? ESCAPE '\\' "
+                    "ORDER BY (name = ? COLLATE NOCASE) DESC, length(name) LIMIT ?",
+                    (f"%{escaped}%", name, limit),
+                ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "groups": self.conn.execute("SELECT COUNT(*) FROM catalog_groups").fetchone()[0],
+                "products": self.conn.execute("SELECT COUNT(*) FROM catalog_products").fetchone()[0],
+                "skus": self.conn.execute("SELECT COUNT(*) FROM catalog_skus").fetchone()[0],
+            }
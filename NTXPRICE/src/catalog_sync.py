@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from .catalog_store import CatalogStore
+from .utils import map_ordered
+
+
+def sync_catalog(provider, store: CatalogStore, category_ids: list[int], logger, full: bool = False, max_workers: int = 1) -> dict[str, int]:
+    stats = {"groups_seen": 0, "groups_synced": 0, "products": 0}
+    known = store.group_modified_on()
+    for category_id in category_ids:
+        groups = provider.get_groups(category_id)
+        stats["groups_seen"] += len(groups)
+        stale = [
+            g for g in groups
+            if full or int(g["groupId"]) not in known or (g.get("modifiedOn") or "") > known[int(g["groupId"])]
+        ]
+        logger.info("catalog_sync category=%s groups=%s stale=%s", category_id, len(groups), len(stale))
+
+        # Fetch a window of groups at a time so a full sync never holds the whole catalog in memory.
+        window = max(1, max_workers) * 4
+        for start in range(0, len(stale), window):
+            batch = stale[start:start + window]
+            for group, products in zip(batch, map_ordered(lambda g: provider.get_group_products(int(g["groupId"])), batch, max_workers)):
+                group.setdefault("categoryId", category_id)
+                stats["products"] += store.replace_group(group, products)
+                stats["groups_synced"] += 1
+    logger.info("catalog_sync done %s", stats)
+    return stats
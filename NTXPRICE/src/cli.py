@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import argparse
 from .config import load_config
-from .app import run_daily_sync
+from .app import build_cache_store, build_history_query, build_history_store, run_daily_sync, run_catalog_sync
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -15,6 +15,24 @@ def build_parser() -> argparse.ArgumentParser:
     p.add_argument("--sku")
     p.add_argument("--export-changed-only", action="store_true")
     p.add_argument("--gui", action="store_true")
+    p.add_argument("--clear-search-cache", action="store_true")
+    p.add_argument("--sync-catalog", action="store_true")
+    p.add_argument("--full-catalog-sync", action="store_true")
+    p.add_argument("--incremental", action="store_true")
+    p.add_argument("--resume", metavar="RUN_ID")
+    p.add_argument("--stream", action="store_true")
+    p.add_argument("--pipelined", action="store_true")
+    p.add_argument("--shards", type=int)
+    p.add_argument("--compact-items", action="store_true")
+    p.add_argument("--shard-key", choices=["sku", "set_name"])
+    p.add_argument("--history-backend", choices=["csv", "sqlite"])
+    p.add_argument("--price-guard", choices=["off", "flag", "hold"])
+    p.add_argument("--export-history", metavar="PATH")
+    p.add_argument("--history-since", metavar="YYYY-MM-DD")
+    p.add_argument("--history-sku")
+    p.add_argument("--history-set")
+    p.add_argument("--history-days", type=int, default=90)
+    p.add_argument("--trend-window", type=int, default=7)
     return p
 
 
@@ -27,13 +45,58 @@ def run_cli() -> int:
         cfg.include_out_of_stock = False
     if args.export_changed_only:
         cfg.only_changed_export = True
+    if args.incremental:
+        cfg.incremental_sync = True
+    if args.stream:
+        cfg.streaming = True
+    if args.pipelined:
+        cfg.pipelined = True
+    if args.shards:
+        cfg.shards = args.shards
+    if args.compact_items:
+        cfg.compact_items = True
+    if args.shard_key:
+        cfg.shard_key = args.shard_key
+    if args.history_backend:
+        cfg.history_backend = args.history_backend
+    if args.price_guard:
+        cfg.price_guard_action = args.price_guard
+    if args.clear_search_cache:
+        if not cfg.sqlite_cache_enabled:
+            print("SQLite cache is disabled; no cached searches to clear")
+            return 0
+        cleared = build_cache_store(cfg).invalidate_search_cache()
+        print(f"Cleared {cleared} cached searches")
+        return 0
+
+    if args.export_history:
+        from .logger import setup_logger
+        count = build_history_store(cfg, setup_logger(cfg.log_level)).export_csv(args.export_history, since=args.history_since)
+        print(f"Exported {count} history rows to {args.export_history}")
+        return 0
+
+    if args.history_sku or args.history_set:
+        from .history_query import HistoryQuery
+        from .logger import setup_logger
+        query = build_history_query(cfg, setup_logger(cfg.log_level))
+        data = query.sku(args.history_sku, days=args.history_days) if args.history_sku else query.set(args.history_set, days=args.history_days)
+        for trend in HistoryQuery.trends(data, window=args.trend_window):
+            print(trend)
+        return 0
+
+    if args.sync_catalog or args.full_catalog_sync:
+        stats = run_catalog_sync(cfg, full=args.full_catalog_sync)
+        print(f"Catalog sync completed: {stats}")
+        return 0
 
     if args.gui:
         from .gui.main_window import run_gui
         run_gui(cfg)
         return 0
 
-    result = run_daily_sync(cfg, input_path=args.input, force=args.force, sku_filter=args.sku)
+    result = run_daily_sync(cfg, input_path=args.input, force=args.force, sku_filter=args.sku, resume=args.resume)
     print("NTXPRICE completed")
     print(result.summary)
+    if result.diagnostics.get("peak_rss_mb") is not None:
+        print(f"Peak RSS: {result.diagnostics['peak_rss_mb']} MB")
     return 0
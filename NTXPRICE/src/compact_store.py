@@ -0,0 +1,624 @@
+from __future__ import annotations
+
+import csv
+import os
+import threading
+from array import array
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+from .arrow_io import arrow_format, iter_text_rows, open_table, schema_names, text_rows
+from .inventory_loader import _fast_rows, _raw_dict
+from .models import InventoryRow, ItemState, MatchResult, MatchStatus, PriceResult, PricingBasis, PricingDecision
+from .validators import validate_columns
+
+NO_INT = -(2**63)  # int64 columns store None as this
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class StringPool:
+    # Each distinct string is kept once and columns hold its code; code 0 is None. Interning is locked
+    # because matching and pricing assign results from worker threads.
+    def __init__(self) -> None:
+        self.strings: list[str | None] = [None]
+        self._codes: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def code(self, value: str | None) -> int:
+        if value is None:
+            return 0
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    code = len(self.strings)
+                    self.strings.append(value)
+                    self._codes[value] = code
+        return code
+
+    def __len__(self) -> int:
+        return len(self.strings) - 1
+
+
+class _Str:
+    def __init__(self, pool: StringPool) -> None:
+        self.pool = pool
+        self.codes = array("i")
+
+    def append(self, value) -> None:
+        self.codes.append(self.pool.code(value))
+
+    def grow(self) -> None:
+        self.codes.append(0)
+
+    def put(self, i: int, value) -> None:
+        self.codes[i] = self.pool.code(value)
+
+    def get(self, i: int):
+        return self.pool.strings[self.codes[i]]
+
+
+class _Int:
+    def __init__(self) -> None:
+        self.values = array("q")
+
+    def append(self, value) -> None:
+        self.values.append(NO_INT if value is None else value)
+
+    def grow(self) -> None:
+        self.values.append(NO_INT)
+
+    def put(self, i: int, value) -> None:
+        self.values[i] = NO_INT if value is None else value
+
+    def get(self, i: int):
+        value = self.values[i]
+        return None if value == NO_INT else value
+
+
+class _Float:
+    def __init__(self) -> None:
+        self.values = array("d")
+
+    def grow(self) -> None:
+        self.values.append(0.0)
+
+    def put(self, i: int, value) -> None:
+        self.values[i] = value
+
+    def get(self, i: int):
+        return self.values[i]
+
+
+class _Flag:
+    def __init__(self) -> None:
+        self.values = bytearray()
+
+    def grow(self) -> None:
+        self.values.append(0)
+
+    def put(self, i: int, value) -> None:
+        self.values[i] = bool(value)
+
+    def get(self, i: int):
+        return bool(self.values[i])
+
+
+class _Enum:
+    def __init__(self, enum) -> None:
+        self.members = list(enum)
+        self.codes_by_member = {m: k for k, m in enumerate(self.members)}
+        self.values = bytearray()
+
+    def grow(self) -> None:
+        self.values.append(0)
+
+    def put(self, i: int, value) -> None:
+        self.values[i] = self.codes_by_member[value]
+
+    def get(self, i: int):
+        return self.members[self.values[i]]
+
+
+class _Sparse:
+    # Values that are usually empty (errors, candidate lists): only rows that have one take space.
+    def __init__(self, empty=None) -> None:
+        self.values: dict[int, object] = {}
+        self.empty = empty
+
+    def put(self, i: int, value) -> None:
+        if value:
+            self.values[i] = value
+        else:
+            self.values.pop(i, None)
+
+    def get(self, i: int):
+        value = self.values.get(i)
+        if value is None:
+            return self.empty() if self.empty else None
+        return value
+
+
+class _Money:
+    # Decimal as an int64 coefficient and a power-of-ten exponent, so 12.34 is stored as 1234 cents
+    # with exponent -2 and comes back with the same digits and scale. NaN, -0 and anything too wide
+    # for int64 are kept as-is in `extra`.
+    def __init__(self) -> None:
+        self.coef = array("q")
+        self.exp = array("b")
+        self.extra: dict[int, Decimal] = {}
+
+    def _pack(self, i: int, value: Decimal | None) -> tuple[int, int]:
+        self.extra.pop(i, None)
+        if value is None:
+            return NO_INT, 0
+        sign, _, exp = value.as_tuple()
+        if isinstance(exp, int) and -128 <= exp <= 127:
+            coef = int(value.scaleb(-exp))
+            if NO_INT < coef < 2**63 and (coef or not sign):
+                return coef, exp
+        self.extra[i] = value
+        return NO_INT, 0
+
+    def append(self, value: Decimal | None) -> None:
+        coef, exp = self._pack(len(self.coef), value)
+        self.coef.append(coef)
+        self.exp.append(exp)
+
+    def grow(self) -> None:
+        self.coef.append(NO_INT)
+        self.exp.append(0)
+
+    def put(self, i: int, value: Decimal | None) -> None:
+        self.coef[i], self.exp[i] = self._pack(i, value)
+
+    def get(self, i: int) -> Decimal | None:
+        coef = self.coef[i]
+        if coef == NO_INT:
+            return self.extra.get(i)
+        return Decimal(coef).scaleb(self.exp[i])
+
+
+class _Time:
+    # UTC datetimes as int64 microseconds since the epoch; other timezones are kept as-is in `extra`.
+    def __init__(self) -> None:
+        self.values = array("q")
+        self.extra: dict[int, datetime] = {}
+
+    def _pack(self, i: int, value: datetime) -> int:
+        self.extra.pop(i, None)
+        if value.tzinfo is timezone.utc:
+            return (value - _EPOCH) // _MICROSECOND
+        self.extra[i] = value
+        return NO_INT
+
+    def grow(self) -> None:
+        self.values.append(NO_INT)
+
+    def put(self, i: int, value: datetime) -> None:
+        self.values[i] = self._pack(i, value)
+
+    def get(self, i: int) -> datetime:
+        value = self.values[i]
+        if value == NO_INT:
+            return self.extra[i]
+        return _EPOCH + value * _MICROSECOND
+
+
+class _Records:
+    # One dataclass type stored column-wise (columns in field order); rows without a record hold
+    # placeholders. get() rebuilds an object from the columns and remembers the last one built or
+    # assigned, because writers read several attributes of the same item in a row. Returned objects
+    # are snapshots: assign a new object to change a record.
+    def __init__(self, cls, columns: dict, default=None) -> None:
+        self.cls = cls
+        self.columns = list(columns.items())
+        self.dense = [col for _, col in self.columns if not isinstance(col, _Sparse)]
+        self.present = bytearray()
+        self.default = default
+        self._last: tuple[int, object] = (-1, None)
+
+    def add(self, obj=None) -> None:
+        i = len(self.present)
+        self.present.append(0)
+        for col in self.dense:
+            col.grow()
+        if obj is not None:
+            self.put(i, obj)
+
+    def put(self, i: int, obj) -> None:
+        self._last = (-1, None)
+        if obj is None:
+            self.present[i] = 0
+            for _, col in self.columns:
+                if isinstance(col, _Sparse):
+                    col.put(i, None)
+            return
+        for name, col in self.columns:
+            col.put(i, getattr(obj, name))
+        self.present[i] = 1
+        self._last = (i, obj)
+
+    def get(self, i: int):
+        last = self._last
+        if last[0] == i:
+            return last[1]
+        if not self.present[i]:
+            return self.default() if self.default else None
+        obj = self.cls(*[col.get(i) for _, col in self.columns])
+        self._last = (i, obj)
+        return obj
+
+
+class InventoryTable:
+    # InventoryRow fields as columns. validation_errors is sparse; raw_data is not held at all but
+    # re-read from the source when asked for: from the record's byte offset in a CSV, or from the
+    # record's row index in a (memory-mapped) Arrow file.
+    def __init__(self, pool: StringPool, fieldnames: list[str], source: str | None) -> None:
+        self.fieldnames = fieldnames
+        self.source = source
+        self.row_number = _Int()
+        self.sku = _Str(pool)
+        self.card_name = _Str(pool)
+        self.set_name = _Str(pool)
+        self.card_number = _Str(pool)
+        self.rarity = _Str(pool)
+        self.finish = _Str(pool)
+        self.language = _Str(pool)
+        self.quantity = _Int()
+        self.current_price = _Money()
+        self.tcgplayer_product_id = _Int()
+        self.tcgplayer_sku_id = _Int()
+        self.tcgplayer_url = _Str(pool)
+        self.category = _Str(pool)
+        self.notes = _Str(pool)
+        self.errors = _Sparse(list)
+        self.offsets = array("q")
+        self._stamp = self._source_stamp()
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _source_stamp(self) -> tuple[int, int] | None:
+        if not self.source:
+            return None
+        st = os.stat(self.source)
+        return st.st_size, st.st_mtime_ns
+
+    def add(self, row: InventoryRow, offset: int = -1) -> int:
+        i = len(self.row_number.values)
+        self.row_number.append(row.row_number)
+        self.sku.append(row.sku)
+        self.card_name.append(row.card_name)
+        self.set_name.append(row.set_name)
+        self.card_number.append(row.card_number)
+        self.rarity.append(row.rarity)
+        self.finish.append(row.finish)
+        self.language.append(row.language)
+        self.quantity.append(row.quantity)
+        self.current_price.append(row.current_price)
+        self.tcgplayer_product_id.append(row.tcgplayer_product_id)
+        self.tcgplayer_sku_id.append(row.tcgplayer_sku_id)
+        self.tcgplayer_url.append(row.tcgplayer_url)
+        self.category.append(row.category)
+        self.notes.append(row.notes)
+        self.errors.put(i, row.validation_errors)
+        self.offsets.append(offset)
+        return i
+
+    def raw(self, i: int) -> dict:
+        offset = self.offsets[i]
+        if offset < 0 or not self.source:
+            return {}
+        with self._lock:
+            if self._source_stamp() != self._stamp:
+                raise RuntimeError(f"Inventory file changed since it was loaded: {self.source}")
+            if arrow_format(self.source):
+                if self._file is None:
+                    self._file = open_table(self.source)
+                return _raw_dict(self.fieldnames, next(text_rows(self._file.slice(offset, 1))))
+            if self._file is None:
+                self._file = open(self.source, "rb")
+            self._file.seek(offset)
+            lines = (line.decode("utf-8") for line in iter(self._file.readline, b""))
+            return _raw_dict(self.fieldnames, next(csv.reader(lines), []))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None and not arrow_format(self.source):
+                self._file.close()
+            self._file = None
+
+
+class InventoryView:
+    # Read-only InventoryRow look-alike over one row of an InventoryTable.
+    __slots__ = ("_t", "_i")
+
+    def __init__(self, table: InventoryTable, index: int) -> None:
+        self._t = table
+        self._i = index
+
+    @property
+    def row_number(self) -> int:
+        return self._t.row_number.values[self._i]
+
+    @property
+    def sku(self) -> str:
+        return self._t.sku.get(self._i)
+
+    @property
+    def card_name(self) -> str:
+        return self._t.card_name.get(self._i)
+
+    @property
+    def set_name(self) -> str:
+        return self._t.set_name.get(self._i)
+
+    @property
+    def card_number(self) -> str:
+        return self._t.card_number.get(self._i)
+
+    @property
+    def rarity(self) -> str:
+        return self._t.rarity.get(self._i)
+
+    @property
+    def finish(self) -> str:
+        return self._t.finish.get(self._i)
+
+    @property
+    def language(self) -> str:
+        return self._t.language.get(self._i)
+
+    @property
+    def quantity(self) -> int:
+        return self._t.quantity.values[self._i]
+
+    @property
+    def current_price(self) -> Decimal:
+        return self._t.current_price.get(self._i)
+
+    @property
+    def tcgplayer_product_id(self) -> int | None:
+        return self._t.tcgplayer_product_id.get(self._i)
+
+    @property
+    def tcgplayer_sku_id(self) -> int | None:
+        return self._t.tcgplayer_sku_id.get(self._i)
+
+    @property
+    def tcgplayer_url(self) -> str | None:
+        return self._t.tcgplayer_url.get(self._i)
+
+    @property
+    def category(self) -> str | None:
+        return self._t.category.get(self._i)
+
+    @property
+    def notes(self) -> str | None:
+        return self._t.notes.get(self._i)
+
+    @property
+    def validation_errors(self) -> list[str]:
+        return self._t.errors.get(self._i)
+
+    @property
+    def raw_data(self) -> dict:
+        return self._t.raw(self._i)
+
+    @property
+    def in_stock(self) -> bool:
+        return self.quantity > 0
+
+    def materialize(self) -> InventoryRow:
+        return InventoryRow(
+            row_number=self.row_number,
+            sku=self.sku,
+            card_name=self.card_name,
+            set_name=self.set_name,
+            card_number=self.card_number,
+            rarity=self.rarity,
+            finish=self.finish,
+            language=self.language,
+            quantity=self.quantity,
+            current_price=self.current_price,
+            tcgplayer_product_id=self.tcgplayer_product_id,
+            tcgplayer_sku_id=self.tcgplayer_sku_id,
+            tcgplayer_url=self.tcgplayer_url,
+            category=self.category,
+            notes=self.notes,
+            raw_data=self.raw_data,
+            validation_errors=list(self.validation_errors),
+        )
+
+
+def _unmatched() -> MatchResult:
+    return MatchResult(status=MatchStatus.UNMATCHED, method="none", approved=False)
+
+
+class CompactItem:
+    # ItemState look-alike whose fields live in the owning CompactItemStore. match/price/decision are
+    # rebuilt as dataclasses when read and packed back into columns when assigned.
+    __slots__ = ("_s", "_i")
+
+    def __init__(self, store: CompactItemStore, index: int) -> None:
+        self._s = store
+        self._i = index
+
+    @property
+    def inventory(self) -> InventoryView:
+        return InventoryView(self._s.inventory, self._i)
+
+    @property
+    def match(self) -> MatchResult:
+        return self._s.matches.get(self._i)
+
+    @match.setter
+    def match(self, value: MatchResult) -> None:
+        self._s.matches.put(self._i, value)
+
+    @property
+    def price(self) -> PriceResult | None:
+        return self._s.prices.get(self._i)
+
+    @price.setter
+    def price(self, value: PriceResult | None) -> None:
+        self._s.prices.put(self._i, value)
+
+    @property
+    def decision(self) -> PricingDecision | None:
+        return self._s.decisions.get(self._i)
+
+    @decision.setter
+    def decision(self, value: PricingDecision | None) -> None:
+        self._s.decisions.put(self._i, value)
+
+    @property
+    def do_not_update(self) -> bool:
+        return bool(self._s.do_not_update[self._i])
+
+    @do_not_update.setter
+    def do_not_update(self, value: bool) -> None:
+        self._s.do_not_update[self._i] = bool(value)
+
+    @property
+    def manual_price_override(self) -> Decimal | None:
+        return self._s.overrides.get(self._i)
+
+    @manual_price_override.setter
+    def manual_price_override(self, value: Decimal | None) -> None:
+        self._s.overrides.put(self._i, value)
+
+    @property
+    def error(self) -> str | None:
+        return self._s.errors.get(self._i)
+
+    @error.setter
+    def error(self, value: str | None) -> None:
+        self._s.errors.put(self._i, value)
+
+    def materialize(self) -> ItemState:
+        return ItemState(
+            inventory=self.inventory.materialize(),
+            match=self.match,
+            price=self.price,
+            decision=self.decision,
+            do_not_update=self.do_not_update,
+            manual_price_override=self.manual_price_override,
+            error=self.error,
+        )
+
+
+class CompactItemStore:
+    # Column storage for a whole inventory run: strings are interned in one pool, prices are integer
+    # cents, and raw CSV rows stay in the source file. Items handed out by items() behave like
+    # ItemState for the engines, writers and the GUI.
+    def __init__(self, fieldnames: list[str] | None = None, source: str | None = None) -> None:
+        self.pool = StringPool()
+        self.inventory = InventoryTable(self.pool, fieldnames or [], source)
+        self.matches = _Records(MatchResult, {
+            "status": _Enum(MatchStatus),
+            "method": _Str(self.pool),
+            "product_id": _Int(),
+            "sku_id": _Int(),
+            "product_name": _Str(self.pool),
+            "set_name": _Str(self.pool),
+            "finish": _Str(self.pool),
+            "condition": _Str(self.pool),
+            "language": _Str(self.pool),
+            "confidence": _Float(),
+            "notes": _Str(self.pool),
+            "candidates": _Sparse(list),
+            "approved": _Flag(),
+        }, default=_unmatched)
+        self.prices = _Records(PriceResult, {
+            "market_price": _Money(),
+            "low_price": _Money(),
+            "mid_price": _Money(),
+            "high_price": _Money(),
+            "finish": _Str(self.pool),
+            "source": _Str(self.pool),
+            "lookup_timestamp": _Time(),
+            "lookup_status": _Str(self.pool),
+        })
+        self.decisions = _Records(PricingDecision, {
+            "pricing_basis": _Enum(PricingBasis),
+            "selected_value": _Money(),
+            "new_price": _Money(),
+            "absolute_change": _Money(),
+            "percent_change": _Money(),
+            "changed": _Flag(),
+            "reason": _Str(self.pool),
+        })
+        self.do_not_update = bytearray()
+        self.overrides = _Sparse()
+        self.errors = _Sparse()
+
+    @classmethod
+    def load(cls, path: str, keep_raw: bool = True) -> tuple[CompactItemStore, list[str]]:
+        # Same rows and errors as load_inventory(path); keep_raw=False leaves raw_data empty.
+        errors: list[str] = []
+        p = Path(path)
+        if not p.exists():
+            errors.append(f"Inventory file not found: {path}")
+            return cls(), errors
+        if arrow_format(p):
+            fieldnames = schema_names(p)
+            errors.extend(validate_columns(fieldnames))
+            store = cls(fieldnames, str(p) if keep_raw else None)
+            for row in _fast_rows(iter_text_rows(p), fieldnames, set(), keep_raw=False):
+                # Arrow rows are numbered like CSV lines (first record = 2), so this is the row index.
+                store.add(row, row.row_number - 2 if keep_raw else -1)
+            return store, errors
+        with p.open("rb") as f:
+            reader = _OffsetReader(f)
+            fieldnames = next(reader, None) or []
+            errors.extend(validate_columns(fieldnames))
+            store = cls(fieldnames, str(p) if keep_raw else None)
+            for row in _fast_rows(reader, fieldnames, set(), keep_raw=False):
+                store.add(row, reader.offset if keep_raw else -1)
+        return store, errors
+
+    def add(self, row: InventoryRow, offset: int = -1) -> CompactItem:
+        i = self.inventory.add(row, offset)
+        self.matches.add()
+        self.prices.add()
+        self.decisions.add()
+        self.do_not_update.append(0)
+        return CompactItem(self, i)
+
+    def items(self) -> list[CompactItem]:
+        return [CompactItem(self, i) for i in range(len(self))]
+
+    def __len__(self) -> int:
+        return len(self.do_not_update)
+
+    def close(self) -> None:
+        self.inventory.close()
+
+
+class _OffsetReader:
+    # csv.reader over a binary file that remembers the byte offset where the current record starts.
+    # csv.reader pulls one line at a time, so the first line read for a record is its start.
+    def __init__(self, f) -> None:
+        self._pos = 0
+        self._starts: list[int] = []
+        self._reader = csv.reader(self._lines(f))
+        self.offset = 0
+
+    def _lines(self, f):
+        for n, line in enumerate(f):
+            self._starts.append(self._pos)
+            self._pos += len(line)
+            yield line.decode("utf-8-sig" if n == 0 else "utf-8")
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> list[str]:
+        self._starts.clear()
+        row = next(self._reader)
+        self.offset = self._starts[0]
+        return row
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 import os
 import yaml
@@ -10,11 +10,18 @@ from dotenv import load_dotenv
 @dataclass(slots=True)
 class AppConfig:
     inventory_csv_path: str = "sample_inventory.csv"
+    parallel_load_min_mb: float = 256.0
+    load_workers: int = 0
+    compact_items: bool = False
     output_dir: str = "data"
     history_csv_path: str = "data/price_history.csv"
+    history_backend: str = "csv"
+    history_db_path: str = "data/price_history.db"
+    history_columns_dir: str = "data/history_columns"
     failed_matches_csv_path: str = "data/failed_matches.csv"
     site_import_csv_path: str = "data/site_import.csv"
     changes_only_csv_path: str = "data/price_changes_only.csv"
+    held_items_csv_path: str = "data/held_items.csv"
     undercut_amount: float = 0.01
     min_price: float = 0.01
     max_price: float = 9999.99
@@ -23,6 +30,10 @@ class AppConfig:
     retry_count: int = 3
     retry_backoff: float = 1.5
     sleep_between_requests: float = 0.1
+    requests_per_second: float = 0.0
+    max_concurrency: int = 1
+    adaptive_throttling: bool = True
+    min_requests_per_second: float = 0.5
     log_level: str = "INFO"
     include_out_of_stock: bool = False
     fallback_to_current_price: bool = True
@@ -30,11 +41,40 @@ class AppConfig:
     minimum_change_threshold: float = 0.0
     sqlite_cache_enabled: bool = True
     sqlite_cache_path: str = "data/ntxprice_cache.db"
+    search_cache_ttl_hours: float = 168.0
+    pricing_cache_max_age_hours: float = 24.0
+    pricing_cache_stale_hours: float = 24.0
+    pricing_cache_category_max_age_hours: dict[str, float] = field(default_factory=dict)
+    pricing_cache_price_bands: list[list[float]] = field(default_factory=list)
+    pricing_cache_max_entries: int = 200_000
+    cache_compact_interval_hours: float = 168.0
+    price_cache_max_entries: int = 50_000
+    incremental_sync: bool = False
+    checkpoint_every: int = 0
+    run_journal_dir: str = "data/runs"
+    streaming: bool = False
+    stream_chunk_size: int = 5000
+    pipelined: bool = False
+    pipeline_batch_size: int = 500
+    pipeline_queue_size: int = 4
+    shards: int = 1
+    shard_key: str = "sku"
+    min_match_confidence: float = 0.6
+    local_catalog_enabled: bool = False
+    catalog_db_path: str = "data/catalog.db"
+    catalog_category_ids: list[int] = field(default_factory=lambda: [1])
     gui_window_title: str = "NTXPRICE"
     write_mode: str = "publish"
     dry_run: bool = False
     only_changed_export: bool = False
     only_approved_export: bool = False
+    price_guard_action: str = "off"
+    price_guard_max_zscore: float = 4.0
+    price_guard_max_jump_pct: float = 50.0
+    price_guard_max_basis_deviation_pct: float = 60.0
+    price_guard_min_change: float = 0.5
+    price_guard_history_days: int = 30
+    price_guard_min_history_points: int = 5
 
 
 def load_config(config_path: str | None = None) -> AppConfig:
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from typing import Callable, Iterable
+
+from .history_db import INSERT_CHUNK
+from .history_store import history_row
+from .models import ItemState, RunSummary
+from .publisher import Publisher
+from .services import MetricsService
+from .utils import chunked
+
+EXPORT_CHUNK = 5000
+
+
+class RowSink:
+    # Streams one row per item (when `build` returns one) into an IncrementalCsvWriter / ArrowTableWriter.
+    def __init__(self, name: str, writer, build: Callable[[ItemState], dict | None], publishes: bool = False) -> None:
+        self.name = name
+        self.writer = writer
+        self.build = build
+        self.publishes = publishes
+
+    @property
+    def count(self) -> int:
+        return self.writer.rows_written
+
+    def add(self, item: ItemState, publishable: bool) -> None:
+        if self.publishes and not publishable:
+            return
+        if (row := self.build(item)) is not None:
+            self.writer.write_rows((row,))
+
+    def finish(self) -> None:
+        self.writer.commit()
+
+    def abort(self) -> None:
+        self.writer.abort()
+
+
+class HistorySink:
+    # Today's snapshot rows, handed to the daily history writer in INSERT_CHUNK batches so the sqlite
+    # backend keeps its per-chunk duplicate lookups.
+    name = "history"
+    publishes = False
+
+    def __init__(self, writer) -> None:
+        self.writer = writer
+        self.count = 0
+        self._rows: list[dict] = []
+
+    def add(self, item: ItemState, publishable: bool) -> None:
+        if item.price and item.decision:
+            self._rows.append(history_row(item, self.writer.today))
+            if len(self._rows) >= INSERT_CHUNK:
+                self._flush()
+
+    def _flush(self) -> None:
+        self.count += self.writer.append_rows(self._rows)
+        self._rows = []
+
+    def finish(self) -> None:
+        self._flush()
+        self.writer.close()
+
+    def abort(self) -> None:
+        self.writer.abort()
+
+
+class CountSink:
+    # Dry-run stand-in for the site import: counts the rows that would be exported.
+    publishes = True
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.count = 0
+
+    def add(self, item: ItemState, publishable: bool) -> None:
+        if publishable and item.decision is not None:
+            self.count += 1
+
+    def finish(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        pass
+
+
+class MetricsSink:
+    name = "metrics"
+    publishes = False
+
+    def __init__(self, summary: RunSummary) -> None:
+        self.summary = summary
+
+    @property
+    def count(self) -> int:
+        return self.summary.total_rows
+
+    def add(self, item: ItemState, publishable: bool) -> None:
+        MetricsService.add(self.summary, item)
+
+    def finish(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        pass
+
+
+class ExportStage:
+    # Makes one pass over priced items and hands each to every registered sink, which streams its row
+    # straight into its own writer. The price guard runs per chunk; held items reach only the sinks that
+    # don't publish. finish() finalizes each file atomically in registration order. Validation issues
+    # (negative prices) abort the publishing sinks, keep the rest and raise ValueError.
+    def __init__(self, publisher: Publisher | None = None, chunk_size: int = EXPORT_CHUNK) -> None:
+        self.publisher = publisher
+        self.chunk_size = max(1, chunk_size)
+        self.sinks: list = []
+        self.issues: list[str] = []
+
+    def add(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def write(self, items: Iterable[ItemState]) -> int:
+        written = 0
+        for chunk in chunked(items, self.chunk_size):
+            held = self.publisher.hold(chunk) if self.publisher else set()
+            for item in chunk:
+                if self.publisher and (issue := self.publisher.issue(item)):
+                    self.issues.append(issue)
+                publishable = item.inventory.row_number not in held
+                for sink in self.sinks:
+                    sink.add(item, publishable)
+            written += len(chunk)
+        return written
+
+    def finish(self) -> None:
+        for n, sink in enumerate(self.sinks):
+            try:
+                if self.issues and sink.publishes:
+                    sink.abort()
+                else:
+                    sink.finish()
+            except BaseException:
+                for rest in self.sinks[n + 1:]:
+                    rest.abort()
+                raise
+        if self.issues:
+            raise ValueError("; ".join(self.issues))
+
+    def abort(self) -> None:
+        for sink in self.sinks:
+            sink.abort()
+
+    def counts(self) -> dict[str, int]:
+        return {sink.name: sink.count for sink in self.sinks}
+
+    def __enter__(self) -> ExportStage:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.finish()
+        else:
+            self.abort()
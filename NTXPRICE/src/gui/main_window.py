@@ -15,14 +15,13 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import QSortFilterProxyModel, Qt
 from ..config import AppConfig
 from ..inventory_loader import load_inventory
+from ..compact_store import CompactItemStore
 from ..models import ItemState
 from ..logger import setup_logger
-from ..config import load_env_credentials
-from ..tcgplayer_provider import TCGplayerProvider
+from ..app import build_cache_store, build_history_store, build_price_cache, build_provider, build_match_provider
 from ..matching_engine import MatchingEngine
 from ..pricing_engine import PricingEngine
 from ..csv_writer import write_site_import
-from ..history_store import HistoryStore
 from .table_models import InventoryTableModel
 from .inventory_tab import InventoryTab
 from .match_review_tab import MatchReviewTab
@@ -78,8 +77,10 @@ class MainWindow(QMainWindow):
         self.config = config
         self.logger = setup_logger(config.log_level)
         self.items: list[ItemState] = []
-        creds = load_env_credentials()
-        self.provider = TCGplayerProvider(creds["public_key"], creds["private_key"], creds["access_token"], config.request_timeout, config.retry_count, config.retry_backoff, config.sleep_between_requests)
+        self.cache = build_cache_store(config)
+        self.prices = build_price_cache(config, self.cache)
+        self.provider = build_provider(config, self.logger)
+        self.match_provider = build_match_provider(config, self.provider, self.logger)
 
         self.setWindowTitle(config.gui_window_title)
         central = QWidget()
@@ -107,7 +108,7 @@ class MainWindow(QMainWindow):
         self.tabs = QTabWidget()
         self.log_tab = LogTab()
         self.inventory_tab = InventoryTab(self.load_inventory)
-        self.match_tab = MatchReviewTab(self.run_match)
+        self.match_tab = MatchReviewTab(self.run_match, self.accept_candidates)
         self.pricing_tab = PricingReviewTab(self.run_pricing)
         self.export_tab = ExportTab(self.export)
         self.settings_tab = SettingsTab(config)
@@ -132,31 +133,54 @@ class MainWindow(QMainWindow):
         self.summary.setText(f"total: {total} matched: {matched} ambiguous: {ambiguous} changed: {changed}")
 
     def load_inventory(self, path: str) -> None:
-        rows, errors = load_inventory(path)
-        self.items = [ItemState(inventory=r) for r in rows]
+        if self.config.compact_items:
+            store, errors = CompactItemStore.load(path)
+            self.items = store.items()
+        else:
+            rows, errors = load_inventory(path)
+            self.items = [ItemState(inventory=r) for r in rows]
         for e in errors:
             self.log_tab.append(f"ERROR: {e}")
         self._refresh()
         info(self, "Inventory", f"Loaded {len(self.items)} rows")
 
+    def _matcher(self) -> MatchingEngine:
+        return MatchingEngine(self.match_provider, self.logger, include_out_of_stock=self.config.include_out_of_stock, max_workers=self.config.max_concurrency, cache_store=self.cache, search_cache_ttl_hours=self.config.search_cache_ttl_hours, min_confidence=self.config.min_match_confidence)
+
     def run_match(self) -> None:
-        m = MatchingEngine(self.provider, self.logger, include_out_of_stock=self.config.include_out_of_stock)
-        m.run(self.items)
+        self._matcher().run(self.items)
         self._refresh()
         self.log_tab.append("Matching completed")
 
+    def accept_candidates(self) -> None:
+        matcher = self._matcher()
+        rows = {self.proxy.mapToSource(idx).row() for idx in self.table.selectionModel().selectedIndexes()}
+        accepted = 0
+        for row in sorted(rows):
+            item = self.items[row]
+            if item.match.candidates:
+                matcher.resolve_manually(item, item.match.candidates[0])
+                accepted += 1
+        self._refresh()
+        self.log_tab.append(f"Manually resolved {accepted} rows")
+
     def run_pricing(self) -> None:
         self.config.undercut_amount = self.settings_tab.undercut.value()
         self.config.pricing_basis = self.settings_tab.basis.currentText()
-        p = PricingEngine(self.provider, self.logger, pricing_basis=self.config.pricing_basis, undercut_amount=self.config.undercut_amount, min_price=self.config.min_price, max_price=self.config.max_price, fallback_to_current_price=self.config.fallback_to_current_price, skip_if_no_market_price=self.config.skip_if_no_market_price, minimum_change_threshold=self.config.minimum_change_threshold)
+        # Prices are re-read on every pricing run; catalog lookups stay shared for the session.
+        self.provider.clear_request_cache({"pricing_sku", "pricing_product"})
+        p = PricingEngine(self.provider, self.logger, cache_store=self.cache, price_cache=self.prices, pricing_basis=self.config.pricing_basis, undercut_amount=self.config.undercut_amount, min_price=self.config.min_price, max_price=self.config.max_price, fallback_to_current_price=self.config.fallback_to_current_price, skip_if_no_market_price=self.config.skip_if_no_market_price, minimum_change_threshold=self.config.minimum_change_threshold, max_workers=self.config.max_concurrency)
         p.run(self.items)
         self._refresh()
         self.log_tab.append("Pricing completed")
+        self.log_tab.append(f"Throttle stats: {self.provider.throttle_stats().as_dict()}")
+        if self.prices is not None:
+            self.log_tab.append(f"Price cache: {self.prices.stats()} pricing cache: {p.cache_stats}")
 
     def export(self) -> None:
         try:
             count = write_site_import(self.config.site_import_csv_path, self.items, self.config.include_out_of_stock, self.config.only_changed_export, self.config.only_approved_export)
-            HistoryStore(self.config.history_csv_path, self.logger).append_daily(self.items)
+            build_history_store(self.config, self.logger).append_daily(self.items)
             info(self, "Export", f"Exported {count} rows")
             self.log_tab.append(f"Exported {count} rows")
         except Exception as exc:
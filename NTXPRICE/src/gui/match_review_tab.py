@@ -4,11 +4,14 @@ from PySide6.QtWidgets import QWidget, QVBoxLayout, QPushButton, QLabel
 
 
 class MatchReviewTab(QWidget):
-    def __init__(self, on_auto_match) -> None:
+    def __init__(self, on_auto_match, on_accept_candidate) -> None:
         super().__init__()
         layout = QVBoxLayout(self)
         self.summary = QLabel("Run matching to review matched/unmatched/ambiguous items.")
         btn = QPushButton("Run Matching")
         btn.clicked.connect(on_auto_match)
+        accept = QPushButton("Accept Top Candidate for Selected Rows")
+        accept.clicked.connect(on_accept_candidate)
         layout.addWidget(self.summary)
         layout.addWidget(btn)
+        layout.addWidget(accept)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import csv
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from .utils import chunked
+
+SQL_CHUNK = 500
+INSERT_CHUNK = 5000
+
+
+class HistoryDB:
+    # Indexed SQLite store for price history rows. Values are kept as the text the CSV writer would
+    # produce, so exporting reproduces the HISTORY_FIELDS CSV exactly.
+    def __init__(self, db_path: str, fields: list[str]) -> None:
+        self.path = db_path
+        self.fields = list(fields)
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30.0)
+        self._lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ",".join(f"{f} TEXT" for f in self.fields)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY, {columns})")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_history_date_sku ON history(lookup_date, sku)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_history_sku_date ON history(sku, lookup_date)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS history_meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+
+    def get_meta(self, key: str) -> str | None:
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM history_meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("REPLACE INTO history_meta(key,value) VALUES(?,?)", (key, value))
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def max_id(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM history").fetchone()[0]
+
+    def existing_skus(self, lookup_date: str, skus: list[str], max_id: int | None = None) -> set[str]:
+        out: set[str] = set()
+        skus = list(dict.fromkeys(skus))
+        bound = "" if max_id is None else f" AND id <= {int(max_id)}"
+        with self._lock:
+            for i in range(0, len(skus), SQL_CHUNK):
+                chunk = skus[i:i + SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                out.update(r[0] for r in self.conn.execute(
+                    f"SELECT DISTINCT sku FROM history WHERE lookup_date=? AND sku IN ({marks}){bound}", [lookup_date, *chunk]
+                ))
+        return out
+
+    def append_rows(self, rows: Iterable[dict]) -> int:
+        written = 0
+        sql = f"INSERT INTO history({','.join(self.fields)}) VALUES({','.join('?' * len(self.fields))})"
+        for chunk in chunked(rows, INSERT_CHUNK):
+            values = [tuple("" if r.get(f) is None else str(r.get(f)) for f in self.fields) for r in chunk]
+            with self._lock, self.conn:
+                self.conn.executemany(sql, values)
+            written += len(values)
+        return written
+
+    def import_csv(self, path: str) -> int:
+        p = Path(path)
+        if not p.exists():
+            return 0
+        with p.open("r", newline="", encoding="utf-8") as f:
+            return self.append_rows(csv.DictReader(f))
+
+    def iter_rows(self, since: str | None = None, fields: list[str] | None = None, after_id: int = 0) -> Iterator[dict]:
+        fields = fields or self.fields
+        sql = f"SELECT {','.join(fields)} FROM history WHERE id > ?"
+        params: list = [after_id]
+        if since:
+            sql += " AND lookup_date >= ?"
+            params.append(since)
+        # Long exports read through their own read-only connection: the shared one stays free for writers
+        # and, under WAL, the query sees a consistent snapshot.
+        conn = sqlite3.connect(Path(self.path).resolve().as_uri() + "?mode=ro", uri=True, timeout=30.0)
+        try:
+            cur = conn.execute(sql + " ORDER BY id", params)
+            while batch := cur.fetchmany(INSERT_CHUNK):
+                for row in batch:
+                    yield dict(zip(fields, row))
+        finally:
+            conn.close()
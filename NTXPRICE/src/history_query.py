@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+import json
+import math
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from .history_store import HistoryStore
+from .match_scoring import normalize_set
+
+# Series name -> history column.
+SERIES_FIELDS = {
+    "market": "market_price",
+    "low": "low_price",
+    "mid": "mid_price",
+    "suggested": "suggested_site_price",
+}
+BUILD_CHUNK = 100_000
+META_FILE = "meta.json"
+
+
+def _price(value: str | None) -> float:
+    try:
+        return float(value) if value else math.nan
+    except ValueError:
+        return math.nan
+
+
+def _prices(values) -> np.ndarray | list[float]:
+    # Columns from Parquet history are already float arrays; text columns are parsed like CSV cells.
+    return values if isinstance(values, np.ndarray) else [_price(v) for v in values]
+
+
+def _trailing(cumulative: np.ndarray, window: int) -> np.ndarray:
+    # Turns running totals into trailing-window totals in place (NumPy buffers the overlapping operands).
+    cumulative[..., window:] -= cumulative[..., :-window]
+    return cumulative
+
+
+def rolling_mean(values: np.ndarray, window: int, min_periods: int = 1) -> np.ndarray:
+    # Trailing mean along the last axis; missing snapshots (NaN) are skipped, not treated as zero.
+    valid = ~np.isnan(values)
+    sums = _trailing(np.cumsum(np.where(valid, values, 0.0), axis=-1, dtype=np.float64), window)
+    counts = _trailing(np.cumsum(valid, axis=-1, dtype=np.int32), window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(counts >= max(1, min_periods), sums / counts, np.nan)
+
+
+def rolling_std(values: np.ndarray, window: int, min_periods: int = 2) -> np.ndarray:
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0).astype(np.float64)
+    sums = _trailing(np.cumsum(filled, axis=-1), window)
+    squares = _trailing(np.cumsum(filled * filled, axis=-1), window)
+    counts = _trailing(np.cumsum(valid, axis=-1, dtype=np.int32), window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = (squares - sums * sums / counts) / (counts - 1)
+    return np.where(counts >= max(2, min_periods), np.sqrt(np.clip(var, 0.0, None)), np.nan)
+
+
+def pct_change(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    out = np.full(values.shape, np.nan, dtype=np.float64)
+    if periods < values.shape[-1]:
+        prev = values[..., :-periods]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[..., periods:] = np.where(prev != 0, values[..., periods:] / prev - 1.0, np.nan)
+    return out
+
+
+def volatility(values: np.ndarray, window: int) -> np.ndarray:
+    # Rolling standard deviation of day-over-day returns.
+    return rolling_std(pct_change(values, 1), window)
+
+
+def window_change(values: np.ndarray, window: int) -> np.ndarray:
+    # Percent change from the first to the last observed value in the trailing window, per row.
+    recent = values[..., -window:] if window else values
+    valid = ~np.isnan(recent)
+    if recent.shape[-1] == 0:
+        return np.full(recent.shape[:-1], np.nan)
+    first = np.take_along_axis(recent, np.argmax(valid, axis=-1)[..., None], axis=-1)[..., 0]
+    last = np.take_along_axis(recent, (recent.shape[-1] - 1 - np.argmax(valid[..., ::-1], axis=-1))[..., None], axis=-1)[..., 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(valid.any(axis=-1) & (first != 0), last / first - 1.0, np.nan)
+
+
+@dataclass(slots=True)
+class PriceSeries:
+    dates: np.ndarray  # datetime64[D], one column per calendar day
+    skus: list[str]
+    values: dict[str, np.ndarray]  # series name -> (len(skus), len(dates)); NaN where no snapshot
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.values[name]
+
+
+class HistoryQuery:
+    # Columnar copy of the history: one float32 SKU x day matrix per series, memory-mapped from .npy
+    # files. SKUs are sorted by set, so a set is a contiguous block of rows. The copy is rebuilt from
+    # the HistoryStore whenever the store has changed since the last build.
+    def __init__(self, store: HistoryStore, directory: str, logger) -> None:
+        self.store = store
+        self.dir = Path(directory)
+        self.logger = logger
+        self.dates = np.empty(0, dtype="datetime64[D]")
+        self.skus: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._sets: dict[str, tuple[int, int]] = {}
+        self._columns: dict[str, np.ndarray] = {}
+        self.refresh()
+
+    def refresh(self, force: bool = False) -> None:
+        meta = self._read_meta()
+        if force or meta is None or meta.get("backend") != self.store.backend or meta.get("cursor", 0) > self.store.cursor():
+            self.build()
+        elif meta.get("version") != self.store.version():
+            # History is append-only, so only rows added since the last build need reading.
+            self.build(meta)
+        self._load(self._read_meta())
+
+    def _read_meta(self) -> dict | None:
+        path = self.dir / META_FILE
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def build(self, previous: dict | None = None) -> None:
+        version = self.store.version()
+        cursor = self.store.cursor()
+        sku_rows: dict[str, int] = {sku: i for i, sku in enumerate(previous["skus"])} if previous else {}
+        sku_sets: list[str] = list(previous["sets"]) if previous else []
+        day_numbers: dict[str, int] = {}
+        if previous and previous["start"]:
+            old_first = date.fromisoformat(previous["start"]).toordinal()
+            day_numbers[previous["start"]] = old_first
+            day_numbers[date.fromordinal(old_first + previous["days"] - 1).isoformat()] = old_first + previous["days"] - 1
+        parts: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        fields = ["lookup_date", "sku", "set_name", *SERIES_FIELDS.values()]
+        after = previous["cursor"] if previous else 0
+        for chunk in self.store.iter_columns(fields, after, BUILD_CHUNK):
+            rows = np.empty(len(chunk["sku"]), dtype=np.int32)
+            days = np.empty(len(chunk["sku"]), dtype=np.int32)
+            for j, (sku, set_name, lookup_date) in enumerate(zip(chunk["sku"], chunk["set_name"], chunk["lookup_date"])):
+                if (i := sku_rows.get(sku)) is None:
+                    i = sku_rows[sku] = len(sku_rows)
+                    sku_sets.append(normalize_set(set_name))
+                rows[j] = i
+                if (day := day_numbers.get(lookup_date)) is None:
+                    day = day_numbers[lookup_date] = date.fromisoformat(lookup_date).toordinal()
+                days[j] = day
+            values = np.array([_prices(chunk[f]) for f in SERIES_FIELDS.values()], dtype=np.float32)
+            parts.append((rows, days, values))
+
+        skus = list(sku_rows)
+        order = sorted(range(len(skus)), key=lambda i: (sku_sets[i], skus[i]))
+        rank = np.empty(len(skus), dtype=np.int32)
+        rank[order] = np.arange(len(skus), dtype=np.int32)
+        first = min(day_numbers.values(), default=0)
+        width = max(day_numbers.values(), default=-1) - first + 1
+
+        tmp = self.dir.with_name(self.dir.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for k, name in enumerate(SERIES_FIELDS):
+            matrix = np.lib.format.open_memmap(tmp / f"{name}.npy", mode="w+", dtype=np.float32, shape=(len(skus), width))
+            matrix[:] = np.nan
+            if previous and previous["start"]:
+                # Earlier SKUs keep their previous row ids, so rank maps old rows to their new position.
+                offset = old_first - first
+                matrix[rank[:len(previous["skus"])], offset:offset + previous["days"]] = np.load(self.dir / f"{name}.npy", mmap_mode="r")
+            # Parts are in append order, so a later snapshot for the same SKU and day wins.
+            for rows, days, values in parts:
+                matrix[rank[rows], days - first] = values[k]
+            matrix.flush()
+            del matrix
+        meta = {
+            "version": version,
+            "backend": self.store.backend,
+            "cursor": cursor,
+            "start": date.fromordinal(first).isoformat() if day_numbers else None,
+            "days": width,
+            "skus": [skus[i] for i in order],
+            "sets": [sku_sets[i] for i in order],
+        }
+        (tmp / META_FILE).write_text(json.dumps(meta), encoding="utf-8")
+        shutil.rmtree(self.dir, ignore_errors=True)
+        os.replace(tmp, self.dir)
+        self.logger.info(
+            "history_columns_built skus=%s days=%s version=%s incremental=%s", len(skus), width, version, previous is not None
+        )
+
+    def _load(self, meta: dict) -> None:
+        start = meta["start"]
+        self.dates = np.datetime64(start, "D") + np.arange(meta["days"]) if start else np.empty(0, dtype="datetime64[D]")
+        self.skus = meta["skus"]
+        self._rows = {sku: i for i, sku in enumerate(self.skus)}
+        self._sets = {}
+        for i, set_name in enumerate(meta["sets"]):
+            lo, _ = self._sets.get(set_name, (i, i))
+            self._sets[set_name] = (lo, i + 1)
+        self._columns = {name: np.load(self.dir / f"{name}.npy", mmap_mode="r") for name in SERIES_FIELDS}
+
+    def _window(self, days: int | None, end: str | None) -> slice:
+        if not len(self.dates):
+            return slice(0, 0)
+        stop = np.searchsorted(self.dates, np.datetime64(end, "D"), side="right") if end else len(self.dates)
+        start = max(0, stop - days) if days else 0
+        return slice(int(start), int(stop))
+
+    def _series(self, rows: slice | list[int], days: int | None, end: str | None, series: tuple[str, ...]) -> PriceSeries:
+        cols = self._window(days, end)
+        skus = self.skus[rows] if isinstance(rows, slice) else [self.skus[i] for i in rows]
+        return PriceSeries(
+            dates=self.dates[cols],
+            skus=skus,
+            values={name: np.asarray(self._columns[name][rows, cols]) for name in series},
+        )
+
+    def sku(self, sku: str, days: int | None = None, end: str | None = None, series: tuple[str, ...] = tuple(SERIES_FIELDS)) -> PriceSeries:
+        row = self._rows.get(sku)
+        return self._series([] if row is None else [row], days, end, series)
+
+    def skus_series(self, skus: list[str], days: int | None = None, end: str | None = None, series: tuple[str, ...] = tuple(SERIES_FIELDS)) -> PriceSeries:
+        return self._series([self._rows[s] for s in skus if s in self._rows], days, end, series)
+
+    def set(self, set_name: str, days: int | None = None, end: str | None = None, series: tuple[str, ...] = tuple(SERIES_FIELDS)) -> PriceSeries:
+        lo, hi = self._sets.get(normalize_set(set_name), (0, 0))
+        return self._series(slice(lo, hi), days, end, series)
+
+    def all(self, days: int | None = None, end: str | None = None, series: tuple[str, ...] = tuple(SERIES_FIELDS)) -> PriceSeries:
+        return self._series(slice(0, len(self.skus)), days, end, series)
+
+    def window_stats(self, skus: list[str], days: int, end: str | None = None, series: str = "suggested") -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Mean, sample std and observation count of one series over the trailing window, aligned
+        # with `skus` (NaN/0 for SKUs without history).
+        mean = np.full(len(skus), np.nan)
+        std = np.full(len(skus), np.nan)
+        count = np.zeros(len(skus), dtype=np.int32)
+        rows = np.fromiter((self._rows.get(s, -1) for s in skus), dtype=np.int64, count=len(skus))
+        found = rows >= 0
+        cols = self._window(days, end)
+        if not found.any() or cols.stop <= cols.start:
+            return mean, std, count
+        block = np.asarray(self._columns[series][rows[found], cols], dtype=np.float64)
+        valid = ~np.isnan(block)
+        n = valid.sum(axis=1)
+        filled = np.where(valid, block, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            m = filled.sum(axis=1) / n
+            var = (np.where(valid, block - m[:, None], 0.0) ** 2).sum(axis=1) / (n - 1)
+        mean[found] = m
+        std[found] = np.where(n >= 2, np.sqrt(var), np.nan)
+        count[found] = n
+        return mean, std, count
+
+    @staticmethod
+    def trend_arrays(data: PriceSeries, window: int = 7, series: str = "market") -> dict[str, np.ndarray]:
+        # Latest value, trailing mean, window change and volatility per SKU, as float64 arrays.
+        # Only the trailing window (plus one day for the first return) affects the result.
+        values = data.values[series][:, -(window + 1):].astype(np.float64)
+        if not values.shape[-1]:
+            empty = np.full(len(data.skus), np.nan)
+            return {"last": empty, "mean": empty, "change_pct": empty, "volatility": empty}
+        return {
+            "last": values[:, -1],
+            "mean": rolling_mean(values, window)[:, -1],
+            "change_pct": window_change(values, window),
+            "volatility": volatility(values, window)[:, -1],
+        }
+
+    @staticmethod
+    def trends(data: PriceSeries, window: int = 7, series: str = "market") -> list[dict]:
+        arrays = HistoryQuery.trend_arrays(data, window, series)
+        keys = ("sku", *arrays)
+        columns = [[None if x != x else x for x in np.round(values, 4).tolist()] for values in arrays.values()]
+        return [dict(zip(keys, row)) for row in zip(data.skus, *columns)]
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
 import csv
-from datetime import datetime
+import io
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Iterable, Iterator
+from .arrow_io import ArrowTableWriter, arrow_format, iter_batches, numeric_or_text, open_table_writer, text_column
+from .history_db import INSERT_CHUNK, HistoryDB
 from .models import ItemState
+from .utils import chunked
 
 
 HISTORY_FIELDS = [
@@ -11,58 +16,280 @@ HISTORY_FIELDS = [
     "pricing_basis","market_price","low_price","mid_price","high_price","suggested_site_price","tcgplayer_product_id",
     "tcgplayer_sku_id","source","match_method","lookup_status","notes"
 ]
+HISTORY_BACKENDS = ("csv", "sqlite", "parquet")
+
+
+def run_date(started: datetime | None = None) -> str:
+    # The lookup_date a run stamps on its history rows (UTC), and the day the price guard's baseline ends before.
+    return (started or datetime.now(timezone.utc)).astimezone(timezone.utc).date().isoformat()
+
+
+def history_row(item: ItemState, lookup_date: str) -> dict:
+    return {
+        "lookup_date": lookup_date,
+        "lookup_timestamp": item.price.lookup_timestamp.isoformat(),
+        "sku": item.inventory.sku,
+        "card_name": item.inventory.card_name,
+        "set_name": item.inventory.set_name,
+        "card_number": item.inventory.card_number,
+        "finish": item.inventory.finish,
+        "quantity": item.inventory.quantity,
+        "current_price": item.inventory.current_price,
+        "pricing_basis": item.decision.pricing_basis.value,
+        "market_price": item.price.market_price,
+        "low_price": item.price.low_price,
+        "mid_price": item.price.mid_price,
+        "high_price": item.price.high_price,
+        "suggested_site_price": item.decision.new_price,
+        "tcgplayer_product_id": item.match.product_id,
+        "tcgplayer_sku_id": item.match.sku_id,
+        "source": item.price.source,
+        "match_method": item.match.method,
+        "lookup_status": item.price.lookup_status,
+        "notes": item.match.notes or "",
+    }
+
+
+class DailyHistoryWriter:
+    # Appends today's snapshot rows chunk by chunk; only today's SKUs are kept for duplicate checks.
+    def __init__(self, path: Path, logger, force: bool = False, today: str | None = None) -> None:
+        self.logger = logger
+        self.force = force
+        self.today = today or run_date()
+        self.existing: set[str] = set()
+        if path.exists():
+            with path.open("r", newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    if row.get("lookup_date", "") == self.today:
+                        self.existing.add(row.get("sku", ""))
+        write_header = not path.exists()
+        self._file = path.open("a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=HISTORY_FIELDS)
+        if write_header:
+            self._writer.writeheader()
+
+    def append(self, items: list[ItemState]) -> int:
+        return self.append_rows(history_row(item, self.today) for item in items if item.price and item.decision)
+
+    def append_rows(self, rows: Iterable[dict]) -> int:
+        # Rows already built with history_row (e.g. by shard workers); today's duplicates are still suppressed.
+        written = 0
+        for row in rows:
+            if row["sku"] in self.existing and not self.force:
+                self.logger.info("duplicate_history_suppressed sku=%s date=%s", row["sku"], self.today)
+                continue
+            self._writer.writerow(row)
+            written += 1
+        return written
+
+    def close(self) -> None:
+        self._file.close()
+
+    def abort(self) -> None:
+        # Rows already appended stay in the file.
+        self.close()
+
+    def __enter__(self) -> DailyHistoryWriter:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class SqliteHistoryWriter:
+    # Same contract as DailyHistoryWriter, but duplicates are found by (lookup_date, sku) index
+    # lookups per chunk instead of reading the whole history.
+    def __init__(self, db: HistoryDB, logger, force: bool = False, today: str | None = None) -> None:
+        self.db = db
+        self.logger = logger
+        self.force = force
+        self.today = today or run_date()
+        # Only rows that existed before this writer opened count as duplicates, like the CSV writer.
+        self.max_id = db.max_id()
+
+    def append(self, items: list[ItemState]) -> int:
+        return self.append_rows(history_row(item, self.today) for item in items if item.price and item.decision)
+
+    def append_rows(self, rows: Iterable[dict]) -> int:
+        written = 0
+        for chunk in chunked(rows, INSERT_CHUNK):
+            if not self.force:
+                existing = self.db.existing_skus(self.today, [r["sku"] for r in chunk], self.max_id)
+                for sku in (r["sku"] for r in chunk if r["sku"] in existing):
+                    self.logger.info("duplicate_history_suppressed sku=%s date=%s", sku, self.today)
+                chunk = [r for r in chunk if r["sku"] not in existing]
+            written += self.db.append_rows(chunk)
+        return written
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        pass
+
+    def __enter__(self) -> SqliteHistoryWriter:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ParquetHistoryWriter:
+    # Same contract as DailyHistoryWriter. Each writer adds one part file (<date>-<seq>.parquet) to the
+    # history directory, written in row groups to a temp file and renamed into place on a clean close.
+    def __init__(self, directory: Path, logger, force: bool = False, today: str | None = None) -> None:
+        self.logger = logger
+        self.force = force
+        self.today = today or run_date()
+        today_parts = sorted(directory.glob(f"{self.today}-*.parquet"))
+        self.existing: set[str] = set()
+        for part in today_parts:
+            for batch in iter_batches(part, ["sku"]):
+                self.existing.update(batch.column(0).to_pylist())
+        self.part = directory / f"{self.today}-{len(today_parts):04d}.parquet"
+        self._writer = ArrowTableWriter(str(self.part), HISTORY_FIELDS)
+
+    def append(self, items: list[ItemState]) -> int:
+        return self.append_rows(history_row(item, self.today) for item in items if item.price and item.decision)
+
+    def append_rows(self, rows: Iterable[dict]) -> int:
+        return self._writer.write_rows(self._new(rows))
+
+    def _new(self, rows: Iterable[dict]) -> Iterator[dict]:
+        for row in rows:
+            if row["sku"] in self.existing and not self.force:
+                self.logger.info("duplicate_history_suppressed sku=%s date=%s", row["sku"], self.today)
+                continue
+            yield row
+
+    def close(self) -> None:
+        # Empty runs leave no part behind.
+        if self._writer.rows_written:
+            self._writer.commit()
+        else:
+            self._writer.abort()
+
+    def abort(self) -> None:
+        self._writer.abort()
+
+    def __enter__(self) -> ParquetHistoryWriter:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
 
 
 class HistoryStore:
-    def __init__(self, path: str, logger) -> None:
+    def __init__(self, path: str, logger, backend: str = "csv", db_path: str | None = None) -> None:
         self.path = Path(path)
         self.logger = logger
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        if backend == "csv" and arrow_format(self.path) == "parquet":
+            backend = "parquet"  # a .parquet history path is a directory of daily part files
+        if backend not in HISTORY_BACKENDS:
+            raise ValueError(f"Unknown history backend: {backend}")
+        if backend == "csv" and arrow_format(self.path):
+            raise ValueError(f"History snapshots can be CSV or Parquet, not {self.path.suffix}")
+        self.backend = backend
+        self.db: HistoryDB | None = None
+        if backend == "sqlite":
+            self.db = HistoryDB(db_path or str(self.path.with_suffix(".db")), HISTORY_FIELDS)
+            self._migrate()
 
-    def append_daily(self, items: list[ItemState], force: bool = False) -> int:
-        existing: set[tuple[str, str]] = set()
-        if self.path.exists():
-            with self.path.open("r", newline="", encoding="utf-8") as f:
-                for row in csv.DictReader(f):
-                    existing.add((row.get("lookup_date", ""), row.get("sku", "")))
+    @property
+    def location(self) -> str:
+        return self.db.path if self.db else str(self.path)
 
-        rows_to_add: list[dict] = []
-        today = datetime.utcnow().date().isoformat()
-        for item in items:
-            if not item.price or not item.decision:
-                continue
-            key = (today, item.inventory.sku)
-            if key in existing and not force:
-                self.logger.info("duplicate_history_suppressed sku=%s date=%s", item.inventory.sku, today)
-                continue
-            rows_to_add.append({
-                "lookup_date": today,
-                "lookup_timestamp": item.price.lookup_timestamp.isoformat(),
-                "sku": item.inventory.sku,
-                "card_name": item.inventory.card_name,
-                "set_name": item.inventory.set_name,
-                "card_number": item.inventory.card_number,
-                "finish": item.inventory.finish,
-                "quantity": item.inventory.quantity,
-                "current_price": item.inventory.current_price,
-                "pricing_basis": item.decision.pricing_basis.value,
-                "market_price": item.price.market_price,
-                "low_price": item.price.low_price,
-                "mid_price": item.price.mid_price,
-                "high_price": item.price.high_price,
-                "suggested_site_price": item.decision.new_price,
-                "tcgplayer_product_id": item.match.product_id,
-                "tcgplayer_sku_id": item.match.sku_id,
-                "source": item.price.source,
-                "match_method": item.match.method,
-                "lookup_status": item.price.lookup_status,
-                "notes": item.match.notes or "",
-            })
-
-        write_header = not self.path.exists()
-        with self.path.open("a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=HISTORY_FIELDS)
-            if write_header:
-                writer.writeheader()
-            writer.writerows(rows_to_add)
-        return len(rows_to_add)
+    def _migrate(self) -> None:
+        # One-time import of the legacy CSV; the CSV itself is left untouched.
+        if self.db.get_meta("migrated_from") is not None:
+            return
+        imported = self.db.import_csv(str(self.path)) if self.db.count() == 0 else 0
+        self.db.set_meta("migrated_from", str(self.path))
+        if imported:
+            self.logger.info("history_migrated rows=%s from=%s", imported, self.path)
+
+    def _parts(self) -> list[Path]:
+        # Parquet part files in append order (names start with their date).
+        return sorted(self.path.glob("*.parquet")) if self.path.is_dir() else []
+
+    def daily_writer(self, force: bool = False, today: str | None = None) -> DailyHistoryWriter | SqliteHistoryWriter | ParquetHistoryWriter:
+        # `today` is the run's lookup_date (run_date() when not given).
+        if self.db:
+            return SqliteHistoryWriter(self.db, self.logger, force, today)
+        if self.backend == "parquet":
+            return ParquetHistoryWriter(self.path, self.logger, force, today)
+        return DailyHistoryWriter(self.path, self.logger, force, today)
+
+    def append_daily(self, items: list[ItemState], force: bool = False, today: str | None = None) -> int:
+        with self.daily_writer(force, today) as writer:
+            return writer.append(items)
+
+    def version(self) -> str:
+        # Changes whenever rows are appended; used to tell when derived data is out of date.
+        if self.db:
+            return f"sqlite:{self.db.max_id()}"
+        if self.backend == "parquet":
+            parts = self._parts()
+            return f"parquet:{len(parts)}:{parts[-1].name if parts else ''}"
+        if not self.path.exists():
+            return "csv:0"
+        stat = self.path.stat()
+        return f"csv:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def cursor(self) -> int:
+        # Position of the end of the history (last row id, part count, or CSV size in bytes); see
+        # iter_rows(after=...).
+        if self.db:
+            return self.db.max_id()
+        if self.backend == "parquet":
+            return len(self._parts())
+        return self.path.stat().st_size if self.path.exists() else 0
+
+    def iter_rows(self, since: str | None = None, fields: list[str] | None = None, after: int = 0) -> Iterator[dict]:
+        # `fields` lets the SQLite and Parquet backends read only some columns; CSV rows always carry every
+        # field. `after` is a cursor() value: only rows appended since then are returned. Values are
+        # text, as read from a CSV.
+        if self.db:
+            yield from self.db.iter_rows(since, fields, after)
+            return
+        if self.backend == "parquet":
+            for part in self._parts()[after:]:
+                for batch in iter_batches(part, fields):
+                    names = batch.schema.names
+                    for values in zip(*[text_column(c) for c in batch.columns]):
+                        row = dict(zip(names, values))
+                        if not since or row.get("lookup_date", "") >= since:
+                            yield row
+            return
+        if not self.path.exists():
+            return
+        with self.path.open("rb") as raw:
+            raw.seek(after)
+            f = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+            for row in csv.DictReader(f, fieldnames=HISTORY_FIELDS if after else None):
+                if not since or row.get("lookup_date", "") >= since:
+                    yield row
+
+    def iter_columns(self, fields: list[str], after: int = 0, size: int = INSERT_CHUNK) -> Iterator[dict]:
+        # iter_rows(fields=..., after=...) as column chunks. Parquet float columns come straight from the
+        # file as NumPy arrays; other backends transpose chunks of text rows.
+        if self.backend == "parquet":
+            for part in self._parts()[after:]:
+                for batch in iter_batches(part, fields):
+                    yield {name: numeric_or_text(column) for name, column in zip(batch.schema.names, batch.columns)}
+            return
+        for chunk in chunked(self.iter_rows(fields=fields, after=after), size):
+            yield {name: [row.get(name) for row in chunk] for name in fields}
+
+    def export_csv(self, path: str | None = None, since: str | None = None) -> int:
+        # Writes the history with HISTORY_FIELDS columns (defaults to history_csv_path); a .parquet or
+        # .arrow target is written as a single Arrow file.
+        target = Path(path) if path else self.path
+        if not self.db and target.resolve() == self.path.resolve():
+            raise ValueError(f"{self.backend} history backend cannot export onto its own path")
+        with open_table_writer(str(target), HISTORY_FIELDS) as writer:
+            return writer.write_rows(self.iter_rows(since))
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+
+from .cache_store import FRESH, CacheStore
+from .matching_engine import match_fingerprint
+from .models import InventoryRow, ItemState, MatchCandidate, MatchResult, MatchStatus
+from .price_cache import from_payload, to_payload
+from .utils import fingerprint
+
+NEW = "new"
+CHANGED = "changed"
+STALE = "stale"
+
+
+def row_hash(inv: InventoryRow) -> str:
+    return fingerprint(match_fingerprint(inv), inv.quantity, inv.current_price)
+
+
+def match_to_dict(m: MatchResult) -> dict:
+    out = asdict(m)
+    out["status"] = m.status.value
+    return out
+
+
+def match_from_dict(data: dict) -> MatchResult:
+    data = dict(data)
+    data["status"] = MatchStatus(data["status"])
+    data["candidates"] = [MatchCandidate(**c) for c in data.get("candidates") or []]
+    return MatchResult(**data)
+
+
+@dataclass(slots=True)
+class RowPlan:
+    new: list[ItemState] = field(default_factory=list)
+    changed: list[ItemState] = field(default_factory=list)
+    stale: list[ItemState] = field(default_factory=list)
+    fresh: list[ItemState] = field(default_factory=list)
+
+    def to_match(self) -> list[ItemState]:
+        # Unchanged rows keep their stored match unless it was unusable last time.
+        return self.new + self.changed + [i for i in self.stale if i.match.status != MatchStatus.MATCHED]
+
+    def to_price(self) -> list[ItemState]:
+        return self.new + self.changed + self.stale
+
+    def counts(self) -> dict[str, int]:
+        return {NEW: len(self.new), CHANGED: len(self.changed), STALE: len(self.stale), FRESH: len(self.fresh)}
+
+
+class IncrementalSync:
+    # Remembers each row's content hash and last match/price outcome so unchanged rows with a
+    # fresh price can skip matching and pricing lookups entirely.
+    def __init__(self, store: CacheStore, logger) -> None:
+        self.store = store
+        self.logger = logger
+
+    @staticmethod
+    def _trackable(item: ItemState) -> bool:
+        # Rows without a usable SKU (blank or duplicate) cannot be keyed, so they are always processed.
+        return bool(item.inventory.sku) and not item.inventory.validation_errors
+
+    def plan(self, items: list[ItemState]) -> RowPlan:
+        plan = RowPlan()
+        skus = [i.inventory.sku for i in items if self._trackable(i)]
+        states = self.store.get_row_states(skus)
+        # A match resolved after the state was saved (e.g. manually in the GUI) invalidates it.
+        resolved_at = self.store.get_match_resolution_times(list(states))
+        for item in items:
+            state = states.get(item.inventory.sku) if self._trackable(item) else None
+            if state is None:
+                plan.new.append(item)
+                continue
+            if state["row_hash"] != row_hash(item.inventory) or resolved_at.get(item.inventory.sku, "") > state["updated_at"]:
+                plan.changed.append(item)
+                continue
+            item.match = match_from_dict(state["match"])
+            item.do_not_update = state["do_not_update"]
+            item.price = from_payload(state["price"]) if state["price"] else None
+            fresh = (
+                item.match.status == MatchStatus.MATCHED
+                and item.price is not None
+                and not state["error"]
+                and self.store.freshness.classify(item.price.lookup_timestamp, item.inventory.category, item.price.market_price) == FRESH
+            )
+            if fresh:
+                plan.fresh.append(item)
+            else:
+                item.price = None
+                plan.stale.append(item)
+        self.logger.info("incremental_plan %s", plan.counts())
+        return plan
+
+    def record(self, items: list[ItemState]) -> int:
+        records = [
+            {
+                "sku": i.inventory.sku,
+                "row_hash": row_hash(i.inventory),
+                "match": match_to_dict(i.match),
+                "price": to_payload(i.price) if i.price else None,
+                "do_not_update": i.do_not_update,
+                "error": i.error,
+            }
+            for i in items
+            if self._trackable(i)
+        ]
+        self.store.set_row_states(records)
+        return len(records)
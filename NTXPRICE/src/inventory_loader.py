@@ -1,8 +1,15 @@
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
 import csv
-from decimal import Decimal
+import gc
+import io
+import multiprocessing
+import os
+from decimal import Decimal, InvalidOperation
 from pathlib import Path
+from typing import Iterator
+from .arrow_io import arrow_format, iter_text_rows, schema_names
 from .models import InventoryRow
 from .validators import (
     validate_columns,
@@ -13,52 +20,271 @@ from .validators import (
 )
 
 
-def load_inventory(path: str) -> tuple[list[InventoryRow], list[str]]:
+def _parse_row(idx: int, raw: dict, seen_skus: set[str], keep_raw: bool) -> InventoryRow:
+    sku = (raw.get("sku") or "").strip()
+    card_name = (raw.get("card_name") or "").strip()
+    qty, qty_err = parse_int((raw.get("quantity") or "").strip(), "quantity")
+    cur, cur_err = parse_decimal((raw.get("current_price") or "").strip(), "current_price")
+    product_id, pid_err = parse_optional_int((raw.get("tcgplayer_product_id") or "").strip(), "tcgplayer_product_id")
+    sku_id, sid_err = parse_optional_int((raw.get("tcgplayer_sku_id") or raw.get("product_condition_id") or "").strip(), "tcgplayer_sku_id")
+
+    inv = InventoryRow(
+        row_number=idx,
+        sku=sku,
+        card_name=card_name,
+        set_name=(raw.get("set_name") or "").strip(),
+        card_number=(raw.get("card_number") or "").strip(),
+        rarity=(raw.get("rarity") or "").strip(),
+        finish=(raw.get("finish") or "").strip(),
+        language=(raw.get("language") or "").strip(),
+        quantity=qty if qty is not None else 0,
+        current_price=cur if cur is not None else Decimal("0"),
+        tcgplayer_product_id=product_id,
+        tcgplayer_sku_id=sku_id,
+        tcgplayer_url=(raw.get("tcgplayer_url") or "").strip() or None,
+        category=(raw.get("category") or "").strip() or None,
+        notes=(raw.get("notes") or "").strip() or None,
+        raw_data=raw if keep_raw else {},
+    )
+
+    if not card_name:
+        inv.validation_errors.append("Blank card_name")
+    for e in [qty_err, cur_err, pid_err, sid_err, validate_tcg_url(inv.tcgplayer_url)]:
+        if e:
+            inv.validation_errors.append(e)
+    if sku in seen_skus:
+        inv.validation_errors.append(f"Duplicate SKU: {sku}")
+    seen_skus.add(sku)
+    return inv
+
+
+PARALLEL_MIN_BYTES = 256 * 1024 * 1024
+MAX_LOAD_WORKERS = 8
+CHUNKS_PER_WORKER = 4
+SCAN_BLOCK = 4 * 1024 * 1024
+_ZERO = Decimal("0")
+_TEXT_COLUMNS = ("sku", "card_name", "set_name", "card_number", "rarity", "finish", "language", "quantity",
+                 "current_price", "tcgplayer_product_id", "tcgplayer_sku_id", "product_condition_id",
+                 "tcgplayer_url", "category", "notes")
+
+
+def _raw_dict(fieldnames: list[str], row: list[str]) -> dict:
+    # DictReader's view of a record: short rows pad with None, extra values go under the None key.
+    raw = dict(zip(fieldnames, row))
+    if len(row) < len(fieldnames):
+        raw.update((name, None) for name in fieldnames[len(row):])
+    elif len(row) > len(fieldnames):
+        raw[None] = row[len(fieldnames):]
+    return raw
+
+
+def _fast_rows(reader, fieldnames: list[str], seen_skus: set[str] | None, keep_raw: bool) -> Iterator[InventoryRow]:
+    # Same rows and errors as DictReader + _parse_row, but column positions are resolved once, values are
+    # read by index, and error strings are only built for values that fail to parse. With seen_skus=None
+    # the duplicate check is left to the caller (parallel chunks).
+    width = len(fieldnames)
+    pos = {name: i for i, name in enumerate(fieldnames)}  # last duplicate header wins, as in DictReader
+    missing = width
+    (i_sku, i_name, i_set, i_number, i_rarity, i_finish, i_lang, i_qty, i_price, i_pid, i_sid, i_cond, i_url,
+     i_category, i_notes) = (pos.get(c, missing) for c in _TEXT_COLUMNS)
+    idx = 1
+    for row in reader:
+        if not row:
+            continue  # DictReader skips blank lines without counting them
+        idx += 1
+        raw = _raw_dict(fieldnames, row) if keep_raw else {}
+        if len(row) != width:
+            row = (row + [""] * width)[:width]
+        row.append("")  # absent columns point at this slot
+        errors: list[str] = []
+
+        sku = row[i_sku].strip()
+        card_name = row[i_name].strip()
+        if not card_name:
+            errors.append("Blank card_name")
+        value = row[i_qty].strip()
+        try:
+            qty = int(value)
+        except ValueError:
+            qty = 0
+            errors.append(f"Invalid integer for quantity: {value}")
+        value = row[i_price].strip()
+        try:
+            price = Decimal(value)
+        except (InvalidOperation, ValueError):
+            price = _ZERO
+            errors.append(f"Invalid decimal for current_price: {value}")
+        product_id = sku_id = None
+        if value := row[i_pid].strip():
+            try:
+                product_id = int(value)
+            except ValueError:
+                errors.append(f"Invalid integer for tcgplayer_product_id: {value}")
+        if value := (row[i_sid] or row[i_cond]).strip():
+            try:
+                sku_id = int(value)
+            except ValueError:
+                errors.append(f"Invalid integer for tcgplayer_sku_id: {value}")
+        url = row[i_url].strip() or None
+        if url and "tcgplayer.com" not in url:
+            errors.append(f"Malformed tcgplayer_url: {url}")
+        if seen_skus is not None:
+            if sku in seen_skus:
+                errors.append(f"Duplicate SKU: {sku}")
+            seen_skus.add(sku)
+
+        yield InventoryRow(
+            row_number=idx,
+            sku=sku,
+            card_name=card_name,
+            set_name=row[i_set].strip(),
+            card_number=row[i_number].strip(),
+            rarity=row[i_rarity].strip(),
+            finish=row[i_finish].strip(),
+            language=row[i_lang].strip(),
+            quantity=qty,
+            current_price=price,
+            tcgplayer_product_id=product_id,
+            tcgplayer_sku_id=sku_id,
+            tcgplayer_url=url,
+            category=row[i_category].strip() or None,
+            notes=row[i_notes].strip() or None,
+            raw_data=raw,
+            validation_errors=errors,
+        )
+
+
+def iter_inventory(path: str, errors: list[str], keep_raw: bool = True, fast: bool = True) -> Iterator[InventoryRow]:
+    # Yields rows one at a time; file-level errors are appended to `errors` as they are found.
+    # fast=False keeps the original DictReader path (used by the loader benchmark). Parquet / Arrow IPC
+    # files are read batch by batch and their values validated as CSV text.
     p = Path(path)
     if not p.exists():
-        return [], [f"Inventory file not found: {path}"]
+        errors.append(f"Inventory file not found: {path}")
+        return
+    if arrow_format(p):
+        fieldnames = schema_names(p)
+        errors.extend(validate_columns(fieldnames))
+        yield from _fast_rows(iter_text_rows(p), fieldnames, set(), keep_raw)
+        return
 
     with p.open("r", newline="", encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        errors = validate_columns(reader.fieldnames or [])
-        rows: list[InventoryRow] = []
         seen_skus: set[str] = set()
-
+        if fast:
+            reader = csv.reader(f)
+            fieldnames = next(reader, None) or []
+            errors.extend(validate_columns(fieldnames))
+            yield from _fast_rows(reader, fieldnames, seen_skus, keep_raw)
+            return
+        reader = csv.DictReader(f)
+        errors.extend(validate_columns(reader.fieldnames or []))
         for idx, raw in enumerate(reader, start=2):
-            sku = (raw.get("sku") or "").strip()
-            card_name = (raw.get("card_name") or "").strip()
-            qty, qty_err = parse_int((raw.get("quantity") or "").strip(), "quantity")
-            cur, cur_err = parse_decimal((raw.get("current_price") or "").strip(), "current_price")
-            product_id, pid_err = parse_optional_int((raw.get("tcgplayer_product_id") or "").strip(), "tcgplayer_product_id")
-            sku_id, sid_err = parse_optional_int((raw.get("tcgplayer_sku_id") or raw.get("product_condition_id") or "").strip(), "tcgplayer_sku_id")
-
-            inv = InventoryRow(
-                row_number=idx,
-                sku=sku,
-                card_name=card_name,
-                set_name=(raw.get("set_name") or "").strip(),
-                card_number=(raw.get("card_number") or "").strip(),
-                rarity=(raw.get("rarity") or "").strip(),
-                finish=(raw.get("finish") or "").strip(),
-                language=(raw.get("language") or "").strip(),
-                quantity=qty if qty is not None else 0,
-                current_price=cur if cur is not None else Decimal("0"),
-                tcgplayer_product_id=product_id,
-                tcgplayer_sku_id=sku_id,
-                tcgplayer_url=(raw.get("tcgplayer_url") or "").strip() or None,
-                category=(raw.get("category") or "").strip() or None,
-                notes=(raw.get("notes") or "").strip() or None,
-                raw_data=raw,
-            )
-
-            if not card_name:
-                inv.validation_errors.append("Blank card_name")
-            for e in [qty_err, cur_err, pid_err, sid_err, validate_tcg_url(inv.tcgplayer_url)]:
-                if e:
-                    inv.validation_errors.append(e)
-            if sku in seen_skus:
-                inv.validation_errors.append(f"Duplicate SKU: {sku}")
-            seen_skus.add(sku)
-            rows.append(inv)
+            yield _parse_row(idx, raw, seen_skus, keep_raw)
+
+
+def _record_starts(path: str, start: int, end: int, parts: int) -> list[int]:
+    # Byte offsets near `parts` equal slices of [start, end) where a new CSV record begins. A newline
+    # ends a record only when an even number of quote characters precede it: csv.writer (RFC 4180)
+    # doubles embedded quotes, so an odd count means the newline is inside a quoted field.
+    points = [start]
+    with open(path, "rb") as f:
+        f.seek(start)
+        pos, odd = start, 0
+        for target in (start + (end - start) * k // parts for k in range(1, parts)):
+            if target <= points[-1]:
+                continue
+            while pos < target:
+                block = f.read(min(SCAN_BLOCK, target - pos))
+                odd ^= block.count(b'"') & 1
+                pos += len(block)
+            found = None
+            while found is None and (block := f.read(SCAN_BLOCK)):
+                i = 0
+                while (nl := block.find(b"\n", i)) >= 0:
+                    odd ^= block.count(b'"', i, nl) & 1
+                    i = nl + 1
+                    if not odd:
+                        found = pos + i
+                        break
+                if found is None:
+                    odd ^= block.count(b'"', i) & 1
+                    pos += len(block)
+            if found is None or found >= end:
+                break
+            points.append(found)
+            f.seek(found)
+            pos = found
+    return points + [end]
+
+
+def _read_header(path: str) -> tuple[list[str], int]:
+    # Header fields and the byte offset where the first data record starts.
+    with open(path, "rb") as f:
+        head = f.read(SCAN_BLOCK)
+    nl = -1
+    while (nl := head.find(b"\n", nl + 1)) >= 0 and head.count(b'"', 0, nl) & 1:
+        pass
+    end = nl + 1 if nl >= 0 else len(head)
+    fieldnames = next(csv.reader(io.StringIO(head[:end].decode("utf-8-sig"), newline="")), [])
+    return fieldnames, end
+
+
+def _parse_chunk(path: str, start: int, end: int, fieldnames: list[str], keep_raw: bool) -> list[InventoryRow]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # Pool processes only parse; see load_inventory for why the GC is paused.
+    gc.disable()
+    reader = csv.reader(io.StringIO(data.decode("utf-8"), newline=""))
+    return list(_fast_rows(reader, fieldnames, None, keep_raw))
+
+
+def _load_parallel(path: str, errors: list[str], keep_raw: bool, workers: int) -> list[InventoryRow]:
+    fieldnames, data_start = _read_header(path)
+    errors.extend(validate_columns(fieldnames))
+    bounds = _record_starts(path, data_start, os.path.getsize(path), workers * CHUNKS_PER_WORKER)
+    rows: list[InventoryRow] = []
+    seen_skus: set[str] = set()
+    # spawn: workers start clean (no inherited locks or sockets) on every platform.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(_parse_chunk, path, a, b, fieldnames, keep_raw) for a, b in zip(bounds, bounds[1:])]
+        for future in futures:
+            chunk = future.result()
+            # Chunks number their rows from 2; shift them behind the rows already merged and
+            # run the duplicate-SKU check in file order, so results match the serial loader.
+            base = len(rows)
+            for row in chunk:
+                row.row_number += base
+                if row.sku in seen_skus:
+                    row.validation_errors.append(f"Duplicate SKU: {row.sku}")
+                seen_skus.add(row.sku)
+            rows.extend(chunk)
+    return rows
+
 
+def load_inventory(
+    path: str,
+    keep_raw: bool = True,
+    fast: bool = True,
+    workers: int = 0,
+    parallel_min_bytes: int = PARALLEL_MIN_BYTES,
+) -> tuple[list[InventoryRow], list[str]]:
+    # CSV files of at least parallel_min_bytes are parsed in a process pool (workers=0: one per CPU, up to
+    # MAX_LOAD_WORKERS); smaller files, fast=False, a single worker, or Arrow files use the serial reader.
+    errors: list[str] = []
+    workers = workers or min(os.cpu_count() or 1, MAX_LOAD_WORKERS)
+    # Rows form no reference cycles; pausing the cyclic GC avoids rescanning the growing list on every
+    # collection, which otherwise dominates large loads.
+    paused = fast and gc.isenabled()
+    if paused:
+        gc.disable()
+    try:
+        parallel = fast and workers > 1 and not arrow_format(path)
+        if parallel and Path(path).exists() and os.path.getsize(path) >= parallel_min_bytes:
+            rows = _load_parallel(path, errors, keep_raw, workers)
+        else:
+            rows = list(iter_inventory(path, errors, keep_raw, fast))
+    finally:
+        if paused:
+            gc.enable()
     return rows, errors
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+
+from .catalog_store import CatalogStore
+from .match_scoring import MatchQuery, score_candidates
+from .models import MatchCandidate, PriceResult
+
+
+class LocalCatalogProvider:
+    # Serves catalog lookups from the synced SQLite catalog and only asks `remote` on a miss.
+    def __init__(self, store: CatalogStore, remote=None, logger=None) -> None:
+        self.store = store
+        self.remote = remote
+        self.logger = logger
+        self.local_hits = 0
+        self.remote_lookups = 0
+        # Matching calls in from map_ordered worker threads.
+        self._stats_lock = threading.Lock()
+
+    def _hit(self, count: int = 1) -> None:
+        with self._stats_lock:
+            self.local_hits += count
+
+    def _remote(self, method: str, *args, default=None):
+        if self.remote is None:
+            return default
+        with self._stats_lock:
+            self.remote_lookups += 1
+        try:
+            return getattr(self.remote, method)(*args)
+        except Exception as exc:
+            # The local catalog had no answer either; re-raise so the row is an ERROR rather than a
+            # "not found" that could be cached.
+            if self.logger:
+                self.logger.warning("Remote %s failed and the local catalog has no answer: %s", method, exc)
+            raise
+
+    def get_product(self, product_id: int) -> dict | None:
+        found = self.store.get_products([product_id]).get(product_id)
+        if found:
+            self._hit()
+            return found
+        return self._remote("get_product", product_id)
+
+    def get_sku(self, sku_id: int) -> dict | None:
+        found = self.store.get_skus([sku_id]).get(sku_id)
+        if found:
+            self._hit()
+            return found
+        return self._remote("get_sku", sku_id)
+
+    def get_products_batch(self, product_ids: list[int]) -> dict[int, dict]:
+        found = self.store.get_products(product_ids)
+        self._hit(len(found))
+        missing = [i for i in product_ids if i not in found]
+        if missing:
+            found.update(self._remote("get_products_batch", missing, default={}))
+        return found
+
+    def get_skus_batch(self, sku_ids: list[int]) -> dict[int, dict]:
+        found = self.store.get_skus(sku_ids)
+        self._hit(len(found))
+        missing = [i for i in sku_ids if i not in found]
+        if missing:
+            found.update(self._remote("get_skus_batch", missing, default={}))
+        return found
+
+    def search_catalog(self, card_name: str, limit: int = 20) -> list[dict]:
+        return self.search_local(card_name, limit) or self.search_remote(card_name, limit)
+
+    def search_local(self, card_name: str, limit: int = 20) -> list[dict]:
+        results = self.store.search(card_name, limit)
+        if results:
+            self._hit()
+        return results
+
+    def search_remote(self, card_name: str, limit: int = 20) -> list[dict]:
+        return self._remote("search_catalog", card_name, limit, default=[])
+
+    def search_products(self, card_name: str, set_name: str | None = None, limit: int = 20) -> list[MatchCandidate]:
+        return score_candidates(self.search_catalog(card_name, limit), MatchQuery(card_name, set_name))
+
+    def get_pricing(self, product_id: int | None = None, sku_id: int | None = None) -> PriceResult | None:
+        return self.remote.get_pricing(product_id, sku_id) if self.remote else None
+
+    def get_pricing_batch(self, sku_ids: list[int], product_ids: list[int]) -> tuple[dict[int, PriceResult], dict[int, PriceResult]]:
+        return self.remote.get_pricing_batch(sku_ids, product_ids) if self.remote else ({}, {})
+
+    def stats(self) -> dict[str, int]:
+        with self._stats_lock:
+            return {"local_hits": self.local_hits, "remote_lookups": self.remote_lookups}
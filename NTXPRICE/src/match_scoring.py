@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import re
+import unicodedata
+
+from .models import InventoryRow, MatchCandidate
+
+NAME_WEIGHT = 0.6
+SET_WEIGHT = 0.25
+NUMBER_WEIGHT = 0.1
+RARITY_WEIGHT = 0.05
+FINISH_WEIGHT = 0.05
+# Partial set similarity is cubed: a different printing's set ("magic 2011" vs "magic 2010", dice 0.82)
+# keeps little credit, so reprints stay more than MatchingEngine's ambiguity margin behind an exact set.
+SET_SIMILARITY_POWER = 3
+
+# Common set codes seen in POS exports, mapped to TCGplayer group names (already normalized).
+SET_ALIASES: dict[str, str] = {
+    "lea": "limited edition alpha",
+    "leb": "limited edition beta",
+    "2ed": "unlimited edition",
+    "3ed": "revised edition",
+    "ice": "ice age",
+    "m10": "magic 2010",
+    "m11": "magic 2011",
+    "m12": "magic 2012",
+    "m13": "magic 2013",
+    "m14": "magic 2014",
+    "m15": "magic 2015",
+    "m19": "core set 2019",
+    "m20": "core set 2020",
+    "m21": "core set 2021",
+}
+
+RARITY_CODES = {
+    "c": "c", "common": "c",
+    "u": "u", "uncommon": "u",
+    "r": "r", "rare": "r",
+    "m": "m", "mythic": "m", "mythic rare": "m",
+    "s": "s", "special": "s",
+    "l": "l", "land": "l", "basic land": "l",
+    "t": "t", "token": "t",
+    "p": "p", "promo": "p",
+}
+
+_PUNCT = re.compile(r"[^a-z0-9/ ]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text: str | None) -> str:
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = text.replace("&", " and ").replace("'", "")
+    text = _PUNCT.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def normalize_name(name: str | None) -> str:
+    # "Fire // Ice" and "Fire/Ice" both become "fire ice".
+    return _SPACES.sub(" ", normalize(name).replace("/", " ")).strip()
+
+
+def normalize_set(set_name: str | None) -> str:
+    s = normalize_name(set_name)
+    return SET_ALIASES.get(s, s)
+
+
+def normalize_number(number: str | None) -> str:
+    n = normalize(number).replace(" ", "")
+    # "146/249" and "0146" both compare as "146".
+    n = n.split("/")[0]
+    return n.lstrip("0") or n
+
+
+def normalize_rarity(rarity: str | None) -> str:
+    r = normalize(rarity)
+    return RARITY_CODES.get(r, r[:1])
+
+
+def ngrams(text: str, n: int = 3) -> frozenset[str]:
+    if not text:
+        return frozenset()
+    padded = f"  {text} "
+    return frozenset(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+
+def dice(a: frozenset[str], b: frozenset[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _extended(item: dict, *names: str) -> str | None:
+    for entry in item.get("extendedData") or []:
+        if entry.get("name") in names:
+            return entry.get("value")
+    return None
+
+
+@dataclass(slots=True)
+class MatchQuery:
+    card_name: str
+    set_name: str | None = None
+    card_number: str | None = None
+    rarity: str | None = None
+    finish: str | None = None
+
+    @classmethod
+    def from_row(cls, inv: InventoryRow) -> MatchQuery:
+        return cls(inv.card_name, inv.set_name, inv.card_number, inv.rarity, inv.finish)
+
+
+@dataclass(slots=True)
+class _Fields:
+    # Normalized fields of a catalog result or a query.
+    name: str
+    name_grams: frozenset[str]
+    set_name: str
+    set_grams: frozenset[str]
+    number: str
+    rarity: str
+    finish: str
+
+    @classmethod
+    def of(cls, name: str | None, set_name: str | None, number: str | None, rarity: str | None, finish: str | None) -> _Fields:
+        name = normalize_name(name)
+        set_name = normalize_set(set_name)
+        return cls(
+            name, ngrams(name), set_name, ngrams(set_name), normalize_number(number), normalize_rarity(rarity), normalize(finish)
+        )
+
+
+def _result_fields(item: dict) -> _Fields:
+    return _Fields.of(
+        item.get("name") or item.get("productName"),
+        item.get("groupName"),
+        _extended(item, "Number") or item.get("number"),
+        _extended(item, "Rarity") or item.get("rarity"),
+        item.get("printing") or item.get("finish"),
+    )
+
+
+def _score(entry: _Fields, q: _Fields) -> float:
+    name_score = 1.0 if q.name == entry.name else dice(q.name_grams, entry.name_grams)
+    total = NAME_WEIGHT * name_score
+    weight = NAME_WEIGHT
+    if q.set_name and entry.set_name:
+        total += SET_WEIGHT * (1.0 if q.set_name == entry.set_name else dice(q.set_grams, entry.set_grams) ** SET_SIMILARITY_POWER)
+        weight += SET_WEIGHT
+    if q.number and entry.number:
+        total += NUMBER_WEIGHT * (q.number == entry.number)
+        weight += NUMBER_WEIGHT
+    if q.rarity and entry.rarity:
+        total += RARITY_WEIGHT * (q.rarity == entry.rarity)
+        weight += RARITY_WEIGHT
+    if q.finish and entry.finish:
+        total += FINISH_WEIGHT * (q.finish == entry.finish)
+        weight += FINISH_WEIGHT
+    return total / weight
+
+
+def score_candidates(results: list[dict], query: MatchQuery) -> list[MatchCandidate]:
+    # A search returns one page of results, so each is scored directly against the query, which is
+    # normalized once.
+    q = _Fields.of(query.card_name, query.set_name, query.card_number, query.rarity, query.finish)
+    out = [
+        MatchCandidate(
+            product_id=int(item["productId"]),
+            sku_id=None,
+            product_name=item.get("name", ""),
+            set_name=item.get("groupName"),
+            finish=None,
+            condition=None,
+            language=None,
+            confidence=round(min(_score(_result_fields(item), q), 0.99), 4),
+            notes="search",
+        )
+        for item in results
+    ]
+    out.sort(key=lambda c: c.confidence, reverse=True)
+    return out
@@ -1,14 +1,126 @@
 from __future__ import annotations
 
-from .models import ItemState, MatchResult, MatchStatus
+from typing import Callable
+from .cache_store import search_cache_key
+from .local_catalog_provider import LocalCatalogProvider
+from .models import ItemState, MatchCandidate, MatchResult, MatchStatus, InventoryRow
+from .match_scoring import MatchQuery, score_candidates
+from .utils import fingerprint, map_ordered
 from .validators import parse_id_from_url
 
 
+SEARCH_LIMIT = 20
+# The best search candidate must beat the runner-up by this much to be matched without review.
+AMBIGUITY_MARGIN = 0.08
+
+
+def match_fingerprint(inv: InventoryRow) -> str:
+    return fingerprint(
+        inv.card_name, inv.set_name, inv.card_number, inv.rarity, inv.finish, inv.language,
+        inv.tcgplayer_product_id, inv.tcgplayer_sku_id, inv.tcgplayer_url,
+    )
+
+
+def review_reason(cands: list[MatchCandidate], min_confidence: float) -> str | None:
+    # Why the best of `cands` (sorted, best first) needs manual review, or None if it can be matched.
+    if cands[0].confidence < min_confidence:
+        return "Low confidence; manual review required"
+    if len(cands) > 1 and cands[0].confidence - cands[1].confidence < AMBIGUITY_MARGIN:
+        return "Manual review required"
+    return None
+
+
 class MatchingEngine:
-    def __init__(self, provider, logger, include_out_of_stock: bool = False) -> None:
+    def __init__(
+        self,
+        provider,
+        logger,
+        include_out_of_stock: bool = False,
+        max_workers: int = 1,
+        cache_store=None,
+        search_cache_ttl_hours: float | None = 168.0,
+        min_confidence: float = 0.6,
+    ) -> None:
         self.provider = provider
         self.logger = logger
         self.include_out_of_stock = include_out_of_stock
+        self.max_workers = max_workers
+        self.cache = cache_store
+        self.search_cache_ttl_hours = search_cache_ttl_hours
+        self.min_confidence = min_confidence
+        self._skus: dict[int, dict | None] = {}
+        self._products: dict[int, dict | None] = {}
+
+    def _get_sku(self, sku_id: int) -> dict | None:
+        if sku_id not in self._skus:
+            self._skus[sku_id] = self.provider.get_sku(sku_id)
+        return self._skus[sku_id]
+
+    def _get_product(self, product_id: int) -> dict | None:
+        if product_id not in self._products:
+            self._products[product_id] = self.provider.get_product(product_id)
+        return self._products[product_id]
+
+    def clear_lookups(self) -> None:
+        self._skus.clear()
+        self._products.clear()
+
+    def _search(self, inv: InventoryRow) -> list[MatchCandidate]:
+        query = MatchQuery.from_row(inv)
+        search = self.provider.search_catalog
+        if isinstance(self.provider, LocalCatalogProvider):
+            # Local catalog answers bypass the search cache, so a catalog sync shows up immediately.
+            if results := self.provider.search_local(inv.card_name, SEARCH_LIMIT):
+                return score_candidates(results, query)
+            search = self.provider.search_remote
+        results = None
+        key = search_cache_key(inv.card_name, SEARCH_LIMIT)
+        if self.cache:
+            results = self.cache.get_search_cache(key, self.search_cache_ttl_hours)
+        if results is None:
+            results = search(inv.card_name, SEARCH_LIMIT)
+            # Empty responses are not cached, so a card the API didn't know yet is searched again next run.
+            if self.cache and results:
+                self.cache.set_search_cache(key, inv.card_name, results)
+        return score_candidates(results, query)
+
+    def _known_ids(self, item: ItemState) -> tuple[list[int], list[int]]:
+        inv = item.inventory
+        sku_ids = [inv.tcgplayer_sku_id] if inv.tcgplayer_sku_id else []
+        product_ids = [inv.tcgplayer_product_id] if inv.tcgplayer_product_id else []
+        if inv.tcgplayer_url:
+            url_product_id, url_sku_id = parse_id_from_url(inv.tcgplayer_url)
+            if url_sku_id:
+                sku_ids.append(url_sku_id)
+            if url_product_id:
+                product_ids.append(url_product_id)
+        return sku_ids, product_ids
+
+    def resolve_ids(self, items: list[ItemState]) -> None:
+        sku_ids: list[int] = []
+        product_ids: list[int] = []
+        for item in items:
+            if (not item.inventory.in_stock) and (not self.include_out_of_stock):
+                continue
+            skus, products = self._known_ids(item)
+            sku_ids.extend(i for i in skus if i not in self._skus)
+            product_ids.extend(i for i in products if i not in self._products)
+        sku_ids = list(dict.fromkeys(sku_ids))
+        product_ids = list(dict.fromkeys(product_ids))
+        if not sku_ids and not product_ids:
+            return
+        try:
+            skus = self.provider.get_skus_batch(sku_ids) if sku_ids else {}
+            products = self.provider.get_products_batch(product_ids) if product_ids else {}
+        except Exception:
+            # Unresolved IDs fall back to per-item lookups in match_item.
+            self.logger.exception("Bulk catalog resolution failed skus=%s products=%s", len(sku_ids), len(product_ids))
+            return
+        for sku_id in sku_ids:
+            self._skus[sku_id] = skus.get(sku_id)
+        for product_id in product_ids:
+            self._products[product_id] = products.get(product_id)
+        self.logger.info("bulk_catalog_resolution skus=%s/%s products=%s/%s", len(skus), len(sku_ids), len(products), len(product_ids))
 
     def match_item(self, item: ItemState) -> MatchResult:
         inv = item.inventory
@@ -17,7 +129,7 @@ class MatchingEngine:
 
         try:
             if inv.tcgplayer_sku_id:
-                sku = self.provider.get_sku(inv.tcgplayer_sku_id)
+                sku = self._get_sku(inv.tcgplayer_sku_id)
                 if sku:
                     return MatchResult(
                         status=MatchStatus.MATCHED,
@@ -33,7 +145,7 @@ class MatchingEngine:
                     )
 
             if inv.tcgplayer_product_id:
-                p = self.provider.get_product(inv.tcgplayer_product_id)
+                p = self._get_product(inv.tcgplayer_product_id)
                 if p:
                     return MatchResult(
                         status=MatchStatus.MATCHED,
@@ -48,20 +160,20 @@ class MatchingEngine:
             if inv.tcgplayer_url:
                 product_id, sku_id = parse_id_from_url(inv.tcgplayer_url)
                 if sku_id:
-                    sku = self.provider.get_sku(sku_id)
+                    sku = self._get_sku(sku_id)
                     if sku:
                         return MatchResult(status=MatchStatus.MATCHED, method="url_sku", product_id=sku.get("productId"), sku_id=sku_id, product_name=sku.get("productName"), confidence=0.92)
                 if product_id:
-                    p = self.provider.get_product(product_id)
+                    p = self._get_product(product_id)
                     if p:
                         return MatchResult(status=MatchStatus.MATCHED, method="url_product", product_id=product_id, product_name=p.get("name"), confidence=0.9)
 
-            cands = self.provider.search_products(inv.card_name, inv.set_name)
+            cands = self._search(inv)
             if not cands:
                 return MatchResult(status=MatchStatus.UNMATCHED, method="search", notes="No candidates", approved=False)
             cands = sorted(cands, key=lambda c: c.confidence, reverse=True)
-            if len(cands) > 1 and abs(cands[0].confidence - cands[1].confidence) < 0.08:
-                return MatchResult(status=MatchStatus.AMBIGUOUS, method="search", candidates=cands[:5], confidence=cands[0].confidence, approved=False, notes="Manual review required")
+            if reason := review_reason(cands, self.min_confidence):
+                return MatchResult(status=MatchStatus.AMBIGUOUS, method="search", candidates=cands[:5], confidence=cands[0].confidence, approved=False, notes=reason)
 
             best = cands[0]
             return MatchResult(
@@ -81,6 +193,75 @@ class MatchingEngine:
             self.logger.exception("Match failure for sku=%s", inv.sku)
             return MatchResult(status=MatchStatus.ERROR, method="error", notes=str(exc), approved=False)
 
-    def run(self, items: list[ItemState]) -> None:
+    def apply_stored(self, items: list[ItemState]) -> list[ItemState]:
+        stored = self.cache.get_match_resolutions([i.inventory.sku for i in items if i.inventory.sku])
+        pending: list[ItemState] = []
         for item in items:
-            item.match = self.match_item(item)
+            inv = item.inventory
+            rec = stored.get(inv.sku) if inv.sku else None
+            if rec:
+                item.do_not_update = bool(rec["do_not_update"])
+            skipped = (not inv.in_stock) and (not self.include_out_of_stock)
+            if rec and not skipped and rec["fingerprint"] in (None, match_fingerprint(inv)) and (rec["product_id"] or rec["sku_id"]):
+                item.match = MatchResult(
+                    status=MatchStatus.MATCHED,
+                    method=rec["method"],
+                    product_id=rec["product_id"],
+                    sku_id=rec["sku_id"],
+                    product_name=rec["product_name"],
+                    confidence=rec["confidence"] or 0.0,
+                    notes="Reused stored match",
+                )
+            else:
+                pending.append(item)
+        self.logger.info("stored_matches reused=%s pending=%s", len(items) - len(pending), len(pending))
+        return pending
+
+    def _resolution(self, item: ItemState, method: str | None = None) -> dict:
+        return {
+            "sku": item.inventory.sku,
+            "product_id": item.match.product_id,
+            "sku_id": item.match.sku_id,
+            "product_name": item.match.product_name,
+            "method": method or item.match.method,
+            "confidence": item.match.confidence,
+            "fingerprint": match_fingerprint(item.inventory),
+            "do_not_update": item.do_not_update,
+        }
+
+    def store_resolutions(self, items: list[ItemState]) -> None:
+        records = [
+            self._resolution(i) for i in items
+            if i.inventory.sku and i.match.status == MatchStatus.MATCHED and i.match.approved
+        ]
+        self.cache.set_match_resolutions(records)
+
+    def resolve_manually(self, item: ItemState, candidate: MatchCandidate, do_not_update: bool | None = None) -> None:
+        if do_not_update is not None:
+            item.do_not_update = do_not_update
+        item.match = MatchResult(
+            status=MatchStatus.MATCHED,
+            method="manual",
+            product_id=candidate.product_id,
+            sku_id=candidate.sku_id,
+            product_name=candidate.product_name,
+            set_name=candidate.set_name,
+            confidence=1.0,
+            notes="Manually resolved",
+            candidates=item.match.candidates,
+        )
+        if self.cache and item.inventory.sku:
+            self.cache.set_match_resolutions([self._resolution(item)])
+
+    def run(self, items: list[ItemState], on_checkpoint: Callable[[list[ItemState]], None] | None = None, checkpoint_every: int = 0) -> None:
+        pending = self.apply_stored(items) if self.cache else items
+        self.resolve_ids(pending)
+        step = checkpoint_every if on_checkpoint and checkpoint_every > 0 else max(len(pending), 1)
+        for start in range(0, len(pending), step):
+            chunk = pending[start:start + step]
+            for item, result in zip(chunk, map_ordered(self.match_item, chunk, self.max_workers)):
+                item.match = result
+            if self.cache:
+                self.store_resolutions(chunk)
+            if on_checkpoint:
+                on_checkpoint(chunk)
@@ -119,6 +119,11 @@ class RunSummary:
     failed_rows: int = 0
     changed_rows: int = 0
     skipped_rows: int = 0
+    api_requests: int = 0
+    throttle_events: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    cache_stale: int = 0
 
 
 @dataclass(slots=True)
@@ -128,3 +133,5 @@ class RunResult:
     summary: RunSummary
     output_files: dict[str, str]
     errors: list[str]
+    diagnostics: dict[str, Any] = field(default_factory=dict)
+    run_id: str = ""
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import queue
+import threading
+import time
+from typing import Callable, Iterator
+
+from .models import ItemState
+
+_DONE = object()
+
+
+@dataclass(slots=True)
+class StageStats:
+    items: int = 0
+    batches: int = 0
+    busy_seconds: float = 0.0
+    # Matching: time blocked on a full queue (backpressure). Pricing: time starved on an empty one.
+    blocked_seconds: float = 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "items": self.items,
+            "batches": self.batches,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "items_per_sec": round(self.items / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+        }
+
+
+class PipelinedExecutor:
+    # Matches items in batches on a producer thread and hands each batch to pricing through a bounded
+    # queue, so the two network-bound stages overlap. Both engines normally share one provider and
+    # therefore one rate limiter; a full queue pauses matching until pricing catches up.
+    def __init__(self, matcher, pricer, logger, batch_size: int = 500, queue_size: int = 4) -> None:
+        self.matcher = matcher
+        self.pricer = pricer
+        self.logger = logger
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(1, queue_size)
+        self.match_stats = StageStats()
+        self.price_stats = StageStats()
+        self.max_queue_depth = 0
+        self.elapsed = 0.0
+
+    def _batches(self, items: list[ItemState]) -> Iterator[list[ItemState]]:
+        for start in range(0, len(items), self.batch_size):
+            yield items[start:start + self.batch_size]
+
+    def run(
+        self,
+        to_match: list[ItemState],
+        price_only: list[ItemState] | None = None,
+        on_matched: Callable[[list[ItemState]], None] | None = None,
+        on_priced: Callable[[list[ItemState]], None] | None = None,
+    ) -> None:
+        q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        cancelled = threading.Event()
+        errors: list[BaseException] = []
+
+        def put(batch) -> bool:
+            started = time.perf_counter()
+            while not cancelled.is_set():
+                try:
+                    q.put(batch, timeout=0.1)
+                except queue.Full:
+                    continue
+                self.match_stats.blocked_seconds += time.perf_counter() - started
+                self.max_queue_depth = max(self.max_queue_depth, q.qsize())
+                return True
+            return False
+
+        def produce() -> None:
+            try:
+                # Rows that already have a match go straight to pricing.
+                for batch in self._batches(price_only or []):
+                    if not put(batch):
+                        return
+                for batch in self._batches(to_match):
+                    started = time.perf_counter()
+                    self.matcher.run(batch)
+                    self.match_stats.busy_seconds += time.perf_counter() - started
+                    self.match_stats.items += len(batch)
+                    self.match_stats.batches += 1
+                    if on_matched:
+                        on_matched(batch)
+                    if not put(batch):
+                        return
+            except BaseException as exc:
+                errors.append(exc)
+            finally:
+                put(_DONE)
+
+        started = time.perf_counter()
+        self.pricer.begin()
+        producer = threading.Thread(target=produce, name="pipeline-match", daemon=True)
+        producer.start()
+        try:
+            while True:
+                waited = time.perf_counter()
+                batch = q.get()
+                self.price_stats.blocked_seconds += time.perf_counter() - waited
+                if batch is _DONE:
+                    break
+                busy = time.perf_counter()
+                self.pricer.price_batch(batch)
+                self.price_stats.busy_seconds += time.perf_counter() - busy
+                self.price_stats.items += len(batch)
+                self.price_stats.batches += 1
+                if on_priced:
+                    on_priced(batch)
+        except BaseException:
+            cancelled.set()
+            raise
+        finally:
+            producer.join()
+        if errors:
+            raise errors[0]
+        self.pricer.finish()
+        self.elapsed += time.perf_counter() - started
+        self.logger.info("pipeline_stats %s", self.stats())
+
+    def stats(self) -> dict:
+        return {
+            "match": self.match_stats.as_dict(),
+            "price": self.price_stats.as_dict(),
+            "max_queue_depth": self.max_queue_depth,
+            "elapsed_seconds": round(self.elapsed, 3),
+        }
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from datetime import datetime
+import threading
+
+from .cache_store import CacheStore
+from .models import PriceResult
+from .utils import d
+
+
+def to_payload(p: PriceResult) -> dict:
+    return {
+        "market_price": str(p.market_price) if p.market_price is not None else "",
+        "low_price": str(p.low_price) if p.low_price is not None else "",
+        "mid_price": str(p.mid_price) if p.mid_price is not None else "",
+        "high_price": str(p.high_price) if p.high_price is not None else "",
+        "source": p.source,
+        "lookup_timestamp": p.lookup_timestamp.isoformat(),
+    }
+
+
+def from_payload(payload: dict) -> PriceResult | None:
+    try:
+        looked_up = datetime.fromisoformat(payload["lookup_timestamp"])
+    except (TypeError, ValueError):
+        return None
+    return PriceResult(
+        market_price=d(payload["market_price"]),
+        low_price=d(payload["low_price"]),
+        mid_price=d(payload["mid_price"]),
+        high_price=d(payload["high_price"]),
+        finish=None,
+        source=payload["source"],
+        lookup_timestamp=looked_up,
+    )
+
+
+class PriceCache:
+    # Bounded LRU of parsed PriceResults in front of the SQLite pricing table. The store notifies
+    # every write and delete, so entries never outlive or disagree with their SQLite rows.
+    def __init__(self, store: CacheStore, max_entries: int = 50_000) -> None:
+        self.store = store
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, PriceResult] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        store.subscribe(self.discard)
+
+    def _put(self, key: str, p: PriceResult) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = p
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_many(self, keys: list[str]) -> dict[str, PriceResult]:
+        out: dict[str, PriceResult] = {}
+        missing: list[str] = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                p = self._entries.get(key)
+                if p is None:
+                    missing.append(key)
+                else:
+                    self._entries.move_to_end(key)
+                    out[key] = p
+            self.hits += len(out)
+            self.misses += len(missing)
+        if not missing:
+            return out
+        loaded = {k: p for k, payload in self.store.get_many(missing).items() if (p := from_payload(payload))}
+        with self._lock:
+            for key, p in loaded.items():
+                self._put(key, p)
+        out.update(loaded)
+        return out
+
+    def get(self, key: str) -> PriceResult | None:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, results: dict[str, PriceResult]) -> None:
+        if not results:
+            return
+        self.store.set_many({key: to_payload(p) for key, p in results.items()})
+        with self._lock:
+            for key, p in results.items():
+                self._put(key, p)
+
+    def discard(self, keys: list[str] | None = None) -> None:
+        # None drops everything (e.g. after compaction).
+        with self._lock:
+            if keys is None:
+                self._entries.clear()
+                return
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def freshness(self, p: PriceResult, category: str | None = None) -> str:
+        return self.store.freshness.classify(p.lookup_timestamp, category, p.market_price)
+
+    def maintain(self, touched_keys: list[str]) -> None:
+        self.store.maintain(touched_keys)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._entries)}
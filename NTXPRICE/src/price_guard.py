@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from .models import ItemState
+
+GUARD_ACTIONS = ("off", "flag", "hold")
+HELD_ITEM_FIELDS = [
+    "row_number", "sku", "card_name", "current_price", "new_price", "market_price", "low_price", "mid_price", "history_mean",
+    "history_points", "zscore", "jump_pct", "basis_deviation_pct", "reasons", "action",
+]
+
+ZSCORE = 1
+JUMP = 2
+BASIS = 4
+INVERTED = 8
+REASONS = {ZSCORE: "zscore", JUMP: "jump", BASIS: "basis_deviation", INVERTED: "inverted_quotes"}
+
+
+def _floats(values) -> np.ndarray:
+    return np.fromiter((np.nan if v is None else float(v) for v in values), dtype=np.float64)
+
+
+def _num(x: float) -> float | str:
+    return "" if np.isnan(x) else round(float(x), 4)
+
+
+@dataclass(slots=True)
+class GuardReport:
+    action: str
+    checked: int = 0
+    rows: list[dict] = field(default_factory=list)
+    held: set[int] = field(default_factory=set)  # inventory row numbers
+
+    def add(self, other: GuardReport) -> None:
+        self.checked += other.checked
+        self.rows.extend(other.rows)
+        self.held |= other.held
+
+    def counts(self) -> dict[str, int]:
+        return {"checked": self.checked, "flagged": len(self.rows), "held": len(self.held)}
+
+
+class PriceGuard:
+    # Batch sanity check of proposed prices before they are published. Every check is an array
+    # operation over the whole batch:
+    #   zscore  - new price vs. the SKU's recent suggested prices (needs a HistoryQuery)
+    #   jump    - percent change vs. the current site price
+    #   basis   - new price vs. the median of the market/low/mid quotes, plus low above mid
+    # Changes smaller than `min_change` are never flagged, so penny cards don't trip the percent checks.
+    def __init__(
+        self,
+        logger,
+        action: str = "flag",
+        history=None,
+        max_zscore: float = 4.0,
+        max_jump_pct: float = 50.0,
+        max_basis_deviation_pct: float = 60.0,
+        min_change: float = 0.5,
+        history_days: int = 30,
+        min_history_points: int = 5,
+        lookup_date: str | None = None,
+    ) -> None:
+        if action not in GUARD_ACTIONS:
+            raise ValueError(f"Unknown price guard action: {action}")
+        self.logger = logger
+        self.action = action
+        self.history = history
+        self.max_zscore = max_zscore
+        self.max_jump_pct = max_jump_pct
+        self.max_basis_deviation_pct = max_basis_deviation_pct
+        self.min_change = min_change
+        self.history_days = history_days
+        self.min_history_points = min_history_points
+        # The run's history date; today's UTC date when not given.
+        self.lookup_date = lookup_date
+
+    def check(self, items: list[ItemState]) -> GuardReport:
+        report = GuardReport(self.action)
+        items = [i for i in items if i.decision and i.price and i.decision.new_price is not None]
+        report.checked = len(items)
+        if not items or self.action == "off":
+            return report
+
+        new = _floats(i.decision.new_price for i in items)
+        current = _floats(i.inventory.current_price for i in items)
+        market = _floats(i.price.market_price for i in items)
+        low = _floats(i.price.low_price for i in items)
+        mid = _floats(i.price.mid_price for i in items)
+        flags = np.zeros(len(items), dtype=np.uint8)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            jump = np.where(current > 0, (new - current) / current * 100, np.nan)
+            material = np.abs(new - current) >= self.min_change
+            flags[material & (np.abs(jump) > self.max_jump_pct)] |= JUMP
+
+            quotes = np.stack([market, low, mid])
+            has_quote = ~np.isnan(quotes).all(axis=0)
+            reference = np.full(len(items), np.nan)
+            reference[has_quote] = np.nanmedian(quotes[:, has_quote], axis=0)
+            deviation = np.where(reference > 0, (new - reference) / reference * 100, np.nan)
+            far = np.abs(new - reference) >= self.min_change
+            flags[far & (np.abs(deviation) > self.max_basis_deviation_pct)] |= BASIS
+            # Inverted quotes only matter when the price actually moves; otherwise hold would freeze an unchanged price.
+            flags[material & (low > mid)] |= INVERTED
+
+            mean = np.full(len(items), np.nan)
+            count = np.zeros(len(items), dtype=np.int32)
+            zscore = np.full(len(items), np.nan)
+            if self.history is not None and self.history_days > 0:
+                # Baseline ends the day before the run's lookup_date, so today's own snapshot isn't part of it.
+                today = date.fromisoformat(self.lookup_date) if self.lookup_date else datetime.now(timezone.utc).date()
+                end = (today - timedelta(days=1)).isoformat()
+                mean, std, count = self.history.window_stats([i.inventory.sku for i in items], self.history_days, end)
+                # Flat histories get a floor of 1% of the mean (at least one cent) so z stays finite.
+                spread = np.fmax(std, np.fmax(np.abs(mean) * 0.01, 0.01))
+                zscore = (new - mean) / spread
+                enough = count >= self.min_history_points
+                moved = np.abs(new - mean) >= self.min_change
+                flags[enough & moved & (np.abs(zscore) > self.max_zscore)] |= ZSCORE
+
+        for k in np.flatnonzero(flags):
+            item = items[k]
+            report.rows.append({
+                "row_number": item.inventory.row_number,
+                "sku": item.inventory.sku,
+                "card_name": item.inventory.card_name,
+                "current_price": item.inventory.current_price,
+                "new_price": item.decision.new_price,
+                "market_price": item.price.market_price,
+                "low_price": item.price.low_price,
+                "mid_price": item.price.mid_price,
+                "history_mean": _num(mean[k]),
+                "history_points": int(count[k]),
+                "zscore": _num(zscore[k]),
+                "jump_pct": _num(jump[k]),
+                "basis_deviation_pct": _num(deviation[k]),
+                "reasons": ";".join(name for bit, name in REASONS.items() if flags[k] & bit),
+                "action": self.action,
+            })
+            if self.action == "hold":
+                report.held.add(item.inventory.row_number)
+        if report.rows:
+            self.logger.warning("price_guard %s", report.counts())
+        return report
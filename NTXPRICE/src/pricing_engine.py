@@ -1,8 +1,16 @@
 from __future__ import annotations
 
 from decimal import Decimal
+import threading
+from typing import Callable
+from .cache_store import FRESH, STALE
 from .models import ItemState, PricingDecision, PricingBasis, MatchStatus, PriceResult
-from .utils import quantize_price, d
+from .price_cache import PriceCache
+from .utils import fingerprint, quantize_price, map_ordered
+
+# Keys per get_pricing_batch call (the provider's ids per request), so one failed request only
+# leaves its own keys unresolved.
+PREFETCH_CHUNK = 250
 
 
 class PricingEngine:
@@ -11,6 +19,7 @@ class PricingEngine:
         provider,
         logger,
         cache_store=None,
+        price_cache: PriceCache | None = None,
         pricing_basis: str = "market_price",
         undercut_amount: float = 0.01,
         min_price: float = 0.01,
@@ -18,10 +27,14 @@ class PricingEngine:
         fallback_to_current_price: bool = True,
         skip_if_no_market_price: bool = False,
         minimum_change_threshold: float = 0.0,
+        max_workers: int = 1,
+        write_chunk_size: int = 500,
     ) -> None:
         self.provider = provider
         self.logger = logger
-        self.cache = cache_store
+        # A long-lived price_cache (e.g. the GUI's) keeps parsed prices across runs; otherwise one is
+        # created per engine over cache_store.
+        self.cache = price_cache or (PriceCache(cache_store) if cache_store else None)
         self.pricing_basis = PricingBasis(pricing_basis) if pricing_basis in [e.value for e in PricingBasis] else PricingBasis.MARKET
         self.undercut = Decimal(str(undercut_amount))
         self.min_price = Decimal(str(min_price))
@@ -29,6 +42,20 @@ class PricingEngine:
         self.fallback_to_current_price = fallback_to_current_price
         self.skip_if_no_market_price = skip_if_no_market_price
         self.minimum_change_threshold = Decimal(str(minimum_change_threshold))
+        self.max_workers = max_workers
+        self.write_chunk_size = max(1, write_chunk_size)
+        self._pending_writes: dict[str, PriceResult] = {}
+        self._write_lock = threading.Lock()
+        self._prefetched: dict[str, PriceResult | None] = {}
+        self._stale: dict[str, tuple[int | None, int | None]] = {}
+        self._touched: set[str] = set()
+        self._stats_lock = threading.Lock()
+        self._refresh_thread: threading.Thread | None = None
+        self.cache_stats = {"hits": 0, "misses": 0, "stale": 0}
+
+    def _count(self, stat: str) -> None:
+        with self._stats_lock:
+            self.cache_stats[stat] += 1
 
     def _select_basis(self, p: PriceResult) -> Decimal | None:
         if self.pricing_basis == PricingBasis.MARKET:
@@ -39,43 +66,133 @@ class PricingEngine:
             return p.low_price
         return p.market_price or p.mid_price or p.low_price
 
+    def settings_key(self) -> str:
+        return fingerprint(
+            self.pricing_basis.value, self.undercut, self.min_price, self.max_price,
+            self.fallback_to_current_price, self.skip_if_no_market_price, self.minimum_change_threshold,
+        )
+
+    @staticmethod
+    def _cache_key(item: ItemState) -> str:
+        return f"{item.match.product_id}:{item.match.sku_id}"
+
+    @staticmethod
+    def _needs_price(item: ItemState) -> bool:
+        return item.match.status == MatchStatus.MATCHED and item.match.approved and not item.do_not_update
+
+    def _from_cached(self, key: str, item: ItemState, cached: PriceResult | None) -> PriceResult | None:
+        # Fresh rows are served; stale rows are served and queued for background revalidation.
+        state = self.cache.freshness(cached, item.inventory.category) if cached else None
+        if state not in (FRESH, STALE):
+            self._count("misses")
+            return None
+        self._touched.add(key)
+        if state == STALE:
+            self._count("stale")
+            self._stale[key] = (item.match.product_id, item.match.sku_id)
+        else:
+            self._count("hits")
+        return cached
+
+    def _load_cached(self, key: str, item: ItemState) -> PriceResult | None:
+        if not self.cache:
+            return None
+        return self._from_cached(key, item, self.cache.get(key))
+
+    def _store_cached(self, key: str, p: PriceResult) -> None:
+        # Writes are buffered and committed in one transaction per chunk instead of one per key.
+        with self._write_lock:
+            self._pending_writes[key] = p
+            full = len(self._pending_writes) >= self.write_chunk_size
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._write_lock:
+            writes, self._pending_writes = self._pending_writes, {}
+        if writes and self.cache:
+            self.cache.set_many(writes)
+
     def _load_price(self, item: ItemState) -> PriceResult | None:
-        key = f"{item.match.product_id}:{item.match.sku_id}"
-        if self.cache:
-            cached = self.cache.get_pricing_cache(key)
-            if cached:
-                return PriceResult(
-                    market_price=d(cached["market_price"]),
-                    low_price=d(cached["low_price"]),
-                    mid_price=d(cached["mid_price"]),
-                    high_price=d(cached["high_price"]),
-                    finish=None,
-                    source=cached["source"],
-                    lookup_timestamp=__import__("datetime").datetime.fromisoformat(cached["lookup_timestamp"]),
-                )
+        key = self._cache_key(item)
+        if key in self._prefetched:
+            return self._prefetched[key]
+        cached = self._load_cached(key, item)
+        if cached:
+            return cached
         p = self.provider.get_pricing(item.match.product_id, item.match.sku_id)
         if p and self.cache:
-            self.cache.set_pricing_cache(
-                key,
-                {
-                    "market_price": str(p.market_price) if p.market_price is not None else "",
-                    "low_price": str(p.low_price) if p.low_price is not None else "",
-                    "mid_price": str(p.mid_price) if p.mid_price is not None else "",
-                    "high_price": str(p.high_price) if p.high_price is not None else "",
-                    "source": p.source,
-                    "lookup_timestamp": p.lookup_timestamp.isoformat(),
-                },
-            )
+            self._store_cached(key, p)
         return p
 
-    def price_item(self, item: ItemState) -> None:
+    def prefetch(self, items: list[ItemState]) -> None:
+        wanted: dict[str, ItemState] = {}
+        for item in items:
+            if not self._needs_price(item):
+                continue
+            key = self._cache_key(item)
+            if key not in self._prefetched:
+                wanted.setdefault(key, item)
+        if not wanted:
+            return
+
+        rows = self.cache.get_many(list(wanted)) if self.cache else {}
+        pending: dict[str, tuple[int | None, int | None]] = {}
+        for key, item in wanted.items():
+            cached = self._from_cached(key, item, rows.get(key)) if self.cache else None
+            if cached:
+                self._prefetched[key] = cached
+            elif item.match.sku_id or item.match.product_id:
+                pending[key] = (item.match.product_id, item.match.sku_id)
+        if not pending:
+            return
+
+        # Keys of a failed chunk stay unresolved, so price_item looks up only those rows one by one.
+        resolved, failed = self._fetch_pending(pending)
+        for key, p in resolved.items():
+            if p and self.cache:
+                self._store_cached(key, p)
+            self._prefetched[key] = p
+        self.flush()
+        skus = sum(1 for _, sku_id in pending.values() if sku_id)
+        self.logger.info("batch_pricing keys=%s skus=%s products=%s failed=%s", len(pending), skus, len(pending) - skus, failed)
+
+    def _fetch_pending(self, pending: dict[str, tuple[int | None, int | None]]) -> tuple[dict[str, PriceResult | None], int]:
+        # Batch lookups in chunks of PREFETCH_CHUNK keys; returns the resolved keys and how many failed.
+        sku_keys = [key for key, (_, sku_id) in pending.items() if sku_id]
+        product_keys = [key for key, (_, sku_id) in pending.items() if not sku_id]
+        chunks = [
+            {key: pending[key] for key in keys[i:i + PREFETCH_CHUNK]}
+            for keys in (sku_keys, product_keys)
+            for i in range(0, len(keys), PREFETCH_CHUNK)
+        ]
+        resolved: dict[str, PriceResult | None] = {}
+        failed = 0
+        for chunk, result in zip(chunks, map_ordered(self._fetch_chunk, chunks, self.max_workers)):
+            if result is None:
+                failed += len(chunk)
+            else:
+                resolved.update(result)
+        return resolved, failed
+
+    def _fetch_chunk(self, chunk: dict[str, tuple[int | None, int | None]]) -> dict[str, PriceResult | None] | None:
+        sku_ids = [sku_id for _, sku_id in chunk.values() if sku_id]
+        product_ids = [product_id for product_id, sku_id in chunk.values() if not sku_id]
+        try:
+            by_sku, by_product = self.provider.get_pricing_batch(sku_ids, product_ids)
+        except Exception:
+            self.logger.exception("Batch pricing failed for %s keys", len(chunk))
+            return None
+        return {key: by_sku.get(sku_id) if sku_id else by_product.get(product_id) for key, (product_id, sku_id) in chunk.items()}
+
+    def price_item(self, item: ItemState, reuse_price: bool = False) -> None:
         if item.match.status != MatchStatus.MATCHED or not item.match.approved:
             return
         if item.do_not_update:
             item.decision = PricingDecision(self.pricing_basis, None, None, None, None, False, "do_not_update")
             return
 
-        price = self._load_price(item)
+        price = item.price if reuse_price else self._load_price(item)
         item.price = price
         if not price:
             item.decision = PricingDecision(self.pricing_basis, None, None, None, None, False, "no_pricing")
@@ -102,6 +219,57 @@ class PricingEngine:
         changed = abs(abs_change) >= self.minimum_change_threshold
         item.decision = PricingDecision(self.pricing_basis, basis, new_price, abs_change, pct_change, changed, "computed")
 
-    def run(self, items: list[ItemState]) -> None:
+    def _price_isolated(self, item: ItemState, reuse_price: bool = False) -> None:
+        try:
+            self.price_item(item, reuse_price)
+        except Exception as exc:
+            self.logger.exception("Pricing failure for sku=%s", item.inventory.sku)
+            item.error = str(exc)
+            item.decision = PricingDecision(self.pricing_basis, None, None, None, None, False, "error")
+
+    def _revalidate(self, stale: dict[str, tuple[int | None, int | None]]) -> None:
+        try:
+            resolved, failed = self._fetch_pending(stale)
+            writes = {key: p for key, p in resolved.items() if p}
+            self.cache.set_many(writes)
+            self.logger.info("pricing_revalidated stale=%s refreshed=%s failed=%s", len(stale), len(writes), failed)
+        except Exception:
+            self.logger.exception("Background revalidation failed for %s keys", len(stale))
+
+    def decide(self, items: list[ItemState]) -> None:
+        # Recompute decisions from the prices already on the items; no cache or API access.
         for item in items:
-            self.price_item(item)
+            self._price_isolated(item, reuse_price=True)
+
+    def wait_for_refresh(self, timeout: float | None = None) -> None:
+        if self._refresh_thread is not None:
+            self._refresh_thread.join(timeout)
+
+    def begin(self) -> None:
+        self.wait_for_refresh()
+        self._prefetched = {}
+        self._stale = {}
+        self._touched = set()
+
+    def price_batch(self, items: list[ItemState]) -> None:
+        self.prefetch(items)
+        map_ordered(self._price_isolated, items, self.max_workers)
+        self.flush()
+
+    def finish(self) -> None:
+        # Records cache access for this run and starts background revalidation of stale prices.
+        if self.cache:
+            self.cache.maintain(sorted(self._touched))
+        if self._stale:
+            self._refresh_thread = threading.Thread(target=self._revalidate, args=(dict(self._stale),), name="pricing-revalidate", daemon=True)
+            self._refresh_thread.start()
+
+    def run(self, items: list[ItemState], on_checkpoint: Callable[[list[ItemState]], None] | None = None, checkpoint_every: int = 0) -> None:
+        self.begin()
+        step = checkpoint_every if on_checkpoint and checkpoint_every > 0 else max(len(items), 1)
+        for start in range(0, len(items), step):
+            chunk = items[start:start + step]
+            self.price_batch(chunk)
+            if on_checkpoint:
+                on_checkpoint(chunk)
+        self.finish()
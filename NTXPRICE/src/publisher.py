@@ -3,6 +3,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from .models import ItemState
 from .csv_writer import write_site_import
+from .price_guard import HELD_ITEM_FIELDS, GuardReport, PriceGuard
+from .utils import atomic_write_csv
 
 
 @dataclass(slots=True)
@@ -13,20 +15,44 @@ class PublishResult:
 
 
 class Publisher:
-    def __init__(self, logger) -> None:
+    def __init__(self, logger, guard: PriceGuard | None = None) -> None:
         self.logger = logger
+        self.guard = guard
+        self.guard_report = GuardReport(guard.action if guard else "off")
+
+    @staticmethod
+    def issue(item: ItemState) -> str | None:
+        if item.decision and item.decision.new_price is not None and item.decision.new_price < 0:
+            return f"Negative price for {item.inventory.sku}"
+        return None
 
     def validate(self, items: list[ItemState]) -> list[str]:
-        errors: list[str] = []
-        for item in items:
-            if item.decision and item.decision.new_price is not None and item.decision.new_price < 0:
-                errors.append(f"Negative price for {item.inventory.sku}")
-        return errors
+        return [e for item in items if (e := self.issue(item))]
+
+    def hold(self, items: list[ItemState]) -> set[int]:
+        # Runs the price guard over a batch; returns the row numbers that must not be published.
+        if not self.guard:
+            return set()
+        report = self.guard.check(items)
+        self.guard_report.add(report)
+        return report.held
+
+    def screen(self, items: list[ItemState]) -> list[ItemState]:
+        # Returns the items of a batch that may be published.
+        held = self.hold(items)
+        if not held:
+            return items
+        return [i for i in items if i.inventory.row_number not in held]
+
+    def write_guard_report(self, path: str) -> int:
+        atomic_write_csv(path, HELD_ITEM_FIELDS, self.guard_report.rows)
+        return len(self.guard_report.rows)
 
     def publish_csv(self, path: str, items: list[ItemState], include_out_of_stock: bool, only_changed: bool, only_approved: bool, dry_run: bool) -> PublishResult:
         issues = self.validate(items)
         if issues:
             raise ValueError("; ".join(issues))
+        items = self.screen(items)
         if dry_run:
             exportable = sum(1 for i in items if i.decision is not None)
             return PublishResult(exportable, True, f"Dry-run: {exportable} rows would be exported")
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, asdict
+import threading
+import time
+
+
+@dataclass(slots=True)
+class ThrottleStats:
+    requests: int = 0
+    throttled: int = 0
+    pauses: int = 0
+    paused_seconds: float = 0.0
+    rate_decreases: int = 0
+    rate_increases: int = 0
+    current_rate: float = 0.0
+    min_rate_seen: float = 0.0
+    current_concurrency: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class TokenBucket:
+    # rate is requests/second; rate <= 0 disables the rate limit but still bounds concurrency.
+    def __init__(self, rate: float, max_concurrency: int = 1, burst: float = 1.0) -> None:
+        self.rate = rate
+        self.max_concurrency = max(1, max_concurrency)
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self.stats = ThrottleStats(current_rate=rate, min_rate_seen=rate, current_concurrency=self.max_concurrency)
+
+    def _refill(self, now: float) -> None:
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._in_flight >= self.max_concurrency:
+                self._cond.wait()
+            self._in_flight += 1
+            self.stats.requests += 1
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    self._cond.wait(self._paused_until - now)
+                    continue
+                if self.rate <= 0:
+                    return
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                self._cond.wait((1 - self._tokens) / self.rate)
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def pause(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        with self._cond:
+            until = time.monotonic() + seconds
+            if until > self._paused_until:
+                self._paused_until = until
+                self.stats.pauses += 1
+                self.stats.paused_seconds += seconds
+            self._cond.notify_all()
+
+    def on_success(self) -> None:
+        pass
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        with self._cond:
+            self.stats.throttled += 1
+        self.pause(retry_after if retry_after is not None else 1.0)
+
+    def __enter__(self) -> TokenBucket:
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    # AIMD: cut rate and concurrency multiplicatively on throttling, grow them back additively on success.
+    def __init__(
+        self,
+        rate: float,
+        max_concurrency: int = 1,
+        min_rate: float = 0.5,
+        decrease_factor: float = 0.5,
+        increase_step: float = 0.1,
+        concurrency_recovery: int = 25,
+        decrease_cooldown: float = 1.0,
+    ) -> None:
+        # A zero floor would turn a throttled bucket into an unlimited one (rate 0 means no limit).
+        if min_rate <= 0:
+            raise ValueError(f"min_rate must be positive, got {min_rate}")
+        super().__init__(rate, max_concurrency)
+        self.max_rate = rate
+        self.concurrency_ceiling = self.max_concurrency
+        self.min_rate = min_rate
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self.concurrency_recovery = concurrency_recovery
+        self.decrease_cooldown = decrease_cooldown
+        self._successes = 0
+        self._last_decrease = float("-inf")
+
+    def on_success(self) -> None:
+        with self._cond:
+            self._successes += 1
+            if self.max_rate > 0 and self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+                self.stats.rate_increases += 1
+            elif self.max_rate <= 0 and self.rate > 0:
+                self.rate += self.increase_step
+                self.stats.rate_increases += 1
+            if self.max_concurrency < self.concurrency_ceiling and self._successes % self.concurrency_recovery == 0:
+                self.max_concurrency += 1
+                self._cond.notify_all()
+            self.stats.current_rate = self.rate
+            self.stats.current_concurrency = self.max_concurrency
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        with self._cond:
+            now = time.monotonic()
+            # Workers already in flight report the same overload; only cut once per cooldown window.
+            if now - self._last_decrease >= self.decrease_cooldown:
+                self._last_decrease = now
+                # An unlimited bucket has no rate to cut, so start from one request per slot per second.
+                base = self.rate if self.rate > 0 else float(self.max_concurrency)
+                self.rate = max(self.min_rate, base * self.decrease_factor)
+                self.max_concurrency = max(1, int(self.max_concurrency * self.decrease_factor))
+                self._tokens = min(self._tokens, 0.0)
+                self._successes = 0
+                self.stats.rate_decreases += 1
+                self.stats.current_rate = self.rate
+                self.stats.current_concurrency = self.max_concurrency
+                self.stats.min_rate_seen = min(self.stats.min_rate_seen or self.rate, self.rate)
+        super().on_throttle(retry_after if retry_after is not None else 1 / self.rate)
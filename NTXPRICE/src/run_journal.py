@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+from datetime import datetime
+from decimal import Decimal
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from uuid import uuid4
+
+from .incremental_sync import match_from_dict, match_to_dict, row_hash
+from .models import ItemState, MatchStatus, PricingBasis, PricingDecision
+from .price_cache import from_payload, to_payload
+from .utils import d
+
+
+def new_run_id(started: datetime) -> str:
+    return f"{started:%Y%m%d-%H%M%S}-{uuid4().hex[:6]}"
+
+
+def decision_to_dict(dec: PricingDecision) -> dict:
+    return {k: (str(v) if isinstance(v, Decimal) else v) for k, v in asdict(dec).items()} | {"pricing_basis": dec.pricing_basis.value}
+
+
+def decision_from_dict(data: dict) -> PricingDecision:
+    return PricingDecision(
+        pricing_basis=PricingBasis(data["pricing_basis"]),
+        selected_value=d(data["selected_value"]),
+        new_price=d(data["new_price"]),
+        absolute_change=d(data["absolute_change"]),
+        percent_change=d(data["percent_change"]),
+        changed=data["changed"],
+        reason=data["reason"],
+    )
+
+
+class RunJournal:
+    # Per-run SQLite checkpoint of each item's match and price outcome, so an interrupted
+    # run_daily_sync can continue without redoing lookups. Removed once the run completes.
+    def __init__(self, path: str | Path, run_id: str) -> None:
+        self.path = Path(path)
+        self.run_id = run_id
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS items (
+              key TEXT PRIMARY KEY,
+              row_hash TEXT,
+              match TEXT,
+              do_not_update INTEGER DEFAULT 0,
+              priced INTEGER DEFAULT 0,
+              price TEXT,
+              decision TEXT,
+              pricing_settings TEXT
+            )
+            """
+        )
+        self.conn.commit()
+
+    @classmethod
+    def create(cls, directory: str, run_id: str, input_path: str) -> RunJournal:
+        journal = cls(Path(directory) / f"{run_id}.db", run_id)
+        journal.set_meta(run_id=run_id, input_path=input_path, created_at=datetime.utcnow().isoformat())
+        return journal
+
+    @classmethod
+    def open(cls, ref: str, directory: str) -> RunJournal:
+        # `ref` is a run id under `directory` or a path to a journal file (e.g. from another config).
+        path = Path(ref) if ref.endswith(".db") else Path(directory) / f"{ref}.db"
+        if not path.exists():
+            raise FileNotFoundError(f"No run journal found for {ref!r} ({path})")
+        journal = cls(path, path.stem)
+        journal.run_id = journal.meta().get("run_id", path.stem)
+        return journal
+
+    @staticmethod
+    def key(item: ItemState) -> str:
+        return f"{item.inventory.row_number}:{item.inventory.sku}"
+
+    def set_meta(self, **values: str) -> None:
+        with self._lock, self.conn:
+            self.conn.executemany("REPLACE INTO meta(key,value) VALUES(?,?)", list(values.items()))
+
+    def meta(self) -> dict[str, str]:
+        with self._lock:
+            return dict(self.conn.execute("SELECT key,value FROM meta").fetchall())
+
+    def save_matches(self, items: list[ItemState]) -> None:
+        rows = [(self.key(i), row_hash(i.inventory), json.dumps(match_to_dict(i.match)), int(i.do_not_update)) for i in items]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO items(key,row_hash,match,do_not_update) VALUES(?,?,?,?) "
+                "ON CONFLICT(key) DO UPDATE SET row_hash=excluded.row_hash, match=excluded.match, do_not_update=excluded.do_not_update, priced=0",
+                rows,
+            )
+
+    def save_prices(self, items: list[ItemState], pricing_settings: str) -> None:
+        rows = [
+            (
+                self.key(i),
+                row_hash(i.inventory),
+                json.dumps(match_to_dict(i.match)),
+                int(i.do_not_update),
+                json.dumps(to_payload(i.price)) if i.price else None,
+                json.dumps(decision_to_dict(i.decision)) if i.decision else None,
+                pricing_settings,
+            )
+            for i in items
+            if not i.error
+        ]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "REPLACE INTO items(key,row_hash,match,do_not_update,priced,price,decision,pricing_settings) VALUES(?,?,?,?,1,?,?,?)",
+                rows,
+            )
+
+    def restore(self, items: list[ItemState], pricing_settings: str) -> tuple[set[str], set[str], list[ItemState]]:
+        # Returns (matched keys, priced keys, items whose decision must be recomputed). Rows that
+        # changed since the checkpoint and failed lookups are left to be processed again.
+        with self._lock:
+            saved = {r[0]: r[1:] for r in self.conn.execute("SELECT key,row_hash,match,do_not_update,priced,price,decision,pricing_settings FROM items")}
+        matched: set[str] = set()
+        priced: set[str] = set()
+        redecide: list[ItemState] = []
+        for item in items:
+            key = self.key(item)
+            rec = saved.get(key)
+            if not rec or rec[0] != row_hash(item.inventory) or not rec[1]:
+                continue
+            match = match_from_dict(json.loads(rec[1]))
+            if match.status == MatchStatus.ERROR:
+                continue
+            item.match = match
+            item.do_not_update = bool(rec[2])
+            matched.add(key)
+            if not rec[3]:
+                continue
+            item.price = from_payload(json.loads(rec[4])) if rec[4] else None
+            priced.add(key)
+            if rec[5] and rec[6] == pricing_settings:
+                item.decision = decision_from_dict(json.loads(rec[5]))
+            else:
+                redecide.append(item)
+        return matched, priced, redecide
+
+    def close(self, delete: bool = False) -> None:
+        self.conn.close()
+        if delete:
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{self.path}{suffix}").unlink(missing_ok=True)
@@ -8,18 +8,28 @@ from .models import RunSummary, ItemState, MatchStatus
 class MetricsService:
     @staticmethod
     def summarize(items: list[ItemState]) -> RunSummary:
-        s = RunSummary(total_rows=len(items))
+        return MetricsService.accumulate(RunSummary(), items)
+
+    @staticmethod
+    def accumulate(s: RunSummary, items: list[ItemState]) -> RunSummary:
+        # Adds one chunk's counts to `s`, so streaming runs never hold every item at once.
         for i in items:
-            if not i.inventory.validation_errors:
-                s.valid_rows += 1
-            if i.match.status == MatchStatus.MATCHED:
-                s.matched_rows += 1
-            elif i.match.status == MatchStatus.AMBIGUOUS:
-                s.ambiguous_rows += 1
-            elif i.match.status in {MatchStatus.UNMATCHED, MatchStatus.ERROR}:
-                s.failed_rows += 1
-            if i.decision and i.decision.changed:
-                s.changed_rows += 1
-            if i.do_not_update or i.match.status != MatchStatus.MATCHED:
-                s.skipped_rows += 1
+            MetricsService.add(s, i)
         return s
+
+    @staticmethod
+    def add(s: RunSummary, i: ItemState) -> None:
+        s.total_rows += 1
+        if not i.inventory.validation_errors:
+            s.valid_rows += 1
+        status = i.match.status
+        if status == MatchStatus.MATCHED:
+            s.matched_rows += 1
+        elif status == MatchStatus.AMBIGUOUS:
+            s.ambiguous_rows += 1
+        elif status in {MatchStatus.UNMATCHED, MatchStatus.ERROR}:
+            s.failed_rows += 1
+        if i.decision and i.decision.changed:
+            s.changed_rows += 1
+        if i.do_not_update or status != MatchStatus.MATCHED:
+            s.skipped_rows += 1
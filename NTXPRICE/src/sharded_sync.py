@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, fields, replace
+from datetime import datetime, timezone
+import csv
+import heapq
+import multiprocessing
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterator
+
+from .app import (
+    build_cache_store,
+    build_history_store,
+    build_match_provider,
+    build_matcher,
+    build_pipeline,
+    build_price_guard,
+    build_pricer,
+    build_provider,
+    collect_diagnostics,
+    export_files,
+    log_export,
+    match_and_price,
+    report_price_guard,
+)
+from .arrow_io import open_table_writer
+from .config import AppConfig
+from .csv_writer import CHANGES_ONLY_FIELDS, FAILED_MATCH_FIELDS, SITE_IMPORT_FIELDS, changes_only_row, failed_match_row, site_import_row
+from .export_stage import CountSink, ExportStage, MetricsSink, RowSink
+from .history_store import HISTORY_FIELDS, history_row, run_date
+from .incremental_sync import IncrementalSync
+from .inventory_loader import iter_inventory
+from .logger import setup_logger
+from .match_scoring import normalize_set
+from .models import InventoryRow, ItemState, RunResult, RunSummary
+from .publisher import Publisher
+from .utils import IncrementalCsvWriter, fingerprint, peak_rss_mb
+
+SHARD_KEYS = ("sku", "set_name")
+ROW = "row_number"
+
+
+def shard_of(inv: InventoryRow, shards: int, key: str = "sku") -> int:
+    # sha1 rather than hash() so every process assigns rows the same way.
+    value = normalize_set(inv.set_name) if key == "set_name" else inv.sku
+    return int(fingerprint(value)[:8], 16) % shards
+
+
+def shard_config(config: AppConfig, shards: int) -> AppConfig:
+    # Each worker gets an equal slice of the global request rate and concurrency.
+    rate = config.requests_per_second or (1 / config.sleep_between_requests if config.sleep_between_requests > 0 else 0.0)
+    return replace(
+        config,
+        shards=1,
+        requests_per_second=rate / shards,
+        min_requests_per_second=config.min_requests_per_second / shards,
+        max_concurrency=max(1, -(-config.max_concurrency // shards)),
+        checkpoint_every=0,
+    )
+
+
+def _shard_sink(name: str, work_dir: str, index: int, fieldnames: list[str], build, publishes: bool = False) -> RowSink:
+    # Rows carry their row_number so the parent can merge the shards back into inventory order.
+    def numbered(i: ItemState) -> dict | None:
+        if (row := build(i)) is None:
+            return None
+        return {ROW: i.inventory.row_number} | row
+
+    writer = IncrementalCsvWriter(str(Path(work_dir) / f"{name}_{index}.csv"), [ROW, *fieldnames])
+    return RowSink(name, writer, numbered, publishes)
+
+
+def _run_shard(config: AppConfig, input_path: str, index: int, shards: int, key: str, work_dir: str, lookup_date: str, sku_filter: str | None) -> dict:
+    logger = setup_logger(config.log_level)
+    provider = build_provider(config, logger)
+    import_errors: list[str] = []
+    # Every worker parses the whole file so duplicate-SKU validation sees all rows, then keeps its shard.
+    items = [
+        ItemState(inventory=r)
+        for r in iter_inventory(input_path, import_errors, keep_raw=False)
+        if shard_of(r, shards, key) == index and (not sku_filter or r.sku == sku_filter)
+    ]
+    cache = build_cache_store(config)
+    incremental = IncrementalSync(cache, logger) if config.incremental_sync and cache else None
+    plan = incremental.plan(items) if incremental else None
+    match_provider = build_match_provider(config, provider, logger)
+    matcher = build_matcher(config, match_provider, cache, logger)
+    pricer = build_pricer(config, provider, cache, logger)
+    pipeline = build_pipeline(config, matcher, pricer, logger)
+    match_and_price(config, matcher, pricer, pipeline, plan.to_match() if plan else items, plan.to_price() if plan else items)
+    if plan:
+        pricer.decide(plan.fresh)
+        incremental.record(plan.to_price())
+
+    publisher = Publisher(logger, build_price_guard(config, logger, lookup_date))
+    summary = RunSummary()
+    with ExportStage(publisher) as stage:
+        stage.add(_shard_sink("history", work_dir, index, HISTORY_FIELDS, lambda i: history_row(i, lookup_date) if i.price and i.decision else None))
+        stage.add(_shard_sink("failed_matches", work_dir, index, FAILED_MATCH_FIELDS, failed_match_row))
+        if _dry_run(config):
+            stage.add(CountSink("site_import"))
+        else:
+            stage.add(_shard_sink(
+                "site_import", work_dir, index, SITE_IMPORT_FIELDS,
+                lambda i: site_import_row(i, config.include_out_of_stock, config.only_changed_export, config.only_approved_export),
+                publishes=True,
+            ))
+            if config.changes_only_csv_path:
+                stage.add(_shard_sink(
+                    "changes_only", work_dir, index, CHANGES_ONLY_FIELDS,
+                    lambda i: changes_only_row(i, config.include_out_of_stock, config.only_approved_export),
+                    publishes=True,
+                ))
+        stage.add(MetricsSink(summary))
+        stage.write(items)
+
+    diagnostics = collect_diagnostics(summary, provider, match_provider, pricer, logger)
+    if plan:
+        diagnostics["incremental"] = plan.counts()
+    if pipeline:
+        diagnostics["pipeline"] = pipeline.stats()
+    pricer.wait_for_refresh()
+    diagnostics["peak_rss_mb"] = peak_rss_mb()
+    return {
+        "summary": asdict(summary),
+        "diagnostics": diagnostics,
+        "import_errors": import_errors,
+        "counts": stage.counts(),
+        "guard": publisher.guard_report,
+    }
+
+
+def _dry_run(config: AppConfig) -> bool:
+    return config.dry_run or config.write_mode == "dry_run"
+
+
+def _merged(out: Path, shards: int, name: str) -> Iterator[dict]:
+    # Each shard file is already in inventory order, so a k-way merge on row_number restores the
+    # single-process order.
+    files = [(out / f"{name}_{i}.csv").open("r", newline="", encoding="utf-8") for i in range(shards)]
+    try:
+        readers = [csv.DictReader(f) for f in files]
+        for row in heapq.merge(*readers, key=lambda r: int(r[ROW])):
+            del row[ROW]
+            yield row
+    finally:
+        for f in files:
+            f.close()
+
+
+def run_sharded_sync(
+    config: AppConfig,
+    input_path: str | None = None,
+    force: bool = False,
+    sku_filter: str | None = None,
+) -> RunResult:
+    logger = setup_logger(config.log_level)
+    started = datetime.now(timezone.utc)
+    shards = config.shards
+    key = config.shard_key if config.shard_key in SHARD_KEYS else "sku"
+    input_path = input_path or config.inventory_csv_path
+    lookup_date = run_date(started)
+    worker_config = shard_config(config, shards)
+    work_dir = tempfile.mkdtemp(prefix="ntxprice_shards_", dir=str(Path(config.site_import_csv_path).parent))
+    logger.info("sharded_sync shards=%s key=%s rps_per_shard=%.2f", shards, key, worker_config.requests_per_second)
+    # Refreshes the history columns once up front so workers only read them.
+    publisher = Publisher(logger, build_price_guard(config, logger, lookup_date))
+    try:
+        # spawn: workers start clean (no inherited locks or sockets) on every platform.
+        with ProcessPoolExecutor(max_workers=shards, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [
+                pool.submit(_run_shard, worker_config, input_path, index, shards, key, work_dir, lookup_date, sku_filter)
+                for index in range(shards)
+            ]
+            results = [f.result() for f in futures]
+
+        out = Path(work_dir)
+        history_store = build_history_store(config, logger)
+        counts: dict[str, int] = {}
+        with history_store.daily_writer(force, lookup_date) as history:
+            counts["history"] = history.append_rows(_merged(out, shards, "history"))
+        with IncrementalCsvWriter(config.failed_matches_csv_path, FAILED_MATCH_FIELDS) as writer:
+            counts["failed_matches"] = writer.write_rows(_merged(out, shards, "failed_matches"))
+        if _dry_run(config):
+            counts["site_import"] = sum(r["counts"]["site_import"] for r in results)
+        else:
+            with open_table_writer(config.site_import_csv_path, SITE_IMPORT_FIELDS) as writer:
+                counts["site_import"] = writer.write_rows(_merged(out, shards, "site_import"))
+            if config.changes_only_csv_path:
+                with open_table_writer(config.changes_only_csv_path, CHANGES_ONLY_FIELDS) as writer:
+                    counts["changes_only"] = writer.write_rows(_merged(out, shards, "changes_only"))
+        log_export(logger, counts, _dry_run(config))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary = RunSummary(**{f.name: sum(r["summary"][f.name] for r in results) for f in fields(RunSummary)})
+    diagnostics = {
+        "shards": [r["diagnostics"] for r in results],
+        "shard_key": key,
+        "peak_rss_mb": max((r["diagnostics"]["peak_rss_mb"] or 0) for r in results) or peak_rss_mb(),
+    }
+    for r in results:
+        publisher.guard_report.add(r["guard"])
+    publisher.guard_report.rows.sort(key=lambda row: row["row_number"])
+    guard_files = report_price_guard(config, publisher, diagnostics)
+    return RunResult(
+        started_at=started,
+        ended_at=datetime.now(timezone.utc),
+        summary=summary,
+        output_files={**export_files(config, history_store, counts), **guard_files},
+        # File-level import errors are identical in every shard.
+        errors=results[0]["import_errors"] + [f"failed_matches={counts['failed_matches']}", f"history_written={counts['history']}"],
+        diagnostics=diagnostics,
+    )
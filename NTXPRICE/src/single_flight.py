@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Hashable
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    # Identical keys share one in-flight call; successful results are kept until clear().
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as exc:
+                call.error = exc
+                with self._lock:
+                    self._calls.pop(key, None)
+            finally:
+                call.done.set()
+        else:
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+        if call is None or not call.done.is_set() or call.error is not None:
+            return default
+        return call.result
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            call = self._calls.get(key)
+        return call is not None and call.done.is_set() and call.error is None
+
+    def seed(self, key: Hashable, value: Any) -> None:
+        call = _Call()
+        call.result = value
+        call.done.set()
+        with self._lock:
+            self._calls.setdefault(key, call)
+
+    def clear(self, kinds: set[str] | None = None) -> None:
+        with self._lock:
+            if kinds is None:
+                self._calls.clear()
+            else:
+                for key in [k for k in self._calls if isinstance(k, tuple) and k and k[0] in kinds]:
+                    del self._calls[key]
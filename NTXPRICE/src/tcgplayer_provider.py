@@ -1,13 +1,47 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import time
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from .match_scoring import MatchQuery, score_candidates
 from .models import MatchCandidate, PriceResult
-from .utils import d
+from .rate_limiter import AdaptiveTokenBucket, ThrottleStats, TokenBucket
+from .single_flight import SingleFlight
+from .utils import d, map_ordered
+
+THROTTLE_STATUSES = {429, 503}
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_rate_limit_reset(headers) -> float | None:
+    remaining = headers.get("X-RateLimit-Remaining")
+    reset = headers.get("X-RateLimit-Reset")
+    if remaining is None or reset is None:
+        return None
+    try:
+        if int(float(remaining)) > 0:
+            return None
+        reset_value = float(reset)
+    except ValueError:
+        return parse_retry_after(reset)
+    # Large values are epoch timestamps, small ones are seconds until reset.
+    return max(0.0, reset_value - time.time()) if reset_value > 1_000_000_000 else reset_value
 
 
 @dataclass(slots=True)
@@ -19,73 +53,142 @@ class TCGplayerProvider:
     retry_count: int = 3
     retry_backoff: float = 1.5
     sleep_between_requests: float = 0.1
+    requests_per_second: float = 0.0
+    max_concurrency: int = 1
+    adaptive_throttling: bool = True
+    min_requests_per_second: float = 0.5
 
     base_url: str = "https://api.tcgplayer.com"
+    max_ids_per_request: int = 250
+    session: requests.Session = field(init=False, repr=False)
+    limiter: TokenBucket = field(init=False, repr=False)
+    lookups: SingleFlight = field(init=False, repr=False)
 
     def __post_init__(self) -> None:
         self.session = requests.Session()
-        retries = Retry(total=self.retry_count, backoff_factor=self.retry_backoff, status_forcelist=[429, 500, 502, 503, 504])
-        self.session.mount("https://", HTTPAdapter(max_retries=retries))
+        # 429/503 are handled in _get so the limiter can learn from them.
+        retries = Retry(total=self.retry_count, backoff_factor=self.retry_backoff, status_forcelist=[500, 502, 504])
+        pool = max(1, self.max_concurrency)
+        self.session.mount("https://", HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=retries))
+        rate = self.requests_per_second
+        if rate <= 0 and self.sleep_between_requests > 0:
+            rate = 1 / self.sleep_between_requests
+        if self.adaptive_throttling:
+            self.limiter = AdaptiveTokenBucket(rate, max_concurrency=pool, min_rate=self.min_requests_per_second)
+        else:
+            self.limiter = TokenBucket(rate, max_concurrency=pool)
+        self.lookups = SingleFlight()
 
     def _headers(self) -> dict[str, str]:
         return {"Authorization": f"bearer {self.access_token}"}
 
     def _get(self, path: str, params: dict | None = None) -> dict:
-        time.sleep(self.sleep_between_requests)
-        resp = self.session.get(f"{self.base_url}{path}", headers=self._headers(), params=params, timeout=self.timeout)
-        resp.raise_for_status()
-        return resp.json()
+        attempt = 0
+        while True:
+            with self.limiter:
+                resp = self.session.get(f"{self.base_url}{path}", headers=self._headers(), params=params, timeout=self.timeout)
+            if resp.status_code in THROTTLE_STATUSES:
+                self.limiter.on_throttle(parse_retry_after(resp.headers.get("Retry-After")))
+                if attempt < self.retry_count:
+                    attempt += 1
+                    continue
+            resp.raise_for_status()
+            reset = parse_rate_limit_reset(resp.headers)
+            if reset:
+                self.limiter.pause(reset)
+            self.limiter.on_success()
+            return resp.json()
 
-    def get_product(self, product_id: int) -> dict | None:
-        data = self._get(f"/catalog/products/{product_id}")
-        results = data.get("results") or []
+    def throttle_stats(self) -> ThrottleStats:
+        return self.limiter.stats
+
+    def coalesce_stats(self) -> dict[str, int]:
+        return {"network_lookups": self.lookups.calls, "shared_lookups": self.lookups.shared}
+
+    def clear_request_cache(self, kinds: set[str] | None = None) -> None:
+        self.lookups.clear(kinds)
+
+    def _coalesced_batch(self, kind: str, ids: list[int], fetch) -> dict:
+        ids = list(dict.fromkeys(int(i) for i in ids))
+        missing = [i for i in ids if (kind, i) not in self.lookups]
+        fetched = fetch(missing) if missing else {}
+        for i in missing:
+            self.lookups.seed((kind, i), fetched.get(i))
+        out = {}
+        for i in ids:
+            value = self.lookups.get((kind, i))
+            if value is not None:
+                out[i] = value
+        return out
+
+    def _chunks(self, ids: list[int]) -> list[list[int]]:
+        unique = list(dict.fromkeys(ids))
+        size = max(1, self.max_ids_per_request)
+        return [unique[i:i + size] for i in range(0, len(unique), size)]
+
+    def _get_chunked(self, prefix: str, ids: list[int]) -> list[dict]:
+        paths = [f"{prefix}/{','.join(str(i) for i in chunk)}" for chunk in self._chunks(ids)]
+        return map_ordered(self._get, paths, self.max_concurrency)
+
+    def _first_result(self, path: str) -> dict | None:
+        results = self._get(path).get("results") or []
         return results[0] if results else None
 
+    def get_product(self, product_id: int) -> dict | None:
+        return self.lookups.do(("product", int(product_id)), lambda: self._first_result(f"/catalog/products/{product_id}"))
+
     def get_sku(self, sku_id: int) -> dict | None:
-        data = self._get(f"/catalog/skus/{sku_id}")
-        results = data.get("results") or []
-        return results[0] if results else None
+        return self.lookups.do(("sku", int(sku_id)), lambda: self._first_result(f"/catalog/skus/{sku_id}"))
 
-    def search_products(self, card_name: str, set_name: str | None = None, limit: int = 20) -> list[MatchCandidate]:
-        params = {"productName": card_name, "limit": limit}
-        data = self._get("/catalog/products", params=params)
-        out: list[MatchCandidate] = []
-        for item in data.get("results") or []:
-            conf = 0.6
-            name = item.get("name", "")
-            group = item.get("groupName")
-            if name.lower() == card_name.lower():
-                conf += 0.3
-            if set_name and group and group.lower() == set_name.lower():
-                conf += 0.1
-            out.append(
-                MatchCandidate(
-                    product_id=int(item["productId"]),
-                    sku_id=None,
-                    product_name=name,
-                    set_name=group,
-                    finish=None,
-                    condition=None,
-                    language=None,
-                    confidence=min(conf, 0.99),
-                    notes="search",
-                )
-            )
+    def get_products_batch(self, product_ids: list[int]) -> dict[int, dict]:
+        return self._coalesced_batch("product", product_ids, self._fetch_products)
+
+    def get_skus_batch(self, sku_ids: list[int]) -> dict[int, dict]:
+        return self._coalesced_batch("sku", sku_ids, self._fetch_skus)
+
+    def _fetch_products(self, product_ids: list[int]) -> dict[int, dict]:
+        out: dict[int, dict] = {}
+        for data in self._get_chunked("/catalog/products", product_ids):
+            for row in data.get("results") or []:
+                if row.get("productId") is not None:
+                    out[int(row["productId"])] = row
         return out
 
-    def get_pricing(self, product_id: int | None = None, sku_id: int | None = None) -> PriceResult | None:
-        if sku_id:
-            data = self._get(f"/pricing/sku/{sku_id}")
-            results = data.get("results") or []
-            row = results[0] if results else {}
-        elif product_id:
-            data = self._get(f"/pricing/product/{product_id}")
+    def _fetch_skus(self, sku_ids: list[int]) -> dict[int, dict]:
+        out: dict[int, dict] = {}
+        for data in self._get_chunked("/catalog/skus", sku_ids):
+            for row in data.get("results") or []:
+                if row.get("skuId") is not None:
+                    out[int(row["skuId"])] = row
+        return out
+
+    def _get_paged(self, path: str, params: dict | None = None, page_size: int = 100) -> list[dict]:
+        out: list[dict] = []
+        offset = 0
+        while True:
+            data = self._get(path, params={**(params or {}), "offset": offset, "limit": page_size})
             results = data.get("results") or []
-            row = results[0] if results else {}
-        else:
-            return None
-        if not row:
-            return None
+            out.extend(results)
+            offset += len(results)
+            total = data.get("totalItems")
+            if len(results) < page_size or (total is not None and offset >= int(total)):
+                return out
+
+    def get_groups(self, category_id: int) -> list[dict]:
+        return self._get_paged(f"/catalog/categories/{category_id}/groups")
+
+    def get_group_products(self, group_id: int) -> list[dict]:
+        return self._get_paged("/catalog/products", {"groupId": group_id, "getExtendedFields": "true", "includeSkus": "true"})
+
+    def search_catalog(self, card_name: str, limit: int = 20) -> list[dict]:
+        key = ("search", " ".join(card_name.lower().split()), limit)
+        return self.lookups.do(key, lambda: self._get("/catalog/products", params={"productName": card_name, "limit": limit, "getExtendedFields": "true"}).get("results") or [])
+
+    def search_products(self, card_name: str, set_name: str | None = None, limit: int = 20) -> list[MatchCandidate]:
+        return score_candidates(self.search_catalog(card_name, limit), MatchQuery(card_name, set_name))
+
+    @staticmethod
+    def _price_from_row(row: dict) -> PriceResult:
         return PriceResult(
             market_price=d(row.get("marketPrice")),
             low_price=d(row.get("lowPrice")),
@@ -96,3 +199,38 @@ class TCGplayerProvider:
             lookup_timestamp=datetime.now(timezone.utc),
             lookup_status="ok",
         )
+
+    def get_pricing(self, product_id: int | None = None, sku_id: int | None = None) -> PriceResult | None:
+        if sku_id:
+            key, path = ("pricing_sku", int(sku_id)), f"/pricing/sku/{sku_id}"
+        elif product_id:
+            key, path = ("pricing_product", int(product_id)), f"/pricing/product/{product_id}"
+        else:
+            return None
+
+        def fetch() -> PriceResult | None:
+            row = self._first_result(path)
+            return self._price_from_row(row) if row else None
+
+        return self.lookups.do(key, fetch)
+
+    def get_pricing_batch(self, sku_ids: list[int], product_ids: list[int]) -> tuple[dict[int, PriceResult], dict[int, PriceResult]]:
+        by_sku = self._coalesced_batch("pricing_sku", sku_ids, lambda ids: self._fetch_pricing(ids, [])[0])
+        by_product = self._coalesced_batch("pricing_product", product_ids, lambda ids: self._fetch_pricing([], ids)[1])
+        return by_sku, by_product
+
+    def _fetch_pricing(self, sku_ids: list[int], product_ids: list[int]) -> tuple[dict[int, PriceResult], dict[int, PriceResult]]:
+        by_sku: dict[int, PriceResult] = {}
+        by_product: dict[int, PriceResult] = {}
+        for data in self._get_chunked("/pricing/sku", sku_ids):
+            for row in data.get("results") or []:
+                sku_id = row.get("skuId")
+                if sku_id is not None and int(sku_id) not in by_sku:
+                    by_sku[int(sku_id)] = self._price_from_row(row)
+        for data in self._get_chunked("/pricing/product", product_ids):
+            # Product pricing returns one row per printing; keep the first, as get_pricing does.
+            for row in data.get("results") or []:
+                product_id = row.get("productId")
+                if product_id is not None and int(product_id) not in by_product:
+                    by_product[int(product_id)] = self._price_from_row(row)
+        return by_sku, by_product
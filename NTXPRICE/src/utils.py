@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal, ROUND_HALF_UP
 from pathlib import Path
+from typing import Callable, Iterable, Iterator, TypeVar
 import csv
+import hashlib
+import sys
 import tempfile
 import os
 
+T = TypeVar("T")
+R = TypeVar("R")
+
 
 def d(value: float | str | Decimal | None) -> Decimal | None:
     if value is None or value == "":
@@ -13,21 +20,87 @@ def d(value: float | str | Decimal | None) -> Decimal | None:
     return Decimal(str(value))
 
 
+def fingerprint(*values: object) -> str:
+    return hashlib.sha1("\x1f".join("" if v is None else str(v) for v in values).encode("utf-8")).hexdigest()
+
+
 def quantize_price(value: Decimal) -> Decimal:
     return value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
 
 
-def atomic_write_csv(path: str, fieldnames: list[str], rows: list[dict]) -> None:
-    p = Path(path)
-    p.parent.mkdir(parents=True, exist_ok=True)
-    fd, temp = tempfile.mkstemp(prefix="ntxprice_", suffix=".csv", dir=str(p.parent))
-    os.close(fd)
+class IncrementalCsvWriter:
+    # Appends rows to a temp file next to `path`; commit() swaps it into place atomically, so readers
+    # never see a partial file. As a context manager it commits on success and aborts on error.
+    def __init__(self, path: str, fieldnames: list[str]) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self.temp = tempfile.mkstemp(prefix="ntxprice_", suffix=".csv", dir=str(self.path.parent))
+        self._file = os.fdopen(fd, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        self._writer.writeheader()
+        self.rows_written = 0
+
+    def write_rows(self, rows: Iterable[dict]) -> int:
+        before = self.rows_written
+        for row in rows:
+            self._writer.writerow(row)
+            self.rows_written += 1
+        return self.rows_written - before
+
+    def commit(self) -> None:
+        self._file.close()
+        try:
+            os.replace(self.temp, self.path)
+        except BaseException:
+            # Don't leave the temp file behind when the rename fails.
+            if os.path.exists(self.temp):
+                os.unlink(self.temp)
+            raise
+
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self.temp):
+            os.unlink(self.temp)
+
+    def __enter__(self) -> IncrementalCsvWriter:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+def atomic_write_csv(path: str, fieldnames: list[str], rows: Iterable[dict]) -> None:
+    with IncrementalCsvWriter(path, fieldnames) as writer:
+        writer.write_rows(rows)
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    chunk: list[T] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def peak_rss_mb() -> float | None:
     try:
-        with open(temp, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
-        os.replace(temp, p)
-    finally:
-        if os.path.exists(temp):
-            os.unlink(temp)
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def map_ordered(fn: Callable[[T], R], items: Iterable[T], max_workers: int = 1) -> list[R]:
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        return [fn(i) for i in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        return list(pool.map(fn, items))